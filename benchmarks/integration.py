@@ -0,0 +1,543 @@
+#!/usr/bin/env python
+
+"""Benchmark, and check PyWO on real Window Managers running headless.
+
+Unit tests, and benchmarks/suite.py use tests/Xlib_mock.py, so real
+reparenting, Hacks tables, and real round trips are never exercised.
+For every installed Window Manager (see PROFILES) this harness starts
+Xvfb, the Window Manager, N synthetic client windows, and PyWO daemon
+(with D-Bus service, if dbus-daemon, and dbus module are available).
+Then the same scenarios (see SCENARIOS) are performed on one of the clients:
+
+api - actions.perform() called in-process
+cli - bin/pywo --explain ACTION ... (new interpreter for every call)
+ipc - PerformAction() of running daemon's D-Bus service
+
+For every scenario best, and median latency (until X Server processed all
+requests), number of requests, and round trips are recorded, and resulting
+geometry, and state of the window are checked. Not installed Window Managers
+are skipped. Results can be saved as JSON, and tracked per Window Manager:
+
+    python benchmarks/integration.py -o openbox.json -w openbox
+    python benchmarks/integration.py -n 100 -m api,ipc
+
+Usage: python benchmarks/integration.py [options]
+
+"""
+
+import json
+import logging
+import optparse
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from Xlib import X, Xatom
+from Xlib import display as xdisplay
+from Xlib.error import DisplayError
+
+try:
+    import dbus
+except ImportError:
+    dbus = None
+
+# NOTE: pywo connects to X Server when imported, so it's imported only
+#       by worker process, started with DISPLAY of Xvfb
+
+
+# (name, command, expected Type)
+PROFILES = [('openbox', ['openbox'], 'OPENBOX'),
+            ('fluxbox', ['fluxbox'], 'FLUXBOX'),
+            ('blackbox', ['blackbox'], 'BLACKBOX'),
+            ('icewm', ['icewm'], 'ICEWM'),
+            ('pekwm', ['pekwm'], 'PEKWM'),
+            ('metacity', ['metacity'], 'METACITY'),
+            ('xfwm4', ['xfwm4'], 'XFWM'),
+            ('sawfish', ['sawfish'], 'SAWFISH'),
+            ('wmaker', ['wmaker'], 'WINDOW_MAKER'),
+            ('kwin', ['kwin'], 'KWIN'),
+            ('compiz', ['compiz', '--replace'], 'COMPIZ')]
+
+# Window Manager Types names (other names in Type are window types)
+WM_TYPES = [profile[2] for profile in PROFILES]
+
+MODES = ['api', 'cli', 'ipc']
+WINDOWS = 20
+REPEAT = 5
+
+SCREEN_WIDTH = 1280
+SCREEN_HEIGHT = 800
+# Time to wait for Xvfb, Window Manager, clients, and daemon
+TIMEOUT = 10
+# Time given to Window Manager to process requests before checking results
+SETTLE = 0.2
+
+CLIENT_NAME = 'PyWO client'
+CLIENT_CLASS = ('pywo-client', 'PyWOClient')
+# Geometry of the window before every scenario
+START = (100, 100, 400, 300)
+
+BUS_NAME = 'net.kosciak.PyWO'
+BUS_PATH = '/net/kosciak/PyWO'
+
+CONFIG = """[SETTINGS]
+keyboard_service = off
+dbus_service = %s
+focus_service = on
+layout = grid_3x2
+"""
+
+TRACE_SUMMARY = re.compile(r'Requests: (\d+), round trips \(\*\): (\d+)')
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def which(command):
+    """Return path of command found in PATH, or None."""
+    for path in os.environ.get('PATH', '').split(os.pathsep):
+        filename = os.path.join(path, command)
+        if os.path.isfile(filename) and os.access(filename, os.X_OK):
+            return filename
+    return None
+
+
+def wait_for(condition, timeout=TIMEOUT):
+    """Wait until condition() is true, return False on timeout."""
+    end = time.time() + timeout
+    while not condition():
+        if time.time() > end:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def stop_process(process):
+    """Terminate process, kill it if it doesn't exit."""
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    if not wait_for(lambda: process.poll() is not None, 2):
+        process.kill()
+        process.wait()
+
+
+class Xvfb(object):
+
+    """Xvfb server running on first free display."""
+
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.number = 99
+        while os.path.exists('/tmp/.X%s-lock' % self.number):
+            self.number += 1
+        self.display = ':%s' % self.number
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(
+                    ['Xvfb', self.display,
+                     '-screen', '0', '%sx%sx24' % (width, height),
+                     '-nolisten', 'tcp'],
+                    stdout=devnull, stderr=devnull)
+        socket = '/tmp/.X11-unix/X%s' % self.number
+        if not wait_for(lambda: os.path.exists(socket) or
+                                self.process.poll() is not None) or \
+           self.process.poll() is not None:
+            self.stop()
+            raise RuntimeError('Xvfb not started on %s' % self.display)
+
+    def stop(self):
+        stop_process(self.process)
+
+
+class Clients(object):
+
+    """Synthetic client windows, and connection keeping them alive."""
+
+    def __init__(self, display_name):
+        self.display = xdisplay.Display(display_name)
+        self.windows = []
+        self.__thread = None
+
+    def map(self, number):
+        """Create, and map given number of windows."""
+        screen = self.display.screen()
+        for client in range(number):
+            x, y, width, height = START
+            window = screen.root.create_window(
+                    x + client * 10 % 300, y + client * 10 % 200,
+                    width, height, 0, screen.root_depth,
+                    X.InputOutput, X.CopyFromParent,
+                    background_pixel=screen.white_pixel,
+                    event_mask=X.StructureNotifyMask)
+            window.set_wm_name('%s %s' % (CLIENT_NAME, client))
+            window.set_wm_class(*CLIENT_CLASS)
+            window.map()
+            self.windows.append(window)
+        self.display.sync()
+        self.__thread = threading.Thread(name='Clients', target=self.__run)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+
+    def __run(self):
+        """Read (and ignore) events, so they don't pile up."""
+        try:
+            while True:
+                self.display.next_event()
+        except Exception:
+            return
+
+    def managed(self):
+        """Return number of clients listed in _NET_CLIENT_LIST."""
+        root = self.display.screen().root
+        atom = self.display.intern_atom('_NET_CLIENT_LIST')
+        clients = root.get_full_property(atom, Xatom.WINDOW)
+        ids = set([window.id for window in self.windows])
+        return len(ids.intersection(clients and clients.value or []))
+
+    def wm_running(self):
+        """Return True if Window Manager set _NET_SUPPORTING_WM_CHECK."""
+        root = self.display.screen().root
+        atom = self.display.intern_atom('_NET_SUPPORTING_WM_CHECK')
+        return root.get_full_property(atom, Xatom.WINDOW) is not None
+
+    def close(self):
+        self.display.close()
+
+
+class Session(object):
+
+    """Xvfb, Window Manager, clients, and daemon for a single profile."""
+
+    def __init__(self, profile, windows, modes, path):
+        self.name, self.command, self.expected = profile
+        self.windows = windows
+        self.modes = modes
+        self.path = path
+        self.env = dict(os.environ)
+        self.env['PYTHONPATH'] = os.path.abspath(ROOT)
+        self.xvfb = None
+        self.wm = None
+        self.clients = None
+        self.bus = None
+        self.daemon = None
+        self.config = os.path.join(path, 'pyworc')
+        with open(self.config, 'w') as config:
+            config.write(CONFIG % ['off', 'on']['ipc' in modes])
+
+    def start(self):
+        """Start everything, return list of problems."""
+        problems = []
+        self.xvfb = Xvfb()
+        self.env['DISPLAY'] = self.xvfb.display
+        with open(os.devnull, 'w') as devnull:
+            self.wm = subprocess.Popen(self.command, env=self.env,
+                                       stdout=devnull, stderr=devnull)
+        self.clients = Clients(self.xvfb.display)
+        if not wait_for(self.clients.wm_running):
+            raise RuntimeError('%s not started' % self.name)
+        self.clients.map(self.windows)
+        if not wait_for(lambda: self.clients.managed() == self.windows):
+            problems.append('%s of %s clients managed' %
+                            (self.clients.managed(), self.windows))
+        if 'ipc' in self.modes:
+            problems.extend(self.start_daemon())
+        return problems
+
+    def start_daemon(self):
+        """Start private D-Bus session bus, and PyWO daemon."""
+        if dbus is None or not which('dbus-daemon'):
+            self.modes.remove('ipc')
+            return ['ipc skipped: dbus-daemon, or dbus module not found']
+        self.bus = subprocess.Popen(['dbus-daemon', '--session', '--nofork',
+                                     '--print-address'],
+                                    stdout=subprocess.PIPE)
+        self.env['DBUS_SESSION_BUS_ADDRESS'] = \
+                self.bus.stdout.readline().strip()
+        with open(os.devnull, 'w') as devnull:
+            self.daemon = subprocess.Popen(
+                    [sys.executable, os.path.join(ROOT, 'bin', 'pywo'),
+                     '--daemon', '--config', self.config,
+                     '--log_path', self.path],
+                    env=self.env, stdout=devnull, stderr=devnull)
+        return []
+
+    def run(self, repeat):
+        """Run worker process performing scenarios, return its results."""
+        command = [sys.executable, os.path.abspath(__file__), '--worker',
+                   '--config', self.config, '-r', str(repeat),
+                   '-m', ','.join(self.modes)]
+        worker = subprocess.Popen(command, env=self.env,
+                                  stdout=subprocess.PIPE)
+        output = worker.communicate()[0]
+        if worker.returncode:
+            raise RuntimeError('worker exited with %s' % worker.returncode)
+        return json.loads(output)
+
+    def stop(self):
+        """Stop everything that was started."""
+        stop_process(self.daemon)
+        stop_process(self.bus)
+        if self.clients:
+            self.clients.close()
+        stop_process(self.wm)
+        if self.xvfb:
+            self.xvfb.stop()
+
+
+def compare(geometry, **expected):
+    """Return list of differences between geometry, and expected values."""
+    return ['%s %s != %s' % (name, getattr(geometry, name), value)
+            for name, value in sorted(expected.items())
+            if abs(getattr(geometry, name) - value) > 1]
+
+
+def top_left(win, workarea, State):
+    return compare(win.geometry, x=workarea.x, y=workarea.y)
+
+
+def bottom_right(win, workarea, State):
+    return compare(win.geometry, x2=workarea.x2, y2=workarea.y2)
+
+
+def grid_left(win, workarea, State):
+    return compare(win.geometry, x=workarea.x, y=workarea.y,
+                   width=workarea.width / 3, height=workarea.height)
+
+
+def maximized(win, workarea, State):
+    problems = [state for state in ['MAXIMIZED_VERT', 'MAXIMIZED_HORZ']
+                if getattr(State, state) not in win.state]
+    return problems + compare(win.geometry, x=workarea.x, y=workarea.y,
+                              width=workarea.width, height=workarea.height)
+
+
+def sticky(win, workarea, State):
+    return [['STICKY'], []][State.STICKY in win.state]
+
+
+# (name, command, check(window, workarea, State) returning problems)
+SCENARIOS = [('put.top_left', 'put -p top_left', top_left),
+             ('put.bottom_right', 'put -p bottom_right', bottom_right),
+             ('grid_width.left', 'grid_width left', grid_left),
+             ('maximize', 'maximize -a', maximized),
+             ('sticky', 'sticky -a', sticky)]
+
+
+def worker(options):
+    """Perform SCENARIOS using given modes, print results as JSON."""
+    from pywo import actions, commandline, core
+    from pywo.actions import grid_actions, parser
+    from pywo.config import Config
+    from pywo.core import accounting
+    from pywo.core.windows import Hacks
+
+    WM = core.WindowManager()
+    WM.update_type()
+    config = Config(options.config)
+    grid_actions.TABLES.load(config)
+    clients = [win for win in WM.windows()
+               if win.name.startswith(CLIENT_NAME)]
+    if not clients:
+        raise RuntimeError('No clients found')
+    target = clients[0]
+    wm_types = [name for name in WM_TYPES
+                if getattr(core.Type, name) == WM.wm_type[0]]
+    results = {'wm': WM.name,
+               'wm_type': wm_types and wm_types[0] or 'UNKNOWN',
+               'hacks': [name for name in dir(Hacks)
+                         if not name.startswith('_') and
+                            WM.wm_type in getattr(Hacks, name)],
+               'clients': len(clients),
+               'modes': {}}
+
+    def reset():
+        """Move target window to START geometry, return problems."""
+        target.reset(full=True)
+        WM.sync()
+        target.set_geometry(core.Geometry(*START))
+        WM.sync()
+        time.sleep(SETTLE)
+        x, y, width, height = START
+        return compare(core.Window(target.id).geometry,
+                       x=x, y=y, width=width, height=height)
+
+    def api(command):
+        options, args = parser.parse_args(command)
+        trace = accounting.start_trace()
+        started = time.time()
+        try:
+            actions.perform(options, args, config)
+        finally:
+            accounting.stop_trace()
+        WM.sync()
+        return time.time() - started, len(trace.requests), trace.round_trips
+
+    cli_command = [sys.executable, os.path.join(ROOT, 'bin', 'pywo'),
+                   '--explain', '--config', options.config]
+    def cli(command):
+        started = time.time()
+        process = subprocess.Popen(cli_command + command.split(),
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        output, errors = process.communicate()
+        seconds = time.time() - started
+        summary = TRACE_SUMMARY.search(output)
+        if process.returncode or not summary:
+            raise RuntimeError(errors.strip().split('\n')[-1])
+        return seconds, int(summary.group(1)), int(summary.group(2))
+
+    service = []
+    def ipc(command):
+        if not service:
+            bus = dbus.SessionBus()
+            if not wait_for(lambda: bus.name_has_owner(BUS_NAME)):
+                raise RuntimeError('D-Bus service not started')
+            service.append(bus.get_object(BUS_NAME, BUS_PATH))
+        started = time.time()
+        error = service[0].PerformAction(command, 0,
+                                         dbus_interface=BUS_NAME)
+        WM.sync()
+        if error:
+            raise RuntimeError(error)
+        return time.time() - started, None, None
+
+    runners = {'api': api, 'cli': cli, 'ipc': ipc}
+    results['reset'] = reset()
+    for mode in options.modes.split(','):
+        mode_results = results['modes'][mode] = {}
+        for name, command, check in SCENARIOS:
+            command = '%s --id %s' % (command, target.id)
+            times = []
+            result = {}
+            for number in range(options.repeat):
+                reset()
+                try:
+                    seconds, requests, round_trips = runners[mode](command)
+                except Exception, exc:
+                    result['error'] = '%s: %s' % (exc.__class__.__name__, exc)
+                    break
+                times.append(seconds)
+                time.sleep(SETTLE)
+                result['problems'] = check(core.Window(target.id),
+                                           WM.workarea_geometry, core.State)
+            if times:
+                times.sort()
+                result.update({'best': times[0],
+                               'median': times[len(times) / 2],
+                               'requests': requests,
+                               'round_trips': round_trips})
+            mode_results[name] = result
+    target.reset(full=True)
+    WM.sync()
+    print json.dumps(results)
+    return 0
+
+
+def print_results(profile, results):
+    """Print results of single profile."""
+    print '%s: %s (type: %s, hacks: %s), %s clients' % (
+            profile, results['wm'], results['wm_type'],
+            ', '.join(results['hacks']) or '-', results['clients'])
+    if results['reset']:
+        print '  set_geometry: %s' % ', '.join(results['reset'])
+    for mode, scenarios in sorted(results['modes'].items()):
+        for name, result in sorted(scenarios.items()):
+            if 'best' not in result:
+                print '  %-4s %-20s %s' % (mode, name, result['error'])
+                continue
+            print '  %-4s %-20s %8.1fms %8.1fms %6s %6s %s' % (
+                    mode, name, result['best'] * 1000,
+                    result['median'] * 1000,
+                    result['requests'] is None and '-' or result['requests'],
+                    result['round_trips'] is None and '-' or
+                    result['round_trips'],
+                    ', '.join(result['problems']) or 'OK')
+
+
+def run(profiles, windows, modes, repeat):
+    """Return {profile: results, } for installed profiles."""
+    all_results = {}
+    for profile in profiles:
+        name = profile[0]
+        if not which(profile[1][0]):
+            print '%s: not installed, skipped' % name
+            continue
+        path = tempfile.mkdtemp(prefix='pywo-%s-' % name)
+        session = Session(profile, windows, list(modes), path)
+        try:
+            problems = session.start()
+            results = session.run(repeat)
+        except (RuntimeError, DisplayError, OSError), exc:
+            print '%s: %s' % (name, exc)
+            all_results[name] = {'error': str(exc)}
+            continue
+        finally:
+            session.stop()
+            shutil.rmtree(path)
+        results['problems'] = problems
+        if results['wm_type'] != profile[2]:
+            problems.append('detected as %s, not %s' %
+                            (results['wm_type'], profile[2]))
+        print_results(name, results)
+        for problem in problems:
+            print '  %s' % problem
+        all_results[name] = results
+    return all_results
+
+
+def main():
+    option_parser = optparse.OptionParser(
+                usage='python benchmarks/integration.py [options]')
+    option_parser.add_option('-w', '--wm', action='append', dest='wms',
+                             default=[], metavar='PROFILE',
+                             help='run only given profiles [default: all '
+                                  'installed: %s]' %
+                                  ', '.join([profile[0]
+                                             for profile in PROFILES]))
+    option_parser.add_option('-n', '--windows', type='int', default=WINDOWS,
+                             help='number of client windows '
+                                  '[default: %default]')
+    option_parser.add_option('-m', '--modes', default=','.join(MODES),
+                             help='comma separated modes [default: %default]')
+    option_parser.add_option('-r', '--repeat', type='int', default=REPEAT,
+                             help='number of repeats [default: %default]')
+    option_parser.add_option('-o', '--output', metavar='FILE',
+                             help='save results as JSON')
+    option_parser.add_option('--config', help=optparse.SUPPRESS_HELP)
+    option_parser.add_option('--worker', action='store_true',
+                             help=optparse.SUPPRESS_HELP)
+    options, args = option_parser.parse_args()
+    if options.worker:
+        logging.getLogger('pywo').addHandler(logging.NullHandler())
+        return worker(options)
+    if not which('Xvfb'):
+        option_parser.error('Xvfb not found')
+    modes = options.modes.split(',')
+    for mode in modes:
+        if mode not in MODES:
+            option_parser.error('invalid mode: %s' % mode)
+    profiles = [profile for profile in PROFILES
+                if not options.wms or profile[0] in options.wms]
+    results = {'version': 1,
+               'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'windows': options.windows,
+               'repeat': options.repeat,
+               'results': run(profiles, options.windows, modes,
+                              options.repeat)}
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+"""Compare pure Python and NumPy implementations of core.rectangles.
+
+For each number of windows time needed to build Rectangles and select
+windows overlapping workarea is measured (build), as well as selecting
+windows using already built Rectangles (reused, like in WindowIndex).
+The smallest number of windows for which NumPy is faster (crossover
+point) is printed for both. Use reused crossover to tune 
+rectangles.NUMPY_THRESHOLD.
+
+Importing pywo.core needs X display (Xvfb is enough).
+
+Usage: python benchmarks/rectangles.py [repeat]
+
+"""
+
+import random
+import sys
+import timeit
+
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from pywo.core import Geometry
+from pywo.core import rectangles
+
+
+SIZES = [10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+WORKAREA = Geometry(0, 0, 1920, 1080)
+
+
+def random_geometries(number):
+    """Return list of random geometries on 2x2 viewports desktop."""
+    return [Geometry(random.randint(-100, 3840), random.randint(-100, 2160),
+                     random.randint(50, 1920), random.randint(50, 1080))
+            for i in range(number)]
+
+
+def measure(function, repeat, size):
+    """Return best time of calling function."""
+    timer = timeit.Timer(function)
+    number = max(1, 10000 / size)
+    return min(timer.repeat(repeat, number)) / number
+
+
+def measure_build(implementation, geometries, repeat):
+    """Return best time of building rectangles, and selecting windows."""
+    ids = range(len(geometries))
+    def check():
+        mask = implementation(geometries).overlap(WORKAREA)
+        rectangles.select(ids, mask)
+    return measure(check, repeat, len(geometries))
+
+
+def measure_reused(implementation, geometries, repeat):
+    """Return best time of selecting windows using built rectangles."""
+    ids = range(len(geometries))
+    built = implementation(geometries)
+    def check():
+        rectangles.select(ids, built.overlap(WORKAREA))
+    return measure(check, repeat, len(geometries))
+
+
+def main(repeat=5):
+    random.seed(0)
+    implementations = [('python', rectangles.Rectangles)]
+    if rectangles.numpy is not None:
+        implementations.append(('numpy', rectangles.NumpyRectangles))
+    else:
+        print 'NumPy not available, measuring pure Python only'
+    modes = [('build', measure_build), ('reused', measure_reused)]
+    print '%8s %s' % ('windows',
+                      ' '.join(['%14s' % ('%s %s' % (mode, name))
+                                for mode, measure_mode in modes
+                                for name, implementation in implementations]))
+    crossovers = {}
+    for size in SIZES:
+        geometries = random_geometries(size)
+        line = []
+        for mode, measure_mode in modes:
+            times = [measure_mode(implementation, geometries, repeat)
+                     for name, implementation in implementations]
+            line.extend(times)
+            if len(times) > 1 and times[1] < times[0]:
+                crossovers.setdefault(mode, size)
+        print '%8d %s' % (size,
+                          ' '.join(['%12.1fus' % (time * 1000000)
+                                    for time in line]))
+    for mode, measure_mode in modes:
+        if mode in crossovers:
+            print 'NumPy (%s) is faster from %s windows' % \
+                  (mode, crossovers[mode])
+        elif rectangles.numpy is not None:
+            print 'NumPy (%s) is never faster' % mode
+    print 'NUMPY_THRESHOLD = %s' % rectangles.NUMPY_THRESHOLD
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
+
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+
+"""Replay recorded X events, and actions against Xlib mock.
+
+Recordings are made with "pywo --daemon --record FILE", or debug_record
+action (see pywo/core/recording.py). Desktop is rebuilt from recorded
+snapshots using tests/Xlib_mock.py, recorded events are fed through
+EventDispatcher (with WindowIndex, and focus history running like in
+daemon mode), and recorded actions are performed again.
+KeyPress events are replayed too, but no keys are grabbed, so actions
+are performed only once, from action records.
+
+Geometries are recorded as seen by PyWO, and replayed using mock's own
+Window Manager semantics, so session from any Window Manager can be
+replayed, benchmarked, and profiled offline:
+
+    python benchmarks/replay.py -r 5 session.recording
+    python benchmarks/replay.py -p session.pstats session.recording
+    python benchmarks/replay.py -s 1 session.recording  # original speed
+
+Xlib_mock.Display needs X display (Xvfb is enough).
+
+Usage: python benchmarks/replay.py [options] RECORDING
+
+"""
+
+import logging
+import optparse
+import os
+import sys
+import time
+
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from tests import Xlib_mock
+
+from pywo import config, core
+from pywo.actions import grid_actions, manager
+from pywo.core import profiling, recording, xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.index import WindowIndex
+from pywo.services import focus_service
+
+
+REPEAT = 1
+# Repo's default configuration (user's ~/.pyworc is not used)
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                           'etc', 'pyworc')
+
+# Properties replayed using mock's own logic
+MOCK_PROPERTIES = ['_NET_SUPPORTING_WM_CHECK', 'WM_NORMAL_HINTS']
+
+# Values used instead of missing properties needed by mock
+MOCK_DEFAULTS = {'_NET_FRAME_EXTENTS': [0, 0, 0, 0],
+                 '_NET_WM_STATE': []}
+
+
+class RawEvent(object):
+
+    """Simple replacement for raw X events."""
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+
+class Resource(object):
+
+    """Simple replacement for X resources (windows) not known to mock."""
+
+    def __init__(self, id):
+        self.id = id
+
+
+class ErrorsCounter(logging.Handler):
+
+    """Count errors logged by PyWO (actions don't raise exceptions)."""
+
+    def __init__(self):
+        logging.Handler.__init__(self, logging.ERROR)
+        self.errors = []
+
+    def emit(self, record):
+        self.errors.append(record.getMessage())
+
+
+class Replay(object):
+
+    """Recorded session replayed on Xlib mock."""
+
+    def __init__(self, filename, latency=0):
+        records = recording.load(filename)
+        header = records.next()
+        self.records = list(records)
+        self.root_id = header[3]
+        screens = header[4]
+        self.display = Xlib_mock.Display(
+                screen_width=max([x + width for x, y, width, height
+                                  in screens]),
+                screen_height=max([y + height for x, y, width, height
+                                   in screens]),
+                extensions=['XINERAMA'])
+        self.display.xinerama_query_screens = \
+                lambda: Xlib_mock.ScreensQuery(*screens)
+        self.display.latency = latency
+        xlib.ClientMessage = Xlib_mock.ClientMessage
+        xlib.XObject._XObject__DISPLAY = self.display
+        self.WM = core.WindowManager()
+        self.WM.update_type()
+        grid_actions.TABLES.load(config.Config(CONFIG_PATH))
+        grid_actions.CYCLERS.clear()
+        self.stacking = []
+        self.active = None
+        self.dispatcher = None
+
+    def resource(self, win_id):
+        """Return mock window, or Resource with given id."""
+        if win_id == self.root_id:
+            return self.display.root
+        return self.display.windows_by_id.get(win_id) or Resource(win_id)
+
+    def restack(self):
+        """Order mapped windows as in last recorded stacking order.
+
+        Mock's active window is the one on top of the stack.
+
+        """
+        stack = self.display.windows_stack
+        order = dict([(win_id, number)
+                      for number, win_id in enumerate(self.stacking)])
+        windows = sorted(stack, key=lambda window: (window.id == self.active,
+                                                    order.get(window.id, -1)))
+        stack.clear()
+        stack.extend(windows)
+
+    def apply_root(self, properties):
+        """Set root window's properties."""
+        root = self.display.root
+        stack = self.display.windows_stack
+        for name, value in properties.items():
+            if name in MOCK_PROPERTIES:
+                continue
+            value = value and value[1]
+            if name == '_NET_CLIENT_LIST_STACKING':
+                self.stacking = value or []
+            elif name == '_NET_CLIENT_LIST':
+                clients = set(value or [])
+                for window in list(stack):
+                    if window.id not in clients:
+                        stack.remove(window)
+                for win_id in clients:
+                    window = self.display.windows_by_id.get(win_id)
+                    if window and window not in stack:
+                        stack.append(window)
+            elif name == '_NET_ACTIVE_WINDOW':
+                self.active = value and value[0]
+            elif name == '_NET_NUMBER_OF_DESKTOPS':
+                root._set_desktops(value[0])
+            elif name == '_NET_WORKAREA':
+                # mock returns the same workarea for all desktops
+                root._prop(name, value[:4])
+            elif value is None:
+                root.properties.pop(self.display.atom(name), None)
+            else:
+                root._prop(name, value)
+        self.restack()
+
+    def apply_window(self, win_id, state):
+        """Create, or update window."""
+        window = self.display.windows_by_id.get(win_id)
+        if window is None:
+            if 'geometry' not in state:
+                return # changed before it was recorded
+            window = Xlib_mock.Window(self.display, '',
+                                      Xlib_mock.Geometry(0, 0, 1, 1, 0),
+                                      id=win_id)
+            self.display.windows_stack.append(window)
+        for name, value in state.get('properties', {}).items():
+            if name in MOCK_PROPERTIES:
+                continue
+            atom = self.display.atom(name)
+            if value is not None:
+                window.properties[atom] = value[1]
+            elif name in MOCK_DEFAULTS:
+                window.properties[atom] = list(MOCK_DEFAULTS[name])
+            else:
+                window.properties.pop(atom, None)
+        if 'hints' in state:
+            window.normal_hints = Xlib_mock.NormalHints(**state['hints'])
+        if 'geometry' in state:
+            x, y, width, height = state['geometry']
+            left, right, top, bottom = \
+                    window._prop('_NET_FRAME_EXTENTS') or (0, 0, 0, 0)
+            geometry = Xlib_mock.Geometry(x + left, y + top,
+                                          width - (left + right),
+                                          height - (top + bottom))
+            window.current_geometry = geometry
+            window.normal_geometry = geometry
+
+    def apply(self, win_id, state):
+        """Apply recorded state of window (or root)."""
+        if not state:
+            return
+        if win_id == self.root_id:
+            self.apply_root(state.get('properties', {}))
+        else:
+            self.apply_window(win_id, state)
+            self.restack()
+
+    def event(self, fields):
+        """Return RawEvent with mock's windows, and atoms."""
+        converted = {}
+        for name, value in fields.items():
+            if isinstance(value, tuple) and len(value) == 2 and \
+               value[0] == recording.WINDOW:
+                value = self.resource(value[1])
+            elif name in recording.ATOM_FIELDS and value:
+                value = self.display.atom(value)
+            converted[name] = value
+        return RawEvent(converted)
+
+    def start(self):
+        """Start services handling events like in daemon mode."""
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+        self.index = WindowIndex()
+        self.index.start()
+        focus_service.HISTORY.start()
+
+    def stop(self):
+        """Stop services."""
+        focus_service.HISTORY.stop()
+        self.index.stop()
+        self.WM.unregister_all()
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+
+    def run(self, speed=0):
+        """Replay the recording, return statistics.
+
+        speed - 0 as fast as possible, 1 original speed, 2 twice as fast...
+
+        """
+        dispatch = self.dispatcher._EventDispatcher__dispatch
+        stats = {'events': 0, 'actions': 0, 'skipped': 0,
+                 'dispatch': 0.0, 'perform': 0.0}
+        started = time.time()
+        for record in self.records:
+            kind, seconds = record[:2]
+            if speed:
+                delay = started + seconds / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            if kind == 'window':
+                self.apply(record[2], record[3])
+            elif kind == 'event':
+                fields, state = record[2:]
+                window = fields.get('window')
+                self.apply(window and window[1], state)
+                event = self.event(fields)
+                start = time.time()
+                dispatch(event)
+                stats['dispatch'] += time.time() - start
+                stats['events'] += 1
+            elif kind == 'action':
+                name, win_id, kwargs = record[2:]
+                action = manager.get(name)
+                if not action or win_id not in self.display.windows_by_id:
+                    stats['skipped'] += 1
+                    continue
+                start = time.time()
+                action(core.Window(win_id), **kwargs)
+                stats['perform'] += time.time() - start
+                stats['actions'] += 1
+        stats['total'] = time.time() - started
+        return stats
+
+
+def main():
+    option_parser = optparse.OptionParser(
+                usage='python benchmarks/replay.py [options] RECORDING')
+    option_parser.add_option('-s', '--speed', type='float', default=0,
+                             help='0 - as fast as possible, '
+                                  '1 - original speed [default: %default]')
+    option_parser.add_option('-l', '--latency', type='float', default=0,
+                             metavar='MS',
+                             help='simulated round trip time in milliseconds '
+                                  '[default: %default]')
+    option_parser.add_option('-r', '--repeat', type='int', default=REPEAT,
+                             help='number of repeats [default: %default]')
+    option_parser.add_option('-p', '--profile', metavar='FILE',
+                             help='profile replay, dump pstats to FILE')
+    options, args = option_parser.parse_args()
+    if len(args) != 1:
+        option_parser.error('RECORDING not given')
+    # don't read, or overwrite user's configuration cache
+    config.CACHE_PATH = None
+    counter = ErrorsCounter()
+    logging.getLogger('pywo').addHandler(counter)
+    print '%6s %8s %8s %8s %12s %12s %12s %6s' % (
+            'repeat', 'events', 'actions', 'skipped',
+            'dispatch', 'perform', 'total', 'trips')
+    for number in range(options.repeat):
+        # windows are changed by actions, so desktop is rebuilt every time
+        replay = Replay(args[0], options.latency / 1000.0)
+        replay.start()
+        replay.display.reset_requests()
+        if options.profile:
+            profiling.PROFILER.start()
+        try:
+            stats = replay.run(options.speed)
+        finally:
+            if options.profile:
+                profiling.PROFILER.stop(options.profile)
+            replay.stop()
+        print '%6d %8d %8d %8d %10.1fms %10.1fms %10.1fms %6d' % (
+                number + 1, stats['events'], stats['actions'],
+                stats['skipped'], stats['dispatch'] * 1000,
+                stats['perform'] * 1000, stats['total'] * 1000,
+                replay.display.round_trips)
+    if counter.errors:
+        print '%s error(s), first: %s' % (len(counter.errors),
+                                          counter.errors[0])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
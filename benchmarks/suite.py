@@ -0,0 +1,540 @@
+#!/usr/bin/env python
+
+"""Benchmark main PyWO code paths on synthetic desktops.
+
+Desktops with given numbers of windows are built using tests/Xlib_mock.py,
+so by default X Server round trips are not measured, only time spent in
+PyWO itself. Use --latency to simulate round trip time of slow connection.
+Measured are: all registered actions, WindowManager.windows() with filters
+(with, and without WindowIndex), name matching, Resizer, GeometryCycler,
+EventDispatcher under event flood, and CLI startup.
+
+For every benchmark best, and median time of single call, and number of
+round trips are saved as JSON, so results of two commits can be compared:
+
+    git checkout old; python benchmarks/suite.py -o old.json
+    git checkout new; python benchmarks/suite.py -c old.json
+
+Xlib_mock.Display needs X display (Xvfb is enough).
+
+Usage: python benchmarks/suite.py [options]
+
+"""
+
+import json
+import logging
+import optparse
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from Xlib import X
+
+from tests import Xlib_mock
+
+from pywo import config, core
+from pywo.actions import grid_actions, manager, parser, resizer
+from pywo.core import filters, xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.events import PropertyNotifyEvent
+from pywo.core.index import WindowIndex
+from pywo.services import focus_service
+
+
+SIZES = [10, 100, 1000, 5000]
+# Repo's default configuration (user's ~/.pyworc is not used)
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                           'etc', 'pyworc')
+REPEAT = 5
+# Minimal time of single repeat, calls are repeated to reach it
+MIN_TIME = 0.05
+# Ratio of times reported as regression (or improvement)
+THRESHOLD = 1.25
+# Number of events in single flood
+FLOOD = 1000
+
+DESKTOP_WIDTH = 1280
+DESKTOP_HEIGHT = 800
+DESKTOPS = 2
+VIEWPORTS = [2, 1]
+# Number of windows on current workarea (placed in its bottom half)
+VISIBLE = 8
+ACTIVE_GEOMETRY = core.Geometry(200, 150, 500, 400)
+
+WORDS = ['Terminal', 'Firefox', 'Emacs', 'Mail', 'Editor', 'Music',
+         'Chat', 'Files', 'Calendar', 'Viewer', 'Notes', 'Console']
+
+# Actions waiting for user's input, drawing on screen, or closing windows
+# (and all debug_* actions)
+SKIPPED_ACTIONS = ['blink', 'close', 'cycle', 'debug', 'switch']
+
+# Results of size independent benchmarks are stored with this key
+ALL_SIZES = 'all'
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class RawEvent(object):
+
+    """Simple replacement for raw X events."""
+
+    def __init__(self, type, window, **kwargs):
+        self.type = type
+        self.window = window
+        self.__dict__.update(kwargs)
+
+
+class ErrorsCounter(logging.Handler):
+
+    """Count errors logged by PyWO (actions don't raise exceptions)."""
+
+    def __init__(self):
+        logging.Handler.__init__(self, logging.ERROR)
+        self.errors = []
+
+    def emit(self, record):
+        self.errors.append(record.getMessage())
+
+
+class Desktop(object):
+
+    """Synthetic desktop with given number of windows on Xlib mock."""
+
+    def __init__(self, size, latency=0, seed=0):
+        random.seed(seed)
+        self.display = Xlib_mock.Display(screen_width=DESKTOP_WIDTH,
+                                         screen_height=DESKTOP_HEIGHT,
+                                         desktops=DESKTOPS,
+                                         viewports=VIEWPORTS,
+                                         extensions=['XINERAMA'])
+        self.display.latency = latency
+        xlib.ClientMessage = Xlib_mock.ClientMessage
+        xlib.XObject._XObject__DISPLAY = self.display
+        self.WM = core.WindowManager()
+        self.WM.update_type()
+        self.config = config.Config(CONFIG_PATH)
+        grid_actions.TABLES.load(self.config)
+        grid_actions.CYCLERS.clear()
+        self.dispatcher = None
+        self.map_window(core.Type.DOCK, 'Panel',
+                        core.Geometry(0, 0, DESKTOP_WIDTH, 24))
+        # windows on current workarea, and their initial geometries
+        self.visible = []
+        for number in range(size - 1):
+            win = self.random_window(number, number < VISIBLE)
+            if number < VISIBLE:
+                self.visible.append((win, win.geometry))
+        self.active = self.map_window(core.Type.NORMAL, 'Active Terminal',
+                                      ACTIVE_GEOMETRY)
+
+    def map_window(self, type, name, geometry, desktop=0):
+        """Map new window, and return it."""
+        extents = Xlib_mock.EXTENTS_NORMAL
+        geometry = Xlib_mock.Geometry(
+                        geometry.x + extents.left,
+                        geometry.y + extents.top,
+                        geometry.width - (extents.left + extents.right),
+                        geometry.height - (extents.top + extents.bottom))
+        window = Xlib_mock.Window(display=self.display, type=[type],
+                                  name=name, geometry=geometry,
+                                  class_name=[name.split()[-1].lower(),
+                                              name.split()[-1]])
+        window.map()
+        win = core.Window(window.id)
+        win.set_desktop(desktop)
+        return win
+
+    def random_window(self, number, visible):
+        """Map window with random name, type, geometry, and desktop.
+
+        Visible windows are placed in bottom half of current workarea,
+        others on other desktop or viewport, so there is always room
+        for active window on top of the workarea.
+
+        """
+        type = random.choice([core.Type.NORMAL] * 8 +
+                             [core.Type.DIALOG, core.Type.UTILITY])
+        name = '%s %s - %s' % (random.choice(WORDS), number,
+                               random.choice(WORDS))
+        width = random.randint(100, DESKTOP_WIDTH)
+        height = random.randint(100, DESKTOP_HEIGHT / 2)
+        x = random.randint(0, DESKTOP_WIDTH - width)
+        y = random.randint(DESKTOP_HEIGHT / 2, DESKTOP_HEIGHT - height)
+        desktop = 0
+        if not visible:
+            y = random.randint(24, DESKTOP_HEIGHT - height)
+            desktop = random.randint(0, DESKTOPS - 1)
+            if desktop == 0:
+                x += DESKTOP_WIDTH * random.randint(1, VIEWPORTS[0] - 1)
+        geometry = core.Geometry(x, y, width, height)
+        win = self.map_window(type, name, geometry, desktop)
+        if not visible and desktop == 0 and random.random() < 0.02:
+            win.sticky(core.Mode.SET)
+        return win
+
+    def reset(self):
+        """Restore geometries of visible windows, and activate active one."""
+        for win, geometry in self.visible:
+            win.set_geometry(geometry)
+        self.active.reset(full=True)
+        self.active.set_geometry(ACTIVE_GEOMETRY)
+        self.active.activate()
+
+    def start_dispatcher(self):
+        """Use new EventDispatcher (stopped one can't be restarted)."""
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+
+    def stop_dispatcher(self):
+        """Unregister all handlers, and wait for dispatcher to stop."""
+        self.WM.unregister_all()
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+        self.dispatcher = None
+
+
+class Benchmark(object):
+
+    """Measured code path.
+
+    setup(desktop) returns function to be measured, teardown(desktop) is
+    called after measuring. If sized is False benchmark is run only once,
+    not for every desktop size.
+
+    """
+
+    def __init__(self, name, setup, teardown=None, sized=True):
+        self.name = name
+        self.setup = setup
+        self.teardown = teardown
+        self.sized = sized
+
+
+def measure(function, repeat):
+    """Return best, and median time of single call of function.
+
+    Result also contains first error logged while calling function,
+    results of such calls shouldn't be compared.
+
+    """
+    counter = ErrorsCounter()
+    logging.getLogger('pywo').addHandler(counter)
+    try:
+        timer = timeit.Timer(function)
+        first = timer.timeit(1)
+        number = max(1, int(MIN_TIME / max(first, 0.000001)))
+        times = sorted([total / number
+                        for total in timer.repeat(repeat, number)])
+    finally:
+        logging.getLogger('pywo').removeHandler(counter)
+    result = {'best': times[0],
+              'median': times[len(times) / 2],
+              'number': number}
+    if counter.errors:
+        result['error'] = counter.errors[0]
+    return result
+
+
+def action_benchmark(action):
+    """Return Benchmark performing action on active window.
+
+    Like in daemon mode focus history is running.
+
+    """
+    def setup(desktop):
+        desktop.start_dispatcher()
+        focus_service.HISTORY.start()
+        options, args = parser.parse_args('')
+        section = None
+        if action.need_section:
+            section = desktop.config.section('top')
+        plan = action.plan(desktop.config, section, options)
+        return lambda: plan(desktop.active)
+    def teardown(desktop):
+        focus_service.HISTORY.stop()
+        desktop.stop_dispatcher()
+    return Benchmark('action.%s' % action.name, setup, teardown)
+
+
+def windows_benchmark(name, filter=None, match='', limit=None):
+    """Return Benchmark calling WM.windows() without WindowIndex."""
+    def setup(desktop):
+        return lambda: desktop.WM.windows(filter, match=match, limit=limit)
+    return Benchmark(name, setup)
+
+
+def indexed_benchmark(name, filter=None, match='', limit=None):
+    """Return Benchmark calling WM.windows() with WindowIndex running."""
+    def setup(desktop):
+        desktop.start_dispatcher()
+        desktop.index = WindowIndex()
+        desktop.index.start()
+        return lambda: desktop.WM.windows(filter, match=match, limit=limit)
+    def teardown(desktop):
+        desktop.index.stop()
+        desktop.stop_dispatcher()
+    return Benchmark(name, setup, teardown)
+
+
+def resizer_benchmark(name, resize, indexed=False):
+    """Return Benchmark finding new geometry of active window.
+
+    If indexed is True WindowIndex is running.
+
+    """
+    def setup(desktop):
+        if indexed:
+            desktop.start_dispatcher()
+            desktop.index = WindowIndex()
+            desktop.index.start()
+        direction = desktop.config.section('top').direction
+        return lambda: resize(desktop.active, direction)
+    def teardown(desktop):
+        desktop.index.stop()
+        desktop.stop_dispatcher()
+    return Benchmark(name, setup, indexed and teardown or None)
+
+
+def cycler_setup(desktop):
+    """Create GeometryCycler for active window, and get next geometry."""
+    section = desktop.config.section('top')
+    def cycle():
+        cycler = grid_actions.GeometryCycler(
+                        desktop.active, section.position, section.gravity,
+                        section.size, grid_actions.NO_SIZE,
+                        grid_actions.NO_SIZE, grid_actions.CYCLE_WIDTH)
+        cycler.next(grid_actions.CYCLE_WIDTH)
+    return cycle
+
+
+def flood_setup(desktop):
+    """Dispatch FLOOD events to WindowIndex, and FocusHistory handlers.
+
+    Events are mix of events handled by services, and filtered out ones.
+
+    """
+    desktop.start_dispatcher()
+    desktop.index = WindowIndex()
+    desktop.index.start()
+    focus_service.HISTORY.start()
+    root = desktop.display.root
+    windows = [desktop.display.create_resource_object('window', win.id)
+               for win in desktop.WM.windows()]
+    def property(window, name):
+        return RawEvent(X.PropertyNotify, window,
+                        atom=core.Window.atom(name),
+                        state=PropertyNotifyEvent.NEW_VALUE)
+    def configure(window):
+        geometry = window.get_geometry()
+        return RawEvent(X.ConfigureNotify, window, event=window,
+                        border_width=0, override=False,
+                        x=geometry.x, y=geometry.y,
+                        width=geometry.width, height=geometry.height)
+    events = []
+    for number in range(FLOOD):
+        window = windows[number % len(windows)]
+        events.append([property(root, '_NET_ACTIVE_WINDOW'),
+                       property(root, '_NET_CLIENT_LIST_STACKING'),
+                       property(window, '_NET_WM_USER_TIME'),
+                       property(window, '_NET_WM_NAME'),
+                       configure(window)][number % 5])
+    dispatch = desktop.dispatcher._EventDispatcher__dispatch
+    def flood():
+        for event in events:
+            dispatch(event)
+    return flood
+
+
+def flood_teardown(desktop):
+    focus_service.HISTORY.stop()
+    desktop.index.stop()
+    desktop.stop_dispatcher()
+
+
+def cli_setup(desktop):
+    """Run bin/pywo --help in new interpreter."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.abspath(ROOT)
+    command = [sys.executable, os.path.join(ROOT, 'bin', 'pywo'), '--help']
+    def run():
+        with open(os.devnull, 'w') as devnull:
+            subprocess.call(command, env=env, stdout=devnull, stderr=devnull)
+    return run
+
+
+def benchmarks():
+    """Return list of all Benchmarks."""
+    standard = filters.STANDARD_ON_WORKAREA
+    all_benchmarks = [
+        windows_benchmark('windows.all'),
+        windows_benchmark('windows.standard', filters.STANDARD),
+        windows_benchmark('windows.standard_on_workarea', standard),
+        indexed_benchmark('windows.indexed.standard_on_workarea', standard),
+        windows_benchmark('match.name', match='emacs', limit=1),
+        indexed_benchmark('match.indexed.name', match='emacs', limit=1),
+        resizer_benchmark('resizer.expand', resizer.expand_window),
+        resizer_benchmark('resizer.shrink', resizer.shrink_window),
+        resizer_benchmark('resizer.indexed.expand', resizer.expand_window,
+                          indexed=True),
+        resizer_benchmark('resizer.indexed.shrink', resizer.shrink_window,
+                          indexed=True),
+        Benchmark('grid.cycler', cycler_setup),
+        Benchmark('dispatcher.flood', flood_setup, flood_teardown),
+        Benchmark('cli.startup', cli_setup, sized=False),
+    ]
+    for action in sorted(manager.get_all(), key=lambda action: action.name):
+        if not action.name.split('_')[0] in SKIPPED_ACTIONS:
+            all_benchmarks.append(action_benchmark(action))
+    return all_benchmarks
+
+
+def run(selected, sizes, repeat, latency=0):
+    """Return {name: {size: result, }, } for selected benchmarks."""
+    results = {}
+    for size in sizes:
+        desktop = Desktop(size, latency)
+        for benchmark in selected:
+            if not benchmark.sized and results.get(benchmark.name):
+                continue
+            key = benchmark.sized and str(size) or ALL_SIZES
+            desktop.reset()
+            function = benchmark.setup(desktop)
+            try:
+                result = measure(function, repeat)
+                if benchmark.sized:
+                    desktop.display.reset_requests()
+                    function()
+                    result['round_trips'] = desktop.display.round_trips
+            except Exception, exc:
+                result = {'error': '%s: %s' % (exc.__class__.__name__, exc)}
+            if benchmark.teardown:
+                benchmark.teardown(desktop)
+            results.setdefault(benchmark.name, {})[key] = result
+            print_result(benchmark.name, key, result)
+    return results
+
+
+def print_result(name, key, result, baseline=None):
+    """Print result, and ratio to baseline (if given)."""
+    if 'best' not in result:
+        print '%-40s %6s %s' % (name, key, result['error'])
+        return
+    line = '%-40s %6s %10.1fus %10.1fus %6s' % (name, key,
+                                                result['best'] * 1000000,
+                                                result['median'] * 1000000,
+                                                result.get('round_trips', '-'))
+    if baseline and 'best' in baseline:
+        ratio = result['best'] / max(baseline['best'], 0.000000001)
+        line += ' %6.2fx' % ratio
+        if ratio > THRESHOLD:
+            line += ' REGRESSION'
+        elif ratio < 1 / THRESHOLD:
+            line += ' improvement'
+    if 'error' in result:
+        line += ' (%s)' % result['error']
+    print line
+
+
+def compare(results, baseline):
+    """Print comparison with baseline results, return number of regressions."""
+    print
+    print 'Compared with %s (%s):' % (baseline.get('commit'),
+                                      baseline.get('date'))
+    regressions = 0
+    for name in sorted(results):
+        for key, result in sorted(results[name].items()):
+            old = baseline['results'].get(name, {}).get(key)
+            if not old or 'best' not in old or 'best' not in result:
+                continue
+            print_result(name, key, result, old)
+            if result['best'] > old['best'] * THRESHOLD:
+                regressions += 1
+    print '%s regression(s)' % regressions
+    return regressions
+
+
+def commit():
+    """Return id of current git commit, or None."""
+    try:
+        process = subprocess.Popen(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        output = process.communicate()[0].strip()
+    except OSError:
+        return None
+    return output or None
+
+
+def main():
+    global THRESHOLD
+    option_parser = optparse.OptionParser(
+                usage='python benchmarks/suite.py [options]')
+    option_parser.add_option('-s', '--sizes', default=SIZES,
+                             type='string',
+                             help='comma separated numbers of windows '
+                                  '[default: %s]' %
+                                  ','.join([str(size) for size in SIZES]))
+    option_parser.add_option('-l', '--latency', type='float', default=0,
+                             metavar='MS',
+                             help='simulated round trip time in milliseconds '
+                                  '[default: %default]')
+    option_parser.add_option('-r', '--repeat', type='int', default=REPEAT,
+                             help='number of repeats [default: %default]')
+    option_parser.add_option('-b', '--benchmark', action='append',
+                             dest='benchmarks', default=[], metavar='PREFIX',
+                             help='run only benchmarks with names '
+                                  'starting with PREFIX')
+    option_parser.add_option('-o', '--output', metavar='FILE',
+                             help='save results as JSON')
+    option_parser.add_option('-c', '--compare', metavar='FILE',
+                             help='compare results with saved JSON')
+    option_parser.add_option('-t', '--threshold', type='float',
+                             default=THRESHOLD,
+                             help='ratio reported as regression '
+                                  '[default: %default]')
+    options, args = option_parser.parse_args()
+    sizes = options.sizes
+    if isinstance(sizes, str):
+        sizes = [int(size) for size in sizes.split(',')]
+    THRESHOLD = options.threshold
+    # don't read, or overwrite user's configuration cache
+    config.CACHE_PATH = None
+    # errors are counted by measure()
+    logging.getLogger('pywo').addHandler(logging.NullHandler())
+
+    selected = [benchmark for benchmark in benchmarks()
+                if not options.benchmarks or
+                   [prefix for prefix in options.benchmarks
+                           if benchmark.name.startswith(prefix)]]
+    print '%-40s %6s %12s %12s %6s' % ('benchmark', 'size',
+                                       'best', 'median', 'trips')
+    results = {'version': 1,
+               'commit': commit(),
+               'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'repeat': options.repeat,
+               'latency': options.latency,
+               'results': run(selected, sizes, options.repeat,
+                              options.latency / 1000.0)}
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=1, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as baseline:
+            baseline = json.load(baseline)
+        if compare(results['results'], baseline):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
@@ -34,11 +34,12 @@ log = logging.getLogger('pywo.services.' + __name__)
 
 
 def active_window_changed(event):
-    if event.atom_name == '_NET_ACTIVE_WINDOW':
-        log.info('Active window changed to: %s' % WM.active_window().name)
+    log.info('Active window changed to: %s' % WM.active_window().name)
 
 WM = WindowManager()
-HANDLER = PropertyNotifyHandler(active_window_changed)
+# Only changes of _NET_ACTIVE_WINDOW will be passed to active_window_changed
+HANDLER = PropertyNotifyHandler(active_window_changed, 
+                                atoms=['_NET_ACTIVE_WINDOW'])
 
 
 def setup(config):
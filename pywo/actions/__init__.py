@@ -28,9 +28,10 @@ Check /examples/plugins/actions for an example of third-party actions plugin.
 """
 
 import logging
+import threading
 
 from pywo.core import Window, WindowManager, Type, State, Mode
-from pywo.core import filters
+from pywo.core import accounting, filters, latency, profiling, recording
 from pywo.actions import manager
 
 
@@ -45,6 +46,9 @@ TYPE_FILTER = filters.STANDARD_TYPE
 STATE_FILTER = filters.ExcludeState(State.MAXIMIZED, State.FULLSCREEN)
 TYPE_STATE_FILTER = filters.AND(TYPE_FILTER, STATE_FILTER)
 
+# Set by debug_trace action, next performed action will be traced
+TRACE_NEXT = threading.Event()
+
 
 class ActionException(Exception):
 
@@ -112,19 +116,38 @@ class Action(object):
                     break
         return kwargs
 
+    def plan(self, config, section=None, options=None):
+        """Return ActionPlan with arguments taken from given objects."""
+        return ActionPlan(self, self.get_kwargs(config, section, options))
+
     def __call__(self, win, **kwargs):
         """Perform action on window and with given arguments."""
-        log.info('%s: win=%s, kwargs={%s}' % 
-                 (self, win,
-                 ', '.join(["'%s':%s" % (key, value) 
-                            for key, value in kwargs.items()])))
-        self.check_filter(win)
-        self.pre_perform(win, **kwargs)
+        if log.isEnabledFor(logging.INFO):
+            log.info('%s: win=%s, kwargs={%s}' % 
+                     (self, win,
+                     ', '.join(["'%s':%s" % (key, value) 
+                                for key, value in kwargs.items()])))
+        recording.action(self.name, win, kwargs)
+        trace = None
+        if TRACE_NEXT.is_set() and self.name != 'debug_trace':
+            TRACE_NEXT.clear()
+            trace = accounting.start_trace()
         try:
-            self.perform(win, **kwargs)
-        except Exception, e:
-            log.exception('Exception %s while performing %s' % (e, self))
-        self.post_perform(win, **kwargs)
+            self.check_filter(win)
+            self.pre_perform(win, **kwargs)
+            latency.mark('filter')
+            try:
+                profiling.run(self.perform, win, **kwargs)
+            except Exception, e:
+                log.exception('Exception %s while performing %s' % (e, self))
+            latency.mark('perform')
+            self.post_perform(win, **kwargs)
+            latency.mark('sync')
+        finally:
+            if trace:
+                accounting.stop_trace()
+                log.info('X requests sent by %s:\n%s' % 
+                         (self, '\n'.join(trace.report(Window.atom_name))))
 
     def check_filter(self, win):
         """Check if window matches filter."""
@@ -152,6 +175,33 @@ class Action(object):
         return "<Action '%s'>" % (self.name,)
 
 
+class ActionPlan(object):
+
+    """Action with all arguments resolved in advance.
+
+    Use it if the same action will be performed many times with the same 
+    arguments (for example action bound to keyboard shortcut). 
+    Arguments are resolved only once, and can't be changed later.
+
+    """
+
+    def __init__(self, action, kwargs):
+        self.action = action
+        self.__kwargs = dict(kwargs)
+
+    @property
+    def kwargs(self):
+        """Return copy of action's arguments."""
+        return dict(self.__kwargs)
+
+    def __call__(self, win):
+        """Perform action on window."""
+        self.action(win, **self.__kwargs)
+
+    def __str__(self):
+        return '<ActionPlan %s kwargs=%s>' % (self.action, self.__kwargs)
+
+
 class SimpleActionWrapper(Action):
 
     """Wrapper for simple function based actions."""
@@ -192,9 +242,59 @@ def _debug_info(win):
     win.sync()
     log.info('Old geometry=%s' % old_geometry)
     log.info('New geometry=%s' % win.geometry)
+    log.info('-= X requests sent since start =-')
+    for line in accounting.STATISTICS.report():
+        log.info(line)
+    log.info('-= Key press latency =-')
+    for line in latency.LATENCY.report():
+        log.info(line)
     log.info('-= End of debug output =-')
 
 
+@register(name='debug_trace')
+def _debug_trace(win):
+    """Log X requests sent by the next performed action (in daemon mode)."""
+    TRACE_NEXT.set()
+
+
+@register(name='debug_profile')
+def _debug_profile(win):
+    """Start cProfile profiler, or stop it and dump pstats to file."""
+    if not profiling.PROFILER.running:
+        profiling.PROFILER.start()
+        log.info('Profiler started')
+        return
+    filename = profiling.PROFILER.stop()
+    log.info('Profiler stopped, stats dumped to: %s' % filename)
+
+
+@register(name='debug_sample')
+def _debug_sample(win):
+    """Start sampling all threads, or stop it and dump stacks to file."""
+    if not profiling.SAMPLER.running:
+        profiling.SAMPLER.start()
+        log.info('Sampler started')
+        return
+    filename = profiling.SAMPLER.stop()
+    log.info('Sampler stopped, stacks dumped to: %s' % filename)
+
+
+@register(name='debug_record')
+def _debug_record(win):
+    """Start recording X events, and actions, or stop recording."""
+    if recording.RECORDER is None:
+        recording.start(profiling.profile_filename('recording'))
+    else:
+        recording.stop()
+
+
+@register(name='debug_memory')
+def _debug_memory(win):
+    """Log memory usage changes since previous call."""
+    log.info('Memory snapshot:\n%s' %
+             '\n'.join(profiling.SNAPSHOTS.take()))
+
+
 
 def perform(options, args, config, win_id=0):
     """Perform action based on options and args returned by parser."""
@@ -229,7 +329,7 @@ def perform(options, args, config, win_id=0):
         # TODO: check system encoding?
         args = [arg.decode('utf-8') for arg in args]
         match = u' '.join(args)
-        windows = WM.windows(match=match)
+        windows = WM.windows(match=match, limit=1)
         try:
             window = windows[0]
         except:
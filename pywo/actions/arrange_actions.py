@@ -0,0 +1,205 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""arrange_actions.py - PyWO actions - arranging all windows at once."""
+
+import logging
+
+from pywo.core import Geometry, Size, WindowManager
+from pywo.core import filters
+from pywo.actions import Action, ActionException, STATE_FILTER
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+WM = WindowManager()
+
+# Windows that can be arranged
+FILTERS = {'standard': filters.AND(filters.STANDARD_ON_WORKAREA, 
+                                   STATE_FILTER),
+           'normal': filters.AND(filters.NORMAL_ON_WORKAREA, STATE_FILTER),
+           'desktop': filters.AND(filters.STANDARD, filters.DESKTOP, 
+                                  STATE_FILTER), }
+# Pack layout doesn't scale windows down more than that, grid is used instead
+PACK_MIN_SCALE = 0.25
+
+
+def split(start, length, parts, part):
+    """Return start and end of part of the range split into equal parts."""
+    return (start + length * part / parts, 
+            start + length * (part + 1) / parts)
+
+
+def limited(value, minimum, maximum):
+    """Return value not lower than minimum, and not greater than maximum.
+
+    Limits equal 0 are ignored, maximum wins if limits are in conflict.
+
+    """
+    if minimum:
+        value = max(value, minimum)
+    if maximum:
+        value = min(value, maximum)
+    return value
+
+
+def grid(geometries, workarea, limits=None):
+    """Return geometries of cells of the grid, one for each window.
+
+    Grid has as many rows as columns (or one row less), if last row is not 
+    full its cells are wider. Cells fill whole workarea, so limits 
+    are ignored.
+
+    """
+    count = len(geometries)
+    columns = 1
+    while columns * columns < count:
+        columns += 1
+    rows = (count + columns - 1) / columns
+    cells = []
+    for number in range(count):
+        row, column = divmod(number, columns)
+        row_columns = min(columns, count - row * columns)
+        x, x2 = split(workarea.x, workarea.width, row_columns, column)
+        y, y2 = split(workarea.y, workarea.height, rows, row)
+        cells.append(Geometry(x, y, x2 - x, y2 - y))
+    return cells
+
+
+def columns(geometries, workarea, limits=None):
+    """Return geometries of full height columns, one for each window.
+
+    Columns fill whole workarea, so limits are ignored.
+
+    """
+    count = len(geometries)
+    cells = []
+    for column in range(count):
+        x, x2 = split(workarea.x, workarea.width, count, column)
+        cells.append(Geometry(x, workarea.y, x2 - x, workarea.height))
+    return cells
+
+
+def shelves(sizes, workarea):
+    """Return geometries of sizes packed on shelves, or None if they don't fit.
+
+    Sizes are placed from the tallest one, left to right, in rows (shelves)
+    as high as the first size in the row.
+
+    """
+    order = sorted(range(len(sizes)), key=lambda number: -sizes[number].height)
+    cells = [None] * len(sizes)
+    x, y = workarea.x, workarea.y
+    shelf_height = 0
+    for number in order:
+        width, height = sizes[number].width, sizes[number].height
+        if x + width > workarea.x2:
+            # next shelf
+            x = workarea.x
+            y += shelf_height
+            shelf_height = 0
+        if y + height > workarea.y2:
+            return None
+        cells[number] = Geometry(x, y, width, height)
+        x += width
+        shelf_height = max(shelf_height, height)
+    return cells
+
+
+def pack(geometries, workarea, limits=None):
+    """Return geometries of windows packed on shelves, keeping their sizes.
+
+    limits - list of (minimal Size, maximal Size) of windows (see 
+             Window.size_limits), sizes are kept within them
+
+    Windows larger than workarea are shrinked to fit it. If windows don't 
+    fit workarea all of them are scaled down (not below minimal sizes), 
+    and if it's not enough grid is used instead, so windows never overlap.
+
+    """
+    limits = limits or [(Size(0, 0), Size(0, 0))] * len(geometries)
+    scale = 1.0
+    previous = None
+    while True:
+        sizes = [Size(min(limited(int(geometry.width * scale), 
+                                  minimum.width, maximum.width), 
+                          workarea.width),
+                      min(limited(int(geometry.height * scale), 
+                                  minimum.height, maximum.height), 
+                          workarea.height))
+                 for geometry, (minimum, maximum) in zip(geometries, limits)]
+        cells = shelves(sizes, workarea)
+        if cells is not None:
+            return cells
+        if sizes == previous or scale < PACK_MIN_SCALE:
+            # can't be scaled down anymore
+            log.debug('Windows can\'t be packed, using grid')
+            return grid(geometries, workarea)
+        previous = sizes
+        scale *= 0.9
+
+
+LAYOUTS = {'grid': grid,
+           'columns': columns,
+           'pack': pack, }
+
+
+class ArrangeAction(Action):
+
+    """Arrange all windows on workarea using given layout.
+
+    All windows are read using single snapshot, their new geometries are 
+    computed in one pass, and all configure requests are sent before 
+    waiting for X Server.
+
+    """
+
+    def __init__(self, name, doc):
+        Action.__init__(self, name=name, doc=doc)
+
+    def perform(self, win, layout='grid', filter='standard'):
+        if layout not in LAYOUTS:
+            raise ActionException('Invalid layout: %s (use: %s)' % 
+                                  (layout, ', '.join(sorted(LAYOUTS))))
+        if filter not in FILTERS:
+            raise ActionException('Invalid filter: %s (use: %s)' % 
+                                  (filter, ', '.join(sorted(FILTERS))))
+        windows = WM.windows(FILTERS[filter], stacking=False)
+        windows.sort(key=lambda window: window.id != win.id)
+        snapshots = [snapshot for snapshot 
+                              in WM.snapshots(windows, ['geometry', 'hints'])
+                              if snapshot]
+        if not snapshots:
+            return
+        geometries = [snapshot.geometry for snapshot in snapshots]
+        limits = [snapshot.size_limits for snapshot in snapshots]
+        cells = LAYOUTS[layout](geometries, WM.workarea_geometry, limits)
+        for snapshot, geometry in zip(snapshots, cells):
+            log.debug('Setting %s for %s' % (geometry, snapshot))
+            snapshot.set_geometry(geometry)
+        WM.sync()
+
+
+ArrangeAction('arrange', 
+              "Arrange all windows on workarea (grid, columns, or pack).",
+              ).register()
+
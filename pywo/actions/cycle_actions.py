@@ -40,13 +40,12 @@ class ActiveChangedEventHandler(PropertyNotifyHandler):
     """Listen for change of active window."""
 
     def __init__(self, action):
-        PropertyNotifyHandler.__init__(self)
+        PropertyNotifyHandler.__init__(self, atoms=['_NET_ACTIVE_WINDOW'])
         self.action = action
 
     def property(self, event):
-        if event.atom_name == '_NET_ACTIVE_WINDOW':
-            active_win = WM.active_window()
-            self.action(active_win)
+        active_win = WM.active_window()
+        self.action(active_win)
 
 
 class SwitchCycleAction(Action):
@@ -0,0 +1,71 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""focus_actions.py - PyWO actions - recently active windows.
+
+Actions use FocusHistory kept by focus_service, so no X Server queries 
+are needed to find previously active window.
+
+"""
+
+import logging
+
+from pywo.actions import register, ActionException, TYPE_FILTER
+from pywo.core import Window, WindowManager
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+WM = WindowManager()
+
+
+def recent_window(win, recent=1):
+    """Return recent-th previously active window (not counting win)."""
+    if WM.history is None:
+        raise ActionException('Focus history not available, ' 
+                              'turn on focus_service')
+    win_id = WM.history.recent(max(recent - 1, 0), skip=win and win.id)
+    if not win_id:
+        raise ActionException('No previously active window')
+    return Window(win_id)
+
+
+@register(name='focus_previous')
+def _focus_previous(win):
+    """Activate previously active window."""
+    recent_window(win).activate()
+
+
+@register(name='focus_recent')
+def _focus_recent(win, recent=1):
+    """Activate N-th recently active window."""
+    recent_window(win, recent).activate()
+
+
+@register(name='swap_with_previous', filter=TYPE_FILTER)
+def _swap_with_previous(win, recent=1):
+    """Switch placement of window, and previously active window."""
+    previous = recent_window(win, recent)
+    win_geometry, previous_geometry = win.geometry, previous.geometry
+    win.set_geometry(previous_geometry)
+    previous.set_geometry(win_geometry)
+
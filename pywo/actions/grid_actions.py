@@ -20,8 +20,10 @@
 
 """grid_actions.py - PyWO actions - placing windows on grid."""
 
+import collections
 import itertools
 import logging
+import threading
 
 from pywo.core import Gravity, Geometry, Size, Position, WindowManager
 from pywo.actions import Action, TYPE_FILTER
@@ -40,6 +42,12 @@ NO_SIZE = Size(0, 0)
 CYCLE_WIDTH = 0
 CYCLE_HEIGHT = 1
 
+# Maximal number of GeometryCyclers kept in cache
+CYCLERS_SIZE = 32
+
+# Window's geometry must match the expected one exactly
+EXACT = Size(1, 1)
+
 
 class DummyWindow(object):
 
@@ -89,17 +97,116 @@ def get_iterator(sizes, new_size):
     return itertools.cycle(sizes)
 
 
+def workarea_key(workarea):
+    """Return hashable key for workarea geometry."""
+    return (workarea.x, workarea.y, workarea.width, workarea.height)
+
+
+class GridTables(object):
+
+    """Absolute positions and sizes for sections of loaded layout.
+
+    Tables are computed for every section, against current workarea and 
+    every screen's part of the workarea, when config is loaded:
+    {workarea_key: {repr((position, size)): (position, sizes), }, }
+    They are rebuilt only if workarea changes, so on key press only part
+    depending on other windows' geometries is computed.
+
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__sections = [] # [(position, size), ]
+        self.__tables = {}
+
+    def load(self, config):
+        """Store sections of the config, and build tables.
+        
+        If sections are the same as already loaded, tables are kept.
+        
+        """
+        sections = []
+        for section in config.sections.values():
+            # sizes relative to window's size can't be computed in advance,
+            # and sections without widths, and heights have no size at all
+            if section.position and section.size and \
+               section.size.width and section.size.height:
+                sections.append((section.position, section.size))
+        with self.__lock:
+            if self.__tables and \
+               set([repr(section) for section in sections]) == \
+               set([repr(section) for section in self.__sections]):
+                log.debug('Grid sections not changed, keeping grid tables')
+                return
+            self.__sections = sections
+        self.rebuild()
+
+    def rebuild(self, workarea=None):
+        """Build tables for workarea and screens."""
+        workarea = workarea or WM.workarea_geometry
+        workareas = [workarea]
+        for screen in WM.screen_geometries():
+            screen_workarea = screen & workarea
+            if screen_workarea and screen_workarea.width and \
+               screen_workarea.height and screen_workarea not in workareas:
+                workareas.append(screen_workarea)
+        tables = {}
+        with self.__lock:
+            for area in workareas:
+                table = {}
+                for position, size in self.__sections:
+                    table[repr((position, size))] = \
+                            (absolute_position(area, position),
+                             absolute_size(None, area, size, 
+                                           NO_SIZE, NO_SIZE))
+                tables[workarea_key(area)] = table
+            self.__tables = tables
+        log.debug('Built grid tables for %s sections, and %s workareas' % 
+                  (len(self.__sections), len(workareas)))
+
+    def get(self, win, workarea, position, size, width, height):
+        """Return absolute position, and sizes for the section.
+
+        Values not found in tables are computed.
+
+        """
+        if width == NO_SIZE and height == NO_SIZE:
+            key = workarea_key(workarea)
+            if self.__sections and key not in self.__tables:
+                log.debug('Workarea changed, rebuilding grid tables')
+                self.rebuild(workarea)
+            entry = self.__tables.get(key, {}).get(repr((position, size)))
+            if entry:
+                absolute, sizes = entry
+                # GeometryCycler reorders lists of sizes, return copies
+                return (absolute, Size(list(sizes.width), 
+                                       list(sizes.height)))
+        return (absolute_position(workarea, position),
+                absolute_size(win, workarea, size, width, height))
+
+    def clear(self):
+        """Remove all sections, and tables."""
+        with self.__lock:
+            self.__sections = []
+            self.__tables = {}
+
+    def __len__(self):
+        return len(self.__tables)
+
+
+TABLES = GridTables()
+
+
 class GeometryCycler(object):
 
     """Cycle window geometry."""
 
     def __init__(self, win, position, gravity, size, width, height, cycle):
         self.win_id = win.id
-        self.args = (position, gravity, size, width, height) # TODO: remove me!?
         self.gravity = gravity
         workarea = WM.workarea_geometry
-        self.position = absolute_position(workarea, position)
-        self.sizes = absolute_size(win, workarea, size, width, height)
+        self.position, self.sizes = TABLES.get(win, workarea, position, 
+                                               size, width, height)
         dummy = DummyWindow(win, self.position, self.sizes, self.gravity)
         max_geo = expand_window(dummy, dummy.gravity,
                                 sticky=False, vertical_first=cycle)
@@ -136,12 +243,148 @@ class GeometryCycler(object):
                         width, height, self.gravity)
 
 
+def geometry_tolerance(win, geometry):
+    """Return Size of allowed differences between geometry, and current one.
+
+    Requested size is adjusted to window's minimal/maximal size, and size
+    increments (WM_NORMAL_HINTS), so every edge can be moved by less than
+    size increment (plus size cut to the limits).
+
+    """
+    snapshot = WM.snapshots([win], ('extents', 'hints'))[0]
+    if snapshot is None:
+        return EXACT
+    minimal, maximal = snapshot.size_limits
+    increments = snapshot.size_increments
+    def allowed(size, minimum, maximum, increment):
+        cut = max(minimum - size, maximum and size - maximum, 0)
+        return increment + cut
+    return Size(allowed(geometry.width, minimal.width, maximal.width,
+                        increments.width),
+                allowed(geometry.height, minimal.height, maximal.height,
+                        increments.height))
+
+
+def unchanged(expected, current, tolerance=EXACT):
+    """Return True if current geometry is still the expected one.
+
+    Every edge of current geometry must be closer to expected one than
+    tolerance (see geometry_tolerance()).
+
+    """
+    return abs(current.x - expected.x) < tolerance.width and \
+           abs(current.x2 - expected.x2) < tolerance.width and \
+           abs(current.y - expected.y) < tolerance.height and \
+           abs(current.y2 - expected.y2) < tolerance.height
+
+
+class CyclerCache(object):
+
+    """Thread safe LRU cache of GeometryCyclers.
+    
+    Keeps up to size cyclers, one per window and grid arguments:
+    {(win_id, repr(args)): (args, cycler, expected), }
+    where expected are the last two geometries returned by the cycler,
+    with their tolerances: [(geometry, tolerance), ].
+
+    While WindowIndex is running cache observes it, and all cyclers of 
+    the window are dropped as soon as it is configured by someone else
+    (its geometry is not one of geometries returned by the cycler), or
+    destroyed. Without WindowIndex window's geometry is checked when 
+    cycler is used.
+
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.__lock = threading.Lock()
+        self.__cyclers = collections.OrderedDict()
+        self.__index = None
+
+    def get(self, win, args):
+        """Return cycler for window and args, or None if not cached."""
+        self.__observe()
+        with self.__lock:
+            key = (win.id, repr(args))
+            entry = self.__cyclers.pop(key, None)
+            if entry is None:
+                return None
+            self.__cyclers[key] = entry
+        cached_args, cycler, expected = entry
+        if not cached_args == args:
+            return None
+        if self.__index is None and \
+           not unchanged(expected[-1][0], win.geometry, expected[-1][1]):
+            log.debug('%s changed since last grid action' % (win,))
+            self.invalidate(win.id)
+            return None
+        return cycler
+
+    def set(self, win_id, args, cycler, geometry, tolerance=EXACT):
+        """Store cycler, and geometry returned by it (with its tolerance)."""
+        self.__observe()
+        with self.__lock:
+            key = (win_id, repr(args))
+            entry = self.__cyclers.pop(key, None)
+            expected = [(geometry, tolerance)]
+            if entry and entry[1] is cycler:
+                # ConfigureNotify for previous geometry might be pending
+                expected.insert(0, entry[2][-1])
+            self.__cyclers[key] = (args, cycler, expected)
+            while len(self.__cyclers) > self.size:
+                self.__cyclers.popitem(last=False)
+
+    def configured(self, win_id, geometry):
+        """Drop cyclers of window configured by someone else, or destroyed.
+
+        Called by WindowIndex with window's new geometry (None if window 
+        was destroyed).
+
+        """
+        with self.__lock:
+            for key, (args, cycler, expected) in self.__cyclers.items():
+                if key[0] != win_id:
+                    continue
+                if geometry is None or \
+                   not [previous for previous, allowed in expected
+                                 if unchanged(previous, geometry, allowed)]:
+                    log.debug('Dropping cycler of %s' % (win_id,))
+                    del self.__cyclers[key]
+
+    def invalidate(self, win_id):
+        """Drop all cyclers of the window."""
+        with self.__lock:
+            for key in self.__cyclers.keys():
+                if key[0] == win_id:
+                    del self.__cyclers[key]
+
+    def clear(self):
+        """Remove all cached cyclers."""
+        with self.__lock:
+            self.__cyclers.clear()
+
+    def __observe(self):
+        """Start observing running WindowIndex."""
+        index = WM.index
+        if index is self.__index:
+            return
+        if self.__index is not None:
+            self.__index.unobserve(self.configured)
+        if index is not None:
+            index.observe(self.configured)
+        self.__index = index
+
+    def __len__(self):
+        return len(self.__cyclers)
+
+
+CYCLERS = CyclerCache(CYCLERS_SIZE)
+
+
 class GridAction(Action):
 
     """Put window on given position and resize it according to grid layout."""
 
-    __cycler = None
-
     def __init__(self, name, doc, cycle):
         Action.__init__(self, name=name, doc=doc, 
                         filter=TYPE_FILTER, unshade=False)
@@ -160,20 +403,23 @@ class GridAction(Action):
             gravity = gravity.invert()
         win.set_geometry(geometry, gravity)
 
-    @classmethod
-    def get_geometry(cls, win, position, gravity, 
+    @staticmethod
+    def get_geometry(win, position, gravity, 
                      size, width, height, cycle):
         """Return new window geometry from GeometryCycler."""
-        # TODO: this should be done in action_hook,
-        #       here only existence of cycle should be checked
         # NOTE: it seems window.id are reused, when you create new window 
         #       just after closing previous it might get the same id!
-        if not cls.__cycler or \
-           not win.id == cls.__cycler.win_id or \
-           not (position, gravity, size, width, height) == cls.__cycler.args:
-            cls.__cycler = GeometryCycler(win, position, gravity, 
-                                          size, width, height, cycle)
-        return cls.__cycler.next(cycle)
+        #       CYCLERS drops cyclers of destroyed windows, and checks 
+        #       window's geometry, so it is not a problem.
+        args = (position, gravity, size, width, height)
+        cycler = CYCLERS.get(win, args)
+        if not cycler:
+            cycler = GeometryCycler(win, position, gravity, 
+                                    size, width, height, cycle)
+        geometry = cycler.next(cycle)
+        CYCLERS.set(win.id, args, cycler, geometry,
+                    geometry_tolerance(win, geometry))
+        return geometry
 
 
 GridAction('grid_width', 
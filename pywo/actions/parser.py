@@ -25,6 +25,7 @@ so it can be used like real OptionParser instance.
 
 """
 
+import collections
 import logging
 import optparse
 import shlex
@@ -41,6 +42,9 @@ log = logging.getLogger(__name__)
 
 THREAD_DATA = threading.local()
 
+# Maximal number of parsed commands kept in cache
+CACHE_SIZE = 128
+
 
 class ParserException(Exception):
 
@@ -74,13 +78,85 @@ class OptionParser(optparse.OptionParser):
         raise ParserException(msg)
 
 
+class FrozenValues(optparse.Values):
+
+    """optparse.Values that can't be changed after creation.
+    
+    Parsed options are shared between all callers parsing the same command,
+    so they must stay untouched.
+    
+    """
+
+    def __init__(self, values):
+        self.__dict__.update(values.__dict__)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Can't set attribute of %s" % 
+                             self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("Can't delete attribute of %s" % 
+                             self.__class__.__name__)
+
+
+class ParsedCache(object):
+
+    """Thread safe LRU cache of parsed commands.
+    
+    Keeps up to size parsed commands: {command: (FrozenValues, args), }
+
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.__lock = threading.Lock()
+        self.__parsed = collections.OrderedDict()
+
+    def get(self, command):
+        """Return (options, args) for command, or None if not cached.
+        
+        Every call returns new list of args, options are immutable.
+        
+        """
+        with self.__lock:
+            parsed = self.__parsed.pop(command, None)
+            if parsed is None:
+                return None
+            self.__parsed[command] = parsed
+        options, args = parsed
+        return (options, list(args))
+
+    def set(self, command, options, args):
+        """Store copy of parsed command, and return it."""
+        parsed = (FrozenValues(options), tuple(args))
+        with self.__lock:
+            self.__parsed.pop(command, None)
+            self.__parsed[command] = parsed
+            while len(self.__parsed) > self.size:
+                self.__parsed.popitem(last=False)
+        options, args = parsed
+        return (options, list(args))
+
+    def clear(self):
+        """Remove all cached commands."""
+        with self.__lock:
+            self.__parsed.clear()
+
+    def __len__(self):
+        return len(self.__parsed)
+
+
 option_list = OptionParser.OPTION_LIST
 
+CACHE = ParsedCache(CACHE_SIZE)
+
 
 def add_option(*args, **kwargs):
     """Add new option to actions.parser."""
     option = optparse.make_option(*args, **kwargs)
     OptionParser.OPTION_LIST.append(option)
+    # commands parsed earlier might be parsed differently now
+    CACHE.clear()
 
 
 def parse_args(args, values=None):
@@ -90,9 +166,24 @@ def parse_args(args, values=None):
     To provide thread safety there's separate OptionParser instance for 
     every thread.
 
+    Results of parsing commands given as strings are cached, and returned 
+    options are immutable (FrozenValues). 
+    If values are provided, command is always parsed.
+
     """
+    if type(args) is types.StringType and values is None:
+        parsed = CACHE.get(args)
+        if parsed:
+            return parsed
+        options, largs = __parse_args(shlex.split(args))
+        return CACHE.set(args, options, largs)
     if type(args) is types.StringType:
         args = shlex.split(args)
+    return __parse_args(args, values)
+
+
+def __parse_args(args, values=None):
+    """Parse list of arguments using OptionParser for current thread."""
     if not hasattr(THREAD_DATA, 'parser'):
         THREAD_DATA.parser = OptionParser(conflict_handler='resolve')
     return THREAD_DATA.parser.parse_args(args, values)
@@ -212,6 +303,24 @@ add_option('-s', '--size',
            help='[default: current size]',
            metavar='WIDTH HEIGHT')
 
+#
+# Recently active windows
+#
+add_option('-n', '--recent',
+           action='store', dest='recent', type='int',
+           help='use N-th recently active window [default: 1 - previous]',
+           metavar='N')
+
+#
+# Arrange windows
+#
+add_option('--layout',
+           action='store', dest='layout', type='string',
+           help='layout used to arrange windows: grid, columns, pack')
+add_option('--filter',
+           action='store', dest='filter', type='string',
+           help='windows to be arranged: standard, normal, desktop')
+
 '''
 # TODO: To be used with move, resize actions
 add_option('-x',
@@ -23,8 +23,9 @@
 import logging
 import operator
 
-from pywo.core import WindowManager
+from pywo.core import Window, WindowManager
 from pywo.core import filters
+from pywo.core.rectangles import Rectangles, select
 
 
 __author__ = "Wojciech 'KosciaK' Pietrzok"
@@ -41,6 +42,7 @@ _ATTRGETTERS = {'x': (operator.attrgetter('x'),
                       operator.attrgetter('y2'),
                       operator.attrgetter('height'))}
 
+
 class Resizer(object):
 
     """Resizer finds new geometry for window.
@@ -55,7 +57,7 @@ class Resizer(object):
         These methods must accept arguments:
         current - current window geometry
         workarea - workarea geometry
-        windows - list of window's geometries
+        windows - geometries of other windows placed in the same axis
         axis - name of axis ('x', or 'y')
         sticky
         insideout
@@ -70,36 +72,64 @@ class Resizer(object):
         #TODO: add limit? and use limit geometry instead of workarea?
         current = win.geometry
         workarea = WM.workarea_geometry
-        windows = [window.geometry for window 
-                                   in WM.windows(filters.STANDARD_ON_WORKAREA) 
-                                   if window.id != win.id]
+        if WM.index is not None:
+            windows_in_axis = self.__indexed(win, workarea)
+        else:
+            windows_in_axis = self.__scanned(win)
         axis_order = [['x', 'y'], ['y', 'x']]
         for axis in axis_order[vertical_first]:
             self.__horizontal_vertical(axis, 
-                                       current, workarea, windows, 
+                                       current, workarea, windows_in_axis, 
                                        direction, sticky, insideout)
         return current
 
-    def __windows_in_axis(self, windows, current, 
+    def __indexed(self, win, workarea):
+        """Return windows_in_axis function using running WindowIndex.
+
+        Edges of all windows are kept up to date by WindowIndex, only types 
+        and states of windows found in axis are fetched.
+
+        """
+        def windows_in_axis(axis, start, end, touching):
+            found = WM.index.windows_in_axis(axis, start, end, 
+                                             touching, workarea)
+            found.pop(win.id, None)
+            windows = filters.STANDARD.select(
+                            [Window(win_id) for win_id in found])
+            return [found[window.id] for window in windows]
+        return windows_in_axis
+
+    def __scanned(self, win):
+        """Return windows_in_axis function checking all windows' edges.
+
+        Geometries are fetched once, and checked in each axis using single
+        Rectangles.in_axis() call.
+
+        """
+        geometries = [window.geometry for window 
+                      in WM.windows(filters.STANDARD_ON_WORKAREA) 
+                      if window.id != win.id]
+        edges = Rectangles(geometries)
+        def windows_in_axis(axis, start, end, touching):
+            return select(geometries, 
+                          edges.in_axis(axis, start, end, touching))
+        return windows_in_axis
+
+    def __windows_in_axis(self, windows_in_axis, current, 
                           axis, sticky=True):
         """Return geometries of windows placed in x or y axis to current window.
 
         Return windows which at least one edge is between right/left or
         top/bottom edge of current window, or current window is between
-        other window's edges.
+        other window's edges. If sticky windows touching current window's 
+        edges are also returned.
 
         """
         xy, xy2, size = _ATTRGETTERS[axis]
-        return [other for other in windows
-                if (sticky and \
-                    (xy(current) <= xy(other) <= xy2(current) or \
-                     xy(current) <= xy2(other) <= xy2(current))) or \
-                   (xy(current) <= xy(other) < xy2(current) or \
-                    xy(current) < xy2(other) <= xy2(current)) or \
-                   xy(other) < xy(current) < xy2(other)]
+        return windows_in_axis(axis, xy(current), xy2(current), sticky)
 
     def __horizontal_vertical(self, axis,
-                              current, workarea, windows,
+                              current, workarea, windows_in_axis,
                               direction, sticky, insideout):
         """Set left and right, or top and bottom edges of new window's position."""
         xy, xy2, size = _ATTRGETTERS[axis]
@@ -110,7 +140,7 @@ class Resizer(object):
                 max(xy(current), xy(workarea)))
         setattr(current, size, 
                 min(xy2(current), xy2(workarea)) - xy(current))
-        in_axis = self.__windows_in_axis(windows, current, 
+        in_axis = self.__windows_in_axis(windows_in_axis, current, 
                                          opposite_axis, sticky)
         if (axis == 'x' and direction.is_left) or \
            (axis == 'y' and direction.is_top):
@@ -90,6 +90,12 @@ parser.add_option('--config',
 parser.add_option('--daemon',
                   action='store_true', dest='start_daemon', default=False,
                   help='run PyWO in daemon mode [default: %default]')
+parser.add_option('--explain',
+                  action='store_true', dest='explain', default=False,
+                  help='perform ACTION and print X requests it sent')
+parser.add_option('--record',
+                  dest='record', metavar='FILE',
+                  help='record X events, and actions to FILE (daemon mode)')
 parser.add_option('--windows',
                   action='store_true', dest='list_windows', default=False,
                   help='list all windows: <id> <desktop> <state> <name>')
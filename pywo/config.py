@@ -20,8 +20,10 @@
 
 """config.py - loading and storing configuration data."""
 
+import cPickle
 import logging
 import os
+import tempfile
 from ConfigParser import ConfigParser
 
 from pywo.core import Gravity, Size
@@ -32,6 +34,76 @@ __author__ = "Wojciech 'KosciaK' Pietrzok"
 
 log = logging.getLogger(__name__)
 
+# File with parsed configuration, set to None to turn off caching
+CACHE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                          os.path.join(os.path.expanduser('~'), '.cache'),
+                          'pywo', 'config.cache')
+# Change it if format of cached Config changes
+CACHE_VERSION = 1
+
+
+def files_state(paths):
+    """Return list of (path, mtime, size) for given paths.
+
+    For paths that doesn't exist mtime and size are None, so creating
+    new file is also detected.
+
+    """
+    state = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            state.append((path, stat.st_mtime, stat.st_size))
+        except OSError:
+            state.append((path, None, None))
+    return state
+
+
+def load_cached(filename):
+    """Return cached Config's attributes, or None if cache is not valid."""
+    if not CACHE_PATH:
+        return None
+    try:
+        with open(CACHE_PATH, 'rb') as cache_file:
+            version, cached = cPickle.load(cache_file)
+    except Exception, exc:
+        log.debug('No valid config cache: %s' % (exc,))
+        return None
+    if version != CACHE_VERSION or filename not in cached:
+        return None
+    files, attributes = cached[filename]
+    if files_state([path for path, mtime, size in files]) != files:
+        log.debug('Configuration files changed since cached')
+        return None
+    return attributes
+
+
+def store_cached(filename, paths, attributes):
+    """Store Config's attributes, and state of files used to load it."""
+    if not CACHE_PATH:
+        return
+    cached = {}
+    try:
+        with open(CACHE_PATH, 'rb') as cache_file:
+            version, cached = cPickle.load(cache_file)
+        if version != CACHE_VERSION:
+            cached = {}
+    except Exception:
+        pass
+    cached[filename] = (files_state(paths), attributes)
+    try:
+        directory = os.path.dirname(CACHE_PATH)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # write to temporary file first, so cache is never left broken
+        handle, path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, 'wb') as cache_file:
+            cPickle.dump((CACHE_VERSION, cached), cache_file,
+                         cPickle.HIGHEST_PROTOCOL)
+        os.rename(path, CACHE_PATH)
+    except Exception, exc:
+        log.debug("Can't store config cache %s: %s" % (CACHE_PATH, exc))
+
 
 class _Section(object):
 
@@ -59,6 +131,22 @@ class _Section(object):
         self.size = Size.parse(data.get('widths', ''), 
                                data.get('heights', ''))
 
+    def __eq__(self, other):
+        if (self.key, self.ignored) != (other.key, other.ignored):
+            return False
+        for name in ['gravity', 'direction', 'position', 'size']:
+            value, other_value = getattr(self, name), getattr(other, name)
+            # Gravity and Size can't be compared with None
+            if value is None or other_value is None:
+                if value is not other_value:
+                    return False
+            elif value != other_value:
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self == other
+
 
 class Config(object):
 
@@ -74,6 +162,7 @@ class Config(object):
         self.ignored = set()
         self.sections = {} # {section.name: section, }
         self.aliases = {} # {alias: section|action, }
+        self.settings = {} # {setting_name: value, }
         self.filename = filename
         self.load(filename)
 
@@ -82,28 +171,51 @@ class Config(object):
         for key, value in self._config.items('SETTINGS'):
             value = value.lower()
             if value in ['1', 'yes', 'on', 'true']:
-                setattr(self, key, self.ON)
+                self.settings[key] = self.ON
             elif value == 'ignore':
-                setattr(self, key, self.IGNORE)
+                self.settings[key] = self.IGNORE
             elif value:
-                setattr(self, key, self.OFF)
+                self.settings[key] = self.OFF
+        for key, value in self.settings.items():
+            setattr(self, key, value)
 
     def load(self, filename):
-        """Load configuration file"""
+        """Load configuration file.
+
+        If files used to load configuration haven't changed since last time,
+        parsed configuration is loaded from cache (see CACHE_PATH).
+
+        """
         log.debug('Loading configuration file %s' % filename)
+        cached = load_cached(filename)
+        if cached is not None:
+            self.__dict__.update(cached)
+            log.debug('Loaded cached configuration')
+            return
+        paths = self.__load(filename)
+        attributes = dict([(name, value)
+                           for name, value in self.__dict__.items()
+                           if name != '_config'])
+        store_cached(filename, paths, attributes)
+
+    def __load(self, filename):
+        """Load and parse configuration files, return list of paths used."""
         self.filename = filename
         # Load config file (load default first)
-        self._config.read(
-            [os.path.join('/', 'etc', 'pywo', 'pyworc'),
-             os.path.join(os.path.dirname(__file__), '..', 'etc', 'pyworc'),])
+        paths = [os.path.join('/', 'etc', 'pywo', 'pyworc'),
+                 os.path.join(os.path.dirname(__file__), '..', 'etc',
+                              'pyworc'),]
+        self._config.read(paths)
         if self.filename:
             # If filename provided use it instead of default location in ~/
+            paths.append(self.filename)
             self._config.read(self.filename)
         else:
-            self._config.read(
-                [os.path.join(os.path.expanduser('~'), '.config', 
-                              'pywo', 'pyworc'),
-                 os.path.join(os.path.expanduser('~'), '.pyworc'),])
+            user_paths = [os.path.join(os.path.expanduser('~'), '.config',
+                                       'pywo', 'pyworc'),
+                          os.path.join(os.path.expanduser('~'), '.pyworc'),]
+            paths.extend(user_paths)
+            self._config.read(user_paths)
         # Get keys settings
         self.keys = dict(self._config.items('KEYS'))
         self._config.remove_section('KEYS')
@@ -116,8 +228,8 @@ class Config(object):
         if self._config.has_option('SETTINGS', 'layout'):
             # Load layout definition
             layout = self._config.get('SETTINGS', 'layout')
-            self._config.read(
-                [os.path.join('/', 'etc', 'pywo', 'layouts', layout),
+            layout_paths = [
+                 os.path.join('/', 'etc', 'pywo', 'layouts', layout),
                  os.path.join('/', 'etc', 'pywo', layout),
                  os.path.join(os.path.dirname(__file__), '..', 'etc', layout),
                  os.path.join(os.path.dirname(__file__), '..', 'etc', 
@@ -126,7 +238,9 @@ class Config(object):
                               'pywo', 'layouts', layout),
                  os.path.join(os.path.expanduser('~'), '.config', 
                               'pywo', layout),
-                 os.path.join(os.path.expanduser('~'), layout)])
+                 os.path.join(os.path.expanduser('~'), layout)]
+            paths.extend(layout_paths)
+            self._config.read(layout_paths)
             self._config.remove_option('SETTINGS', 'layout')
         self.ignored = set()
         if self._config.has_option('SETTINGS', 'ignore_actions'):
@@ -136,6 +250,7 @@ class Config(object):
             self._config.remove_option('SETTINGS', 'ignore_actions')
         if 'grid' in self.ignored:
             self.ignored.update('grid_width', 'grid_height')
+        self.settings = {}
         self.__parse_settings()
         self._config.remove_section('SETTINGS')
         # Parse every section
@@ -149,6 +264,16 @@ class Config(object):
             self._config.remove_section(section)
 
         log.debug('Loaded configuration file')
+        return paths
+
+    def __eq__(self, other):
+        return (self.keys, self.ignored, self.settings, self.aliases,
+                self.sections) == \
+               (other.keys, other.ignored, other.settings, other.aliases,
+                other.sections)
+
+    def __ne__(self, other):
+        return not self == other
 
     def section(self, name):
         """Return Section with given name."""
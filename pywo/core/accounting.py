@@ -0,0 +1,204 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""accounting.py - counting, and timing requests sent to X Server.
+
+Every request sent by core.xlib, and core.windows goes through call(),
+which counts it (by request kind) in STATISTICS, and records it in
+current thread's Trace, if tracing was started with start_trace().
+
+"""
+
+import logging
+import threading
+import time
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+# Requests waiting for reply from X Server (round trips)
+REPLY = frozenset(['GetProperty', 'GetGeometry', 'QueryTree',
+                   'TranslateCoords', 'InternAtom', 'GetAtomName',
+                   'GetWindowAttributes', 'GetInputFocus',
+                   'XineramaQueryScreens', 'Pipeline'])
+
+# Number of most often fetched properties listed in Trace report
+TOP_PROPERTIES = 5
+
+
+class Statistics(object):
+
+    """Number, and total time of requests sent to X Server by kind."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__requests = {} # {kind: [number, seconds], }
+
+    def add(self, kind, seconds):
+        """Add request of given kind."""
+        with self.__lock:
+            counters = self.__requests.setdefault(kind, [0, 0.0])
+            counters[0] += 1
+            counters[1] += seconds
+
+    def requests(self):
+        """Return {kind: (number, seconds), }."""
+        with self.__lock:
+            return dict([(kind, tuple(counters))
+                         for kind, counters in self.__requests.items()])
+
+    def clear(self):
+        """Reset all counters."""
+        with self.__lock:
+            self.__requests.clear()
+
+    def report(self):
+        """Return list of lines with requests by kind, most often first."""
+        requests = sorted(self.requests().items(),
+                          key=lambda item: item[1][0], reverse=True)
+        return ['%-22s %8d %10.1fms' % (kind, number, seconds * 1000)
+                for kind, (number, seconds) in requests]
+
+
+class Trace(object):
+
+    """Sequence of requests sent to X Server while tracing.
+
+    Every request is stored as (kind, detail, seconds, round_trip) tuple.
+    For GetProperty, and InternAtom detail is name of the atom.
+
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.started = time.time()
+        self.stopped = None
+
+    def add(self, kind, detail=None, seconds=0, round_trip=None):
+        """Add request, if round_trip is None it's guessed from kind."""
+        if round_trip is None:
+            round_trip = kind in REPLY
+        self.requests.append((kind, detail, seconds, round_trip))
+
+    def stop(self):
+        """Stop measuring wall time."""
+        self.stopped = time.time()
+
+    @property
+    def round_trips(self):
+        """Return number of requests that waited for reply."""
+        return len([request for request in self.requests if request[3]])
+
+    @property
+    def wall_time(self):
+        """Return time from start of tracing in seconds."""
+        return (self.stopped or time.time()) - self.started
+
+    def kinds(self):
+        """Return {kind: (number, seconds), }."""
+        kinds = {}
+        for kind, detail, seconds, round_trip in self.requests:
+            number, total = kinds.get(kind, (0, 0))
+            kinds[kind] = (number + 1, total + seconds)
+        return kinds
+
+    def properties(self):
+        """Return {property name: number of GetProperty requests, }."""
+        properties = {}
+        for kind, detail, seconds, round_trip in self.requests:
+            if kind == 'GetProperty':
+                properties[detail] = properties.get(detail, 0) + 1
+        return properties
+
+    def report(self, atom_name=None):
+        """Return list of lines with request sequence, and summary.
+
+        atom_name - function used to show names instead of atoms in details
+
+        """
+        lines = []
+        for number, request in enumerate(self.requests):
+            kind, detail, seconds, round_trip = request
+            if atom_name and isinstance(detail, (int, long)):
+                detail = atom_name(detail)
+            lines.append('%4d %8.2fms %s %s %s' %
+                         (number + 1, seconds * 1000,
+                          [' ', '*'][round_trip], kind, detail or ''))
+        lines.append('Requests by kind:')
+        for kind, (number, seconds) in sorted(self.kinds().items(),
+                                              key=lambda item: item[1][0],
+                                              reverse=True):
+            lines.append('  %-22s %6d %10.2fms' %
+                         (kind, number, seconds * 1000))
+        properties = sorted(self.properties().items(),
+                            key=lambda item: item[1], reverse=True)
+        if properties:
+            lines.append('Most often fetched properties: %s' %
+                         ', '.join(['%s x%s' % (name, number)
+                                    for name, number
+                                    in properties[:TOP_PROPERTIES]]))
+        x_time = sum([request[2] for request in self.requests])
+        lines.append('Requests: %s, round trips (*): %s, '
+                     'X time: %.2fms, wall time: %.2fms' %
+                     (len(self.requests), self.round_trips,
+                      x_time * 1000, self.wall_time * 1000))
+        return lines
+
+
+STATISTICS = Statistics()
+
+__THREAD_DATA = threading.local()
+
+
+def start_trace():
+    """Start tracing requests sent by current thread, return Trace."""
+    trace = Trace()
+    __THREAD_DATA.trace = trace
+    return trace
+
+
+def stop_trace():
+    """Stop tracing requests sent by current thread, return Trace or None."""
+    trace = getattr(__THREAD_DATA, 'trace', None)
+    __THREAD_DATA.trace = None
+    if trace:
+        trace.stop()
+    return trace
+
+
+def add(kind, detail=None, seconds=0, round_trip=None):
+    """Count request sent without call() (for example pipelined one)."""
+    STATISTICS.add(kind, seconds)
+    trace = getattr(__THREAD_DATA, 'trace', None)
+    if trace is not None:
+        trace.add(kind, detail, seconds, round_trip)
+
+
+def call(kind, detail, function, *args, **kwargs):
+    """Call function sending request of given kind, and count it."""
+    start = time.time()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        add(kind, detail, time.time() - start)
+
@@ -132,18 +132,22 @@ class Size(object):
 
     """Size encapsulates width and height of the object."""
 
-    # Pattern matching simple calculations with floating numbers
-    __PATTERN = re.compile('^[ 0-9\.\+-/\*]+$')
+    # Tokens of simple calculations with floating numbers and named sizes
+    __TOKENS = re.compile(r'\s*(?:(\d+\.?\d*|\.\d+)|([A-Z_]+)|([-+*/]))')
 
     # Predefined sizes that can be used in config files
-    __SIZES = {'FULL': '1.0',
-               'HALF': '0.5',
-               'THIRD': '1.0/3',
-               'QUARTER': '0.25', }
-    __SIZES_SHORT = {'F': '1.0',
-                     'H': '0.5',
-                     'T': '1.0/3',
-                     'Q': '0.25', }
+    __SIZES = {'FULL': 1.0,
+               'HALF': 0.5,
+               'THIRD': 1.0/3,
+               'QUARTER': 0.25, }
+    __SIZES_SHORT = {'F': 1.0,
+                     'H': 0.5,
+                     'T': 1.0/3,
+                     'Q': 0.25, }
+
+    # Already parsed values {size_string: value, }
+    __PARSED = {}
+    __PARSED_LIMIT = 1024
 
     def __init__(self, width, height):
         self.width = width
@@ -167,19 +171,90 @@ class Size(object):
         """
         if not size_string.strip():
             return None
-        size = size_string
-        for name, value in cls.__SIZES.items():
-            size = size.replace(name, value)
-        for name, value in cls.__SIZES_SHORT.items():
-            size = size.replace(name, value)
-        size = [eval(value) for value in size.split(',')
-                            if value.strip() and \
-                            cls.__PATTERN.match(value)]
-        if size == []:
-            raise ValueError('Can\'t parse: %s' % (size_string))
+        if size_string in cls.__PARSED:
+            size = cls.__PARSED[size_string]
+        else:
+            size = [cls.__evaluate(value, size_string) 
+                    for value in size_string.split(',') if value.strip()]
+            if len(cls.__PARSED) >= cls.__PARSED_LIMIT:
+                cls.__PARSED.clear()
+            cls.__PARSED[size_string] = size
         if len(size) == 1:
             return size[0]
-        return size
+        return list(size)
+
+    @classmethod
+    def __tokenize(cls, expression, size_string):
+        """Return list of tokens: floats and operators."""
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = cls.__TOKENS.match(expression, position)
+            if not match:
+                raise ValueError('Can\'t parse: %s' % (size_string))
+            number, name, operator = match.groups()
+            if number:
+                tokens.append(float(number))
+            elif name in cls.__SIZES:
+                tokens.append(cls.__SIZES[name])
+            elif name in cls.__SIZES_SHORT:
+                tokens.append(cls.__SIZES_SHORT[name])
+            elif operator:
+                tokens.append(operator)
+            else:
+                raise ValueError('Can\'t parse: %s' % (size_string))
+            position = match.end()
+        return tokens
+
+    @classmethod
+    def __evaluate(cls, expression, size_string):
+        """Evaluate expression with + - * / operators and named sizes.
+
+        expression := term (('+'|'-') term)*
+        term       := factor (('*'|'/') factor)*
+        factor     := ('+'|'-') factor | number | name
+
+        """
+        tokens = cls.__tokenize(expression, size_string)
+        tokens.reverse() # so next token can be pop()'ed
+
+        def error():
+            raise ValueError('Can\'t parse: %s' % (size_string))
+
+        def factor():
+            if not tokens:
+                error()
+            token = tokens.pop()
+            if token == '-':
+                return -factor()
+            if token == '+':
+                return factor()
+            if not isinstance(token, float):
+                error()
+            return token
+
+        def term():
+            value = factor()
+            while tokens and tokens[-1] in ('*', '/'):
+                if tokens.pop() == '*':
+                    value *= factor()
+                else:
+                    divisor = factor()
+                    if not divisor:
+                        error()
+                    value /= divisor
+            return value
+
+        value = term()
+        while tokens and tokens[-1] in ('+', '-'):
+            if tokens.pop() == '+':
+                value += term()
+            else:
+                value -= term()
+        if tokens:
+            error()
+        return value
     
     @staticmethod
     def parse(width, height):
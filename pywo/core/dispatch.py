@@ -22,7 +22,8 @@
 
 import logging
 import threading
-import time
+
+from pywo.core import profiling
 
 
 __author__ = "Wojciech 'KosciaK' Pietrzok"
@@ -37,7 +38,9 @@ class EventDispatcher(threading.Thread):
 
     EventDispatcher will run in separate thread. Thread is not started 
     until first EventHandler is registered, and stopped when there are no
-    handlers left.
+    handlers left (after next event is received, as it is blocked waiting 
+    for it). If loop is set (see core.loop) events are dispatched by the 
+    loop, and thread is not used at all.
 
     """
 
@@ -47,21 +50,47 @@ class EventDispatcher(threading.Thread):
         self.__display = display
         self.__root = display.screen().root
         self.__handlers = {} # {event.type: {window.id: set([handler, ]), }, }
+        # records all dispatched events if set (see core.recording)
+        self.recorder = None
+        # core.loop.Loop reading, and dispatching events if set
+        self.loop = None
 
     def run(self):
-        """Main loop - perform event queue checking.
+        """Main loop - wait for events and dispatch them.
 
-        Every 100ms check event queue for pending events and dispatch them.
+        Thread blocks until next event is received, so there are no 
+        periodic wake-ups. With Xlib.threaded events read by other threads
+        (while waiting for replies) wake it up as well.
         If there are no registered handlers stop running.
 
         """
         log.debug('EventDispatcher started')
-        while self.__handlers:
-            while self.__display.pending_events():
-                self.__dispatch(self.__display.next_event())
-            time.sleep(0.1)
+        while self.__handlers and self.loop is None:
+            event = self.__display.next_event()
+            # mocked Display has no events, and returns None
+            if event is not None:
+                self.__dispatch(event)
         log.debug('EventDispatcher stopped')
 
+    def dispatch_pending(self):
+        """Dispatch all events waiting in the queue."""
+        while self.__display.pending_events():
+            self.__dispatch(self.__display.next_event())
+
+    def set_loop(self, loop):
+        """Dispatch events in given core.loop.Loop, or own thread if None.
+
+        Loop should be set before first handler is registered, as running 
+        thread can't be stopped before all handlers are unregistered.
+
+        """
+        if self.loop is not None:
+            self.loop.remove_poller(self.dispatch_pending)
+        self.loop = loop
+        if loop is not None:
+            # loop reads the connection, and calls pollers before waiting
+            loop.add_poller(self.dispatch_pending)
+
     def register(self, window, handler):
         """Register event handler and return new window's event mask."""
         log.debug('Registering %s for %s' % (handler, window))
@@ -69,7 +98,7 @@ class EventDispatcher(threading.Thread):
             type_handlers = self.__handlers.setdefault(event_type, {})
             win_handlers = type_handlers.setdefault(window.id, set())
             win_handlers.add(handler)
-        if not self.isAlive():
+        if self.loop is None and not self.isAlive():
             self.start()
         return self.__get_masks(window.id)
 
@@ -125,6 +154,8 @@ class EventDispatcher(threading.Thread):
             event.window - the window that has been changed
 
         """
+        if self.recorder is not None:
+            self.recorder.event(event)
         if not event.type in self.__handlers:
             # Just skip unwanted events types
             return
@@ -139,5 +170,7 @@ class EventDispatcher(threading.Thread):
         if self.__root in type_handlers:
             handlers.extend(type_handlers[self.__root])
         for handler in handlers:
-            handler.handle_event(event)
+            # compare event's atoms, windows, etc. before wrapping it
+            if handler.accepts(event):
+                profiling.run(handler.handle_event, event)
 
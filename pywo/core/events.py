@@ -81,6 +81,15 @@ class EventHandler(object):
         """Return set of EventHandler's event types."""
         return self.__mapping.keys()
 
+    def accepts(self, event):
+        """Return True if raw X event should be handled.
+
+        It is checked before event is wrapped into Event object, so it 
+        should be cheap, and must not query X Server.
+
+        """
+        return True
+
     def handle_event(self, event):
         """Wrap raw X event into Event object and call handler method."""
         event_type, handler_method = self.__mapping[event.type]
@@ -106,6 +115,7 @@ class KeyEvent(Event):
     def __init__(self, event):
         Event.__init__(self, event)
         self.modifiers, self.keycode = self.__get_modifiers_keycode(event)
+        self.time = event.time # X Server timestamp in milliseconds
 
     def __get_modifiers_keycode(self, event):
         """Return modifiers mask and keycode of this event."""
@@ -170,6 +180,20 @@ class KeyHandler(EventHandler):
             window.ungrab_key(mask, code, self.numlock, self.capslock)
         window.unregister(self)
 
+    def regrab_keys(self, window, old_keys):
+        """Ungrab keys no longer used, and grab only new keys.
+
+        Keys present in both old_keys and self.keys stay grabbed, 
+        handler stays registered.
+
+        """
+        keys = set(self.keys)
+        old_keys = set(old_keys)
+        for mask, code in old_keys - keys:
+            window.ungrab_key(mask, code, self.numlock, self.capslock)
+        for mask, code in keys - old_keys:
+            window.grab_key(mask, code, self.numlock, self.capslock)
+
 
 class FocusEvent(Event):
 
@@ -322,14 +346,25 @@ class PropertyNotifyHandler(EventHandler):
 
     """Hanlder for X.PropertyNotify events."""
 
-    def __init__(self, property=None):
+    def __init__(self, property=None, atoms=None):
         """
         property - function that will handle events
+        atoms - names (or atoms) of properties of interest, 
+                if None changes of all properties are handled
         """
         EventHandler.__init__(self, [X.PropertyChangeMask], 
                               {X.PropertyNotify: (PropertyNotifyEvent, 
                                                   self.property)})
         self.__property = property
+        self.atoms = None
+        if atoms is not None:
+            self.atoms = frozenset([Window.atom(atom) 
+                                    if isinstance(atom, basestring) else atom
+                                    for atom in atoms])
+
+    def accepts(self, event):
+        """Return True if event's atom is one of atoms of interest."""
+        return self.atoms is None or event.atom in self.atoms
 
     def property(self, event):
         """Handle PropertyNotifyEvent generated by X.PropertyNotify event."""
@@ -23,6 +23,7 @@
 import logging
 
 from pywo.core import Window, WindowManager, Type, State
+from pywo.core.rectangles import Rectangles, select
 
 
 __author__ = "Wojciech 'KosciaK' Pietrzok"
@@ -31,10 +32,73 @@ __author__ = "Wojciech 'KosciaK' Pietrzok"
 log = logging.getLogger(__name__)
 
 
-class IncludeType(object):
+class Filter(object):
+
+    """Base class for window filters.
+
+    Filter declares which window's attributes (fields) it uses, so these can 
+    be fetched for all checked windows at once. Values common for all 
+    windows (like current desktop) are read once, when filter is compiled.
+    Subclasses override __call__(), or compile() if they read such values.
+
+    """
+
+    # Window's attributes used by filter
+    fields = ()
+
+    def compile(self):
+        """Return predicate accepting window, with root window values read."""
+        return self
+
+    def narrow(self, index):
+        """Return set of candidate windows' ids found using WindowIndex.
+
+        None is returned if index can't be used by this filter.
+
+        """
+        return None
+
+    def select(self, windows):
+        """Return windows matching the filter.
+
+        Fields needed by filter are fetched for all windows using single 
+        prefetch, and filter is compiled only once.
+
+        """
+        snapshots = WindowManager().snapshots(windows, self.fields)
+        found = [(window, snapshot) 
+                 for window, snapshot in zip(windows, snapshots) if snapshot]
+        mask = self.mask([snapshot for window, snapshot in found])
+        return [window for window, snapshot in select(found, mask)]
+
+    def mask(self, windows):
+        """Return list of booleans, True for windows matching the filter."""
+        predicate = self.compile()
+        return [predicate(window) for window in windows]
+
+    def __call__(self, window):
+        """Return True if window matches the filter."""
+        predicate = self.compile()
+        if predicate is self:
+            # neither __call__(), nor compile() is overridden
+            raise TypeError('%s must override __call__(), or compile()' %
+                            self.__class__.__name__)
+        return predicate(window)
+
+
+def compile_filter(filter):
+    """Return predicate for filter, or filter itself if it is not a Filter."""
+    if isinstance(filter, Filter):
+        return filter.compile()
+    return filter
+
+
+class IncludeType(Filter):
 
     """Return only windows with any of specified types."""
 
+    fields = ('type',)
+
     def __init__(self, *types):
         self.allowed_types = types
 
@@ -47,10 +111,12 @@ class IncludeType(object):
         return False
 
 
-class ExcludeType(object):
+class ExcludeType(Filter):
 
     """Return only windows without specified types."""
 
+    fields = ('type',)
+
     def __init__(self, *types):
         self.not_allowed_types = types
 
@@ -62,10 +128,12 @@ class ExcludeType(object):
         return True
 
 
-class IncludeState(object):
+class IncludeState(Filter):
 
     """Return only windows with any of specified states."""
 
+    fields = ('state',)
+
     def __init__(self, *states):
         self.allowed_states = states
 
@@ -77,10 +145,12 @@ class IncludeState(object):
         return False
 
 
-class ExcludeState(object):
+class ExcludeState(Filter):
 
     """Return only windows without specified types."""
 
+    fields = ('state',)
+
     def __init__(self, *states):
         self.not_allowed_states = states
 
@@ -92,50 +162,110 @@ class ExcludeState(object):
         return True
 
 
-class Desktop(object):
+class Desktop(Filter):
 
     """Return only windows on specified (or current) desktop."""
 
+    fields = ('desktop',)
+
     def __init__(self, desktop=None):
         self.desktop = desktop
 
-    def __call__(self, window):
+    def compile(self):
         desktop = self.desktop or WindowManager().desktop
-        win_desktop = window.desktop
-        return win_desktop == desktop or \
-               win_desktop == Window.ALL_DESKTOPS
+        def on_desktop(window):
+            win_desktop = window.desktop
+            return win_desktop == desktop or \
+                   win_desktop == Window.ALL_DESKTOPS
+        return on_desktop
+
+    def narrow(self, index):
+        return index.windows_ids(self.desktop or None)
 
 
 class Workarea(Desktop):
 
     """Return only windows on current workarea."""
 
+    fields = ('desktop', 'geometry')
+
     def __init__(self):
         Desktop.__init__(self)
 
-    def __call__(self, window):
-        if not Desktop.__call__(self, window):
-            return False
+    def compile(self):
+        on_desktop = Desktop.compile(self)
         workarea = WindowManager().workarea_geometry
-        geometry = window.geometry
-        return geometry.x < workarea.x2 and \
-               geometry.x2 > workarea.x and \
-               geometry.y < workarea.y2 and \
-               geometry.y2 > workarea.y
+        def on_workarea(window):
+            if not on_desktop(window):
+                return False
+            geometry = window.geometry
+            return geometry.x < workarea.x2 and \
+                   geometry.x2 > workarea.x and \
+                   geometry.y < workarea.y2 and \
+                   geometry.y2 > workarea.y
+        return on_workarea
+
+    def mask(self, windows):
+        """Return mask with workarea checked for all windows at once."""
+        on_desktop = Desktop.compile(self)
+        candidates = [number for number, window in enumerate(windows)
+                             if on_desktop(window)]
+        geometries = [windows[number].geometry for number in candidates]
+        workarea = WindowManager().workarea_geometry
+        on_workarea = set(select(candidates, 
+                                 Rectangles(geometries).overlap(workarea)))
+        return [number in on_workarea for number in range(len(windows))]
 
+    def narrow(self, index):
+        return index.windows_ids(area=index.workarea)
 
-class AND(object):
+
+class AND(Filter):
 
     """Combine filters."""
 
     def __init__(self, *filters):
         self.filters = filters
-
-    def __call__(self, window):
+        fields = set()
+        for filter in filters:
+            fields.update(getattr(filter, 'fields', ()))
+        self.fields = tuple(sorted(fields))
+
+    def compile(self):
+        predicates = [compile_filter(filter) for filter in self.filters]
+        def all_match(window):
+            for predicate in predicates:
+                if not predicate(window):
+                    return False
+            return True
+        return all_match
+
+    def mask(self, windows):
+        """Return mask of filters applied one by one to matching windows."""
+        candidates = range(len(windows))
         for filter in self.filters:
-            if not filter(window):
-                return False
-        return True
+            checked = [windows[number] for number in candidates]
+            if isinstance(filter, Filter):
+                mask = filter.mask(checked)
+            else:
+                mask = [filter(window) for window in checked]
+            candidates = select(candidates, mask)
+        candidates = set(candidates)
+        return [number in candidates for number in range(len(windows))]
+
+    def narrow(self, index):
+        indexed = None
+        for filter in self.filters:
+            if not hasattr(filter, 'narrow'):
+                continue
+            ids = filter.narrow(index)
+            if ids is None:
+                continue
+            if indexed is None:
+                indexed = ids
+            else:
+                indexed = indexed & ids
+        return indexed
 
 
 ALL_FILTER = lambda window: True # accept all windows
@@ -0,0 +1,544 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""index.py - index of client windows kept up to date using X events.
+
+WindowIndex maps desktops to sets of windows' ids, and keeps windows' 
+geometries as Rectangles (NumPy array if available, and there are many
+windows), so windows on given desktop or workarea can be found without 
+asking X Server for properties of every single window. It also keeps lowercase
+names and class names of windows, with trigrams index for substring search,
+and EdgeIndex of windows' edges used to find windows placed in given axis.
+
+"""
+
+import bisect
+import heapq
+import logging
+import operator
+import threading
+
+from pywo.core.events import PropertyNotifyHandler, ConfigureNotifyHandler
+from pywo.core.rectangles import rectangles, select
+from pywo.core.windows import Window, WindowManager, match_points
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+
+# Length of substrings used by search index
+GRAM = 3
+
+# Top/left, and bottom/right edges in given axis
+_EDGES = {'x': (operator.attrgetter('x'), operator.attrgetter('x2')),
+          'y': (operator.attrgetter('y'), operator.attrgetter('y2'))}
+
+
+def overlaps(geometry, area):
+    """Return True if geometry and area have common part."""
+    return geometry.x < area.x2 and \
+           geometry.x2 > area.x and \
+           geometry.y < area.y2 and \
+           geometry.y2 > area.y
+
+
+def grams(text):
+    """Return set of all GRAM long substrings of text."""
+    return set([text[i:i+GRAM] for i in range(len(text) - GRAM + 1)])
+
+
+def lowercase(text):
+    """Return lowercase unicode version of window's name, or class name."""
+    if not isinstance(text, unicode):
+        text = text.decode('utf-8', 'replace')
+    return text.lower()
+
+
+class EdgeIndex(object):
+
+    """Index of windows' edges, used to find windows placed in given axis.
+
+    For each axis windows are kept sorted by top/left edge, and implicit 
+    binary tree over sorted list keeps the biggest bottom/right edge of
+    every subtree, so windows overlapping given range are found
+    in O(log n + k) instead of checking all windows.
+    Windows are added, and removed using bisect, the tree is updated 
+    (without sorting again) on the first query after changes.
+
+    """
+
+    def __init__(self, geometries=None):
+        """
+        geometries - dict {win_id: geometry, } of initially indexed windows
+        """
+        self.__entries = {} # {win_id: {axis: (start, end, win_id), }, }
+        self.__axes = {} # {axis: [(start, end, win_id), ], }
+        self.__max_ends = {} # {axis: [max_end, ], } (None if outdated)
+        self.clear()
+        for win_id, geometry in (geometries or {}).items():
+            self.add(win_id, geometry)
+
+    def clear(self):
+        """Remove all windows."""
+        self.__entries.clear()
+        for axis in _EDGES:
+            self.__axes[axis] = []
+            self.__max_ends[axis] = None
+
+    def add(self, win_id, geometry):
+        """Add window (or update its edges if it is already indexed)."""
+        self.remove(win_id)
+        entries = {}
+        for axis, (xy, xy2) in _EDGES.items():
+            entry = (xy(geometry), xy2(geometry), win_id)
+            bisect.insort(self.__axes[axis], entry)
+            self.__max_ends[axis] = None
+            entries[axis] = entry
+        self.__entries[win_id] = entries
+
+    def remove(self, win_id):
+        """Remove window if it is indexed."""
+        entries = self.__entries.pop(win_id, None)
+        if entries is None:
+            return
+        for axis, entry in entries.items():
+            ordered = self.__axes[axis]
+            del ordered[bisect.bisect_left(ordered, entry)]
+            self.__max_ends[axis] = None
+
+    def overlapping(self, axis, start, end, touching=True):
+        """Return ids of windows overlapping range in given axis.
+
+        If touching is True windows that only touch range's edges 
+        are also returned.
+
+        """
+        ordered = self.__axes[axis]
+        max_ends = self.__max_ends[axis]
+        if max_ends is None:
+            max_ends = [entry[1] for entry in ordered]
+            self.__max_end(ordered, max_ends, 0, len(ordered))
+            self.__max_ends[axis] = max_ends
+        if touching:
+            after, before = operator.ge, operator.le
+        else:
+            after, before = operator.gt, operator.lt
+        found = []
+        subtrees = [(0, len(ordered))]
+        while subtrees:
+            lo, hi = subtrees.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) / 2
+            if not after(max_ends[mid], start):
+                # no window in subtree ends after range's start
+                continue
+            subtrees.append((lo, mid))
+            entry_start, entry_end, win_id = ordered[mid]
+            if before(entry_start, end):
+                if after(entry_end, start):
+                    found.append(win_id)
+                subtrees.append((mid + 1, hi))
+        return found
+
+    def __max_end(self, ordered, max_ends, lo, hi):
+        """Fill max_ends for subtree [lo, hi), and return its biggest end."""
+        if lo >= hi:
+            return None
+        mid = (lo + hi) / 2
+        max_end = max(ordered[mid][1], 
+                      self.__max_end(ordered, max_ends, lo, mid),
+                      self.__max_end(ordered, max_ends, mid + 1, hi))
+        max_ends[mid] = max_end
+        return max_end
+
+    def __contains__(self, win_id):
+        return win_id in self.__entries
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class WindowIndex(object):
+
+    """Index of client windows by desktop, geometry, and name.
+
+    Index is built using single prefetch of all client windows, and then
+    updated on PropertyNotify and ConfigureNotify events. It is up to date
+    only while EventDispatcher is running (daemon mode), so it is used by
+    WindowManager.windows() only between start() and stop().
+
+    """
+
+    # Root window's properties
+    __CLIENT_LIST = Window.atom('_NET_CLIENT_LIST')
+    __CURRENT_DESKTOP = Window.atom('_NET_CURRENT_DESKTOP')
+    # changes of these invalidate all windows' geometries
+    __VIEWPORT = (Window.atom('_NET_DESKTOP_VIEWPORT'),
+                  Window.atom('_NET_DESKTOP_GEOMETRY'),
+                  Window.atom('_NET_WORKAREA'))
+    # Client windows' properties that might change desktop or geometry
+    __WINDOW = (Window.atom('_NET_WM_DESKTOP'),
+                Window.atom('_NET_FRAME_EXTENTS'),
+                Window.atom('_NET_WM_STATE'))
+    # Client windows' properties with name, and class name
+    __NAMES = (Window.atom('_NET_WM_NAME'),
+               Window.atom('WM_NAME'),
+               Window.atom('WM_CLASS'))
+    # Window's fields stored in the index
+    __FIELDS = ('desktop', 'geometry', 'name', 'class_name')
+    # Window's fields updated on ConfigureNotify, and property changes
+    __UPDATE_FIELDS = ('desktop', 'geometry')
+
+    def __init__(self):
+        self.__lock = threading.RLock()
+        self.__windows = {} # {win_id: (desktop, geometry), }
+        self.__desktops = {} # {desktop: set([win_id, ]), }
+        self.__rectangles = None # ([win_id, ], Rectangles), None if outdated
+        self.__names = {} # {win_id: (name, class_name), }
+        self.__grams = {} # {gram: set([win_id, ]), }
+        self.__edges = EdgeIndex()
+        self.__observers = []
+        atoms = (self.__CLIENT_LIST, self.__CURRENT_DESKTOP) + \
+                self.__VIEWPORT + self.__WINDOW + self.__NAMES
+        self.__property_handler = PropertyNotifyHandler(self.property, atoms)
+        self.__configure_handler = ConfigureNotifyHandler(self.configure,
+                                                          children=True)
+        self.desktop = None
+        self.workarea = None
+
+    def observe(self, observer):
+        """Call observer(win_id, geometry) when window's geometry is updated.
+
+        geometry is None if window was removed (destroyed).
+        Observers are called in EventDispatcher's thread.
+
+        """
+        if observer not in self.__observers:
+            self.__observers.append(observer)
+
+    def unobserve(self, observer):
+        """Stop calling observer."""
+        if observer in self.__observers:
+            self.__observers.remove(observer)
+
+    def start(self):
+        """Build index, start listening for changes and attach it to WM."""
+        manager = WindowManager()
+        self.rebuild()
+        manager.register(self.__property_handler)
+        for win_id in self.__windows.keys():
+            self.__register(win_id)
+        manager.index = self
+        log.debug('%s started' % (self,))
+
+    def stop(self):
+        """Detach index from WM, stop listening, and clear the index."""
+        manager = WindowManager()
+        if manager.index is self:
+            manager.index = None
+        manager.unregister(self.__property_handler)
+        for win_id in self.__windows.keys():
+            self.__unregister(win_id)
+        with self.__lock:
+            self.__clear()
+        log.debug('%s stopped' % (self,))
+
+    def rebuild(self):
+        """Fetch desktop and geometry of all client windows."""
+        manager = WindowManager()
+        windows = [Window(win_id)
+                   for win_id in manager.windows_ids(stacking=False)]
+        snapshots = manager.snapshots(windows, self.__FIELDS)
+        with self.__lock:
+            self.__clear()
+            self.desktop = manager.desktop
+            self.workarea = manager.workarea_geometry
+            for snapshot in snapshots:
+                if snapshot:
+                    self.__add(snapshot)
+                    self.__add_names(snapshot)
+        log.debug('%s rebuilt' % (self,))
+
+    def update(self, win_id):
+        """Fetch desktop and geometry of the window (single round trip)."""
+        try:
+            window = WindowManager().snapshots([Window(win_id)], 
+                                               self.__UPDATE_FIELDS)[0]
+            desktop = window and window.desktop
+            geometry = window and window.geometry
+        except Exception, exc:
+            # window might be already destroyed
+            log.debug('Removing %s from index: %s' % (win_id, exc))
+            window = None
+        if not window:
+            geometry = None
+        with self.__lock:
+            self.__remove(win_id)
+            if window:
+                self.__add(window, desktop, geometry)
+            else:
+                self.__remove_names(win_id)
+        self.__notify(win_id, geometry)
+
+    def update_names(self, win_id):
+        """Fetch name and class name of the window."""
+        try:
+            window = Window(win_id)
+            name = window.name
+            class_name = window.class_name
+        except Exception, exc:
+            log.debug('Removing %s from index: %s' % (win_id, exc))
+            window = None
+        with self.__lock:
+            self.__remove_names(win_id)
+            if window:
+                self.__add_names(window, name, class_name)
+
+    def windows_ids(self, desktop=None, area=None):
+        """Return set of ids of windows on desktop (including sticky ones).
+
+        If desktop is None current desktop is used. If area is given only
+        windows overlapping the area are returned.
+
+        """
+        with self.__lock:
+            if desktop is None:
+                desktop = self.desktop
+            ids = self.__desktops.get(desktop, set()) | \
+                  self.__desktops.get(Window.ALL_DESKTOPS, set())
+            if area is None:
+                return ids
+            if self.__rectangles is None:
+                all_ids = self.__windows.keys()
+                geometries = [self.__windows[win_id][1] for win_id in all_ids]
+                self.__rectangles = (all_ids, rectangles(geometries))
+            all_ids, all_rectangles = self.__rectangles
+            return ids & set(select(all_ids, all_rectangles.overlap(area)))
+
+    def windows_in_axis(self, axis, start, end, touching=True, area=None):
+        """Return {win_id: geometry} of windows overlapping range in axis.
+
+        Only windows on current desktop (including sticky ones) are 
+        returned, and if area is given only windows overlapping the area.
+        If touching is True windows that only touch range's edges 
+        are also returned.
+
+        """
+        with self.__lock:
+            desktops = (self.desktop, Window.ALL_DESKTOPS)
+            found = {}
+            for win_id in self.__edges.overlapping(axis, start, end, 
+                                                   touching):
+                desktop, geometry = self.__windows[win_id]
+                if desktop in desktops and \
+                   (area is None or overlaps(geometry, area)):
+                    found[win_id] = geometry
+            return found
+
+    def search(self, match, windows_ids=None, limit=None):
+        """Return ids of windows matching given text, best matching first.
+
+        Windows are scored like in WindowManager.windows(match=...) and
+        only limit best matches are returned (all if limit is None).
+        match - lowercase unicode text
+        windows_ids - ids of windows to check (in stacking order), if None
+                      all indexed windows are checked
+
+        """
+        with self.__lock:
+            candidates = self.__lookup(match)
+            if windows_ids is None:
+                windows_ids = sorted(candidates)
+            on_desktop = self.windows_ids()
+            on_workarea = self.windows_ids(area=self.workarea)
+            found = []
+            for win_id in windows_ids:
+                if not win_id in candidates:
+                    continue
+                name, class_name = self.__names[win_id]
+                points = match_points(match, name, class_name)
+                if points and win_id in on_desktop:
+                    points += 50
+                    if win_id in on_workarea:
+                        points += 100
+                if points:
+                    found.append((win_id, points))
+        key = lambda win: win[1]
+        if limit:
+            found = heapq.nlargest(limit, found, key=key)
+        else:
+            found.sort(key=key, reverse=True)
+        return [win_id for win_id, points in found]
+
+    def property(self, event):
+        """Handle PropertyNotifyEvent of root or client window."""
+        if event.window_id == WindowManager().id:
+            if event.atom == self.__CLIENT_LIST:
+                self.__update_clients()
+            elif event.atom == self.__CURRENT_DESKTOP:
+                self.desktop = WindowManager().desktop
+            elif event.atom in self.__VIEWPORT:
+                # geometries are relative to current viewport
+                self.rebuild()
+        elif event.atom in self.__WINDOW and event.window_id in self:
+            self.update(event.window_id)
+        elif event.atom in self.__NAMES and event.window_id in self:
+            self.update_names(event.window_id)
+
+    def configure(self, event):
+        """Handle ConfigureNotifyEvent of client window."""
+        if event.window_id in self:
+            self.update(event.window_id)
+
+    def __update_clients(self):
+        """Add new client windows, and remove destroyed ones."""
+        manager = WindowManager()
+        ids = set(manager.windows_ids(stacking=False))
+        with self.__lock:
+            old_ids = set(self.__windows.keys())
+            for win_id in old_ids - ids:
+                self.__remove(win_id)
+                self.__remove_names(win_id)
+        for win_id in old_ids - ids:
+            self.__unregister(win_id)
+            self.__notify(win_id, None)
+        windows = [Window(win_id) for win_id in ids - old_ids]
+        snapshots = manager.snapshots(windows, self.__FIELDS)
+        for snapshot in snapshots:
+            if not snapshot:
+                continue
+            with self.__lock:
+                self.__add(snapshot)
+                self.__add_names(snapshot)
+            self.__register(snapshot.id)
+
+    def __notify(self, win_id, geometry):
+        """Call observers, log (and ignore) exceptions."""
+        for observer in list(self.__observers):
+            try:
+                observer(win_id, geometry)
+            except Exception, exc:
+                log.exception('Exception %s in %s' % (exc, observer))
+
+    def __add(self, window, desktop=None, geometry=None):
+        """Add window to the index."""
+        if desktop is None:
+            desktop = window.desktop
+        if geometry is None:
+            geometry = window.geometry
+        self.__windows[window.id] = (desktop, geometry)
+        self.__edges.add(window.id, geometry)
+        self.__desktops.setdefault(desktop, set()).add(window.id)
+        self.__rectangles = None
+
+    def __remove(self, win_id):
+        """Remove window from the index."""
+        if not win_id in self.__windows:
+            return
+        desktop, geometry = self.__windows.pop(win_id)
+        self.__edges.remove(win_id)
+        self.__desktops[desktop].discard(win_id)
+        if not self.__desktops[desktop]:
+            del self.__desktops[desktop]
+        self.__rectangles = None
+
+    def __add_names(self, window, name=None, class_name=None):
+        """Add window's name and class name to the search index."""
+        if name is None:
+            name = window.name
+        if class_name is None:
+            class_name = window.class_name
+        names = (lowercase(name), lowercase(class_name))
+        self.__names[window.id] = names
+        for gram in grams(names[0]) | grams(names[1]):
+            self.__grams.setdefault(gram, set()).add(window.id)
+
+    def __remove_names(self, win_id):
+        """Remove window from the search index."""
+        if not win_id in self.__names:
+            return
+        name, class_name = self.__names.pop(win_id)
+        for gram in grams(name) | grams(class_name):
+            self.__grams[gram].discard(win_id)
+            if not self.__grams[gram]:
+                del self.__grams[gram]
+
+    def __lookup(self, match):
+        """Return set of ids of windows with name or class containing match.
+
+        Texts shorter than GRAM are looked for in all names. Any prefix of 
+        name's word is its substring, so it is found as well.
+
+        """
+        if len(match) < GRAM:
+            return set([win_id for win_id, (name, class_name) 
+                                in self.__names.items()
+                               if match in name or match in class_name])
+        found = None
+        for gram in sorted(grams(match), 
+                           key=lambda gram: len(self.__grams.get(gram, ()))):
+            ids = self.__grams.get(gram)
+            if not ids:
+                return set()
+            if found is None:
+                found = set(ids)
+            else:
+                found &= ids
+        return found
+
+    def __clear(self):
+        """Remove all windows from the index."""
+        self.__windows.clear()
+        self.__edges.clear()
+        self.__desktops.clear()
+        self.__rectangles = None
+        self.__names.clear()
+        self.__grams.clear()
+
+    def __register(self, win_id):
+        """Start listening for window's changes."""
+        window = Window(win_id)
+        window.register(self.__property_handler)
+        window.register(self.__configure_handler)
+
+    def __unregister(self, win_id):
+        """Stop listening for window's changes."""
+        try:
+            window = Window(win_id)
+            window.unregister(self.__property_handler)
+            window.unregister(self.__configure_handler)
+        except Exception, exc:
+            # window might be already destroyed
+            log.debug('Unregistering %s failed: %s' % (win_id, exc))
+
+    def __contains__(self, win_id):
+        return win_id in self.__windows
+
+    def __len__(self):
+        return len(self.__windows)
+
+    def __str__(self):
+        return '<WindowIndex windows=%s, desktops=%s>' % \
+               (len(self.__windows), len(self.__desktops))
+
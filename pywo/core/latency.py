@@ -0,0 +1,245 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""latency.py - timing stages of actions performed on key press.
+
+Timeline is started with start() when key press is handled, every stage
+is closed with mark(stage) (which does nothing if there is no Timeline in
+current thread), and finish() adds stages timings to LATENCY histograms.
+
+"""
+
+import logging
+import threading
+import time
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+# Name of the histogram with time from key press to the end of action
+TOTAL = 'total'
+
+# Stages of handling key press, in order
+STAGES = ['wakeup', 'window', 'filter', 'perform', 'sync']
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram(object):
+
+    """Histogram of values (in microseconds) with fixed relative precision.
+
+    Like in HdrHistogram values smaller than SUB_BUCKETS are counted
+    exactly, bigger values are counted in buckets SUB_BUCKETS/2 per power
+    of two, so value returned for percentile is accurate to about 3%.
+
+    """
+
+    SUB_BITS = 6
+    SUB_BUCKETS = 1 << SUB_BITS
+
+    def __init__(self):
+        self.buckets = {} # {index: count, }
+        self.count = 0
+        self.max = 0
+
+    @classmethod
+    def index(cls, value):
+        """Return index of the bucket for value."""
+        shift = max(value.bit_length() - cls.SUB_BITS, 0)
+        return (shift << (cls.SUB_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def value(cls, index):
+        """Return middle of the range of values counted in bucket."""
+        half = cls.SUB_BUCKETS >> 1
+        shift = max(index // half - 1, 0)
+        lowest = (index - (shift << (cls.SUB_BITS - 1))) << shift
+        return lowest + ((1 << shift) >> 1)
+
+    def add(self, seconds):
+        """Add value given in seconds."""
+        value = max(int(seconds * 1000000), 0)
+        index = self.index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Return value (in seconds) below which percent of values fall."""
+        if not self.count:
+            return 0
+        rank = max(int(self.count * percent / 100.0 + 0.5), 1)
+        counted = 0
+        for index in sorted(self.buckets):
+            counted += self.buckets[index]
+            if counted == self.count:
+                break
+            if counted >= rank:
+                return min(self.value(index), self.max) / 1000000.0
+        return self.max / 1000000.0
+
+    def summary(self):
+        """Return (count, p50, p95, p99, max), values in seconds."""
+        percentiles = [self.percentile(percent) for percent in PERCENTILES]
+        return (self.count,) + tuple(percentiles) + (self.max / 1000000.0,)
+
+
+class ServerClock(object):
+
+    """Converts X Server timestamps (in milliseconds) to local time.
+
+    Offset between server, and local clock is not known, so the smallest
+    difference seen so far is used. Times converted are never later than
+    local time, and the fastest event seen so far is delivered instantly.
+
+    """
+
+    WRAP = 1 << 32 # server timestamps are 32-bit
+
+    def __init__(self):
+        self.offset = None
+
+    def to_local(self, timestamp, now=None):
+        """Return local time (in seconds) when X Server generated event."""
+        now = now or time.time()
+        difference = (int(now * 1000) - timestamp) % self.WRAP
+        if self.offset is None:
+            self.offset = difference
+        lag = (difference - self.offset) % self.WRAP
+        if lag > self.WRAP / 2:
+            # event delivered faster than any before
+            self.offset = difference
+            lag = 0
+        return now - lag / 1000.0
+
+
+class Timeline(object):
+
+    """Stages of handling single key press, with time taken by each one."""
+
+    def __init__(self, started=None):
+        self.started = started or time.time()
+        self.last = self.started
+        self.stages = [] # [(stage, seconds), ]
+
+    def mark(self, stage, now=None):
+        """Close stage, started when previous one was closed."""
+        now = now or time.time()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def marked(self, stage):
+        """Return True if stage was closed."""
+        return stage in [marked for marked, seconds in self.stages]
+
+    @property
+    def total(self):
+        """Return time from start to the end of last stage."""
+        return self.last - self.started
+
+
+class Latency(object):
+
+    """Per action, and per stage latency histograms."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__histograms = {} # {action: {stage: Histogram, }, }
+
+    def add(self, action, timeline):
+        """Add stages timings of performed action."""
+        with self.__lock:
+            histograms = self.__histograms.setdefault(action, {})
+            for stage, seconds in timeline.stages + [(TOTAL, timeline.total)]:
+                histograms.setdefault(stage, Histogram()).add(seconds)
+
+    def summary(self):
+        """Return [(action, stage, count, p50, p95, p99, max), ].
+
+        Stages are listed in order they were marked, TOTAL is the last one.
+
+        """
+        summary = []
+        with self.__lock:
+            for action in sorted(self.__histograms):
+                histograms = self.__histograms[action]
+                stages = sorted(histograms,
+                                key=lambda stage: (stage == TOTAL,
+                                                   STAGES.index(stage)
+                                                   if stage in STAGES
+                                                   else len(STAGES)))
+                for stage in stages:
+                    summary.append((action, stage) +
+                                   histograms[stage].summary())
+        return summary
+
+    def clear(self):
+        """Remove all histograms."""
+        with self.__lock:
+            self.__histograms.clear()
+
+    def report(self):
+        """Return list of lines with percentiles in milliseconds."""
+        lines = ['%-22s %-8s %6s %10s %10s %10s %10s' %
+                 ('action', 'stage', 'count', 'p50', 'p95', 'p99', 'max')]
+        for action, stage, count, p50, p95, p99, max_ in self.summary():
+            lines.append('%-22s %-8s %6d %8.2fms %8.2fms %8.2fms %8.2fms' %
+                         (action, stage, count,
+                          p50 * 1000, p95 * 1000, p99 * 1000, max_ * 1000))
+        return lines
+
+
+LATENCY = Latency()
+
+__THREAD_DATA = threading.local()
+
+
+def start(started=None):
+    """Start Timeline in current thread, and return it."""
+    timeline = Timeline(started)
+    __THREAD_DATA.timeline = timeline
+    return timeline
+
+
+def mark(stage):
+    """Close stage of Timeline started in current thread (if any)."""
+    timeline = getattr(__THREAD_DATA, 'timeline', None)
+    if timeline is not None:
+        timeline.mark(stage)
+
+
+def finish(action, required=None):
+    """Finish Timeline started in current thread, and add it to LATENCY.
+
+    If required stage was not marked (e.g. action was rejected by filter)
+    Timeline is dropped, so partial timings don't skew the histograms.
+
+    """
+    timeline = getattr(__THREAD_DATA, 'timeline', None)
+    __THREAD_DATA.timeline = None
+    if timeline is not None and action and timeline.stages and \
+       (required is None or timeline.marked(required)):
+        LATENCY.add(action, timeline)
+    return timeline
+
@@ -0,0 +1,557 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""loop.py - single threaded, asynchronous front-end for the X layer.
+
+Rest of the core is blocking, and thread based. This module mimics subset
+of asyncio (which is not available in Python 2):
+
+Future - result of asynchronous operation
+coroutine - decorator for generator functions, generator yields Futures
+            (or lists of Futures) to wait for their results, and raises
+            Return(value) to return value
+Loop - event loop reading connection to X Server (and other file
+       descriptors added with add_reader()), running callbacks, and
+       coroutines, with awaitable X requests: fetch(), get_property(),
+       geometry(), configure(), sync(), and perform() for actions
+EventStream - events handled by EventHandler delivered as Futures
+
+Requests sent by concurrently running coroutines are pipelined, so they
+take single round trip to X Server:
+
+    @coroutine
+    def names(loop, windows):
+        properties = yield [loop.get_property(win, '_NET_WM_NAME')
+                            for win in windows]
+        raise Return([property and property.value
+                      for property in properties])
+
+    loop = Loop()
+    loop.attach()
+    print loop.run_until_complete(names(loop, WindowManager().windows()))
+
+"""
+
+import collections
+import errno
+import functools
+import heapq
+import itertools
+import logging
+import os
+import select
+import threading
+import time
+import types
+
+from pywo.core.basic import Gravity
+from pywo.core.windows import WindowManager, WindowSnapshot
+from pywo.core.xlib import XObject
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+# Properties needed to compute window's geometry
+GEOMETRY_PROPERTIES = ['_NET_FRAME_EXTENTS', '_NET_WM_STATE']
+# Properties needed to move, or resize window
+CONFIGURE_PROPERTIES = GEOMETRY_PROPERTIES + ['WM_NORMAL_HINTS']
+# Max seconds waiting for readers while replies are outstanding; replies can
+# be read by other thread (e.g. EventDispatcher's), without waking up select
+REQUESTS_POLL_INTERVAL = 0.01
+
+
+class InvalidStateError(Exception):
+
+    """Raised when Future's result is not ready, or already set."""
+
+
+class StreamClosed(Exception):
+
+    """Raised by Futures of closed EventStream."""
+
+
+class Return(Exception):
+
+    """Raised by coroutine to return value.
+
+    Generators in Python 2 can't return values.
+
+    """
+
+    def __init__(self, value=None):
+        Exception.__init__(self, value)
+        self.value = value
+
+
+class Future(object):
+
+    """Result of asynchronous operation (mimics asyncio.Future).
+
+    Futures are not thread-safe, use Loop.call_soon_threadsafe() to set
+    results from other threads.
+
+    """
+
+    def __init__(self):
+        self.__done = False
+        self.__result = None
+        self.__exception = None
+        self.__callbacks = []
+
+    def done(self):
+        """Return True if result, or exception is set."""
+        return self.__done
+
+    def result(self):
+        """Return result, or raise exception set for the Future."""
+        if not self.__done:
+            raise InvalidStateError('Result is not ready')
+        if self.__exception is not None:
+            raise self.__exception
+        return self.__result
+
+    def exception(self):
+        """Return exception set for the Future, or None."""
+        if not self.__done:
+            raise InvalidStateError('Result is not ready')
+        return self.__exception
+
+    def add_done_callback(self, callback):
+        """Call callback(future) when the Future is done."""
+        if self.__done:
+            callback(self)
+        else:
+            self.__callbacks.append(callback)
+
+    def set_result(self, result):
+        """Set result, and call callbacks."""
+        self.__set(result, None)
+
+    def set_exception(self, exception):
+        """Set exception, and call callbacks."""
+        self.__set(None, exception)
+
+    def __set(self, result, exception):
+        if self.__done:
+            raise InvalidStateError('Future is already done')
+        self.__done = True
+        self.__result = result
+        self.__exception = exception
+        callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class Task(Future):
+
+    """Future of coroutine's result, coroutine is run by the loop."""
+
+    def __init__(self, generator, loop=None):
+        Future.__init__(self)
+        self.__generator = generator
+        self.__loop = loop or get_event_loop()
+        self.__loop.call_soon(self.__step)
+
+    def __step(self, future=None):
+        """Resume coroutine with result of the Future it waited for."""
+        try:
+            if future is not None and future.exception() is not None:
+                waiting = self.__generator.throw(future.exception())
+            else:
+                waiting = self.__generator.send(future and future.result())
+        except StopIteration:
+            self.set_result(None)
+            return
+        except Return, value:
+            self.set_result(value.value)
+            return
+        except Exception, exc:
+            self.set_exception(exc)
+            return
+        if isinstance(waiting, (list, tuple)):
+            waiting = gather(*waiting)
+        if waiting is None:
+            # just let other callbacks, and coroutines run
+            self.__loop.call_soon(self.__step)
+        elif isinstance(waiting, Future):
+            waiting.add_done_callback(self.__wakeup)
+        else:
+            error = Future()
+            error.set_exception(TypeError('Coroutine yielded %r, '
+                                          'not Future' % (waiting,)))
+            self.__loop.call_soon(self.__step, error)
+
+    def __wakeup(self, future):
+        self.__loop.call_soon(self.__step, future)
+
+
+def coroutine(function):
+    """Make generator function return Task running it in default loop."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        result = function(*args, **kwargs)
+        if isinstance(result, types.GeneratorType):
+            return Task(result)
+        future = Future()
+        future.set_result(result)
+        return future
+    return wrapper
+
+
+def gather(*futures):
+    """Return Future of list of results of all given Futures."""
+    gathered = Future()
+    results = [None] * len(futures)
+    pending = set(range(len(futures)))
+    def done(number, future):
+        if gathered.done():
+            return
+        if future.exception() is not None:
+            gathered.set_exception(future.exception())
+            return
+        results[number] = future.result()
+        pending.discard(number)
+        if not pending:
+            gathered.set_result(results)
+    if not futures:
+        gathered.set_result(results)
+    for number, future in enumerate(futures):
+        future.add_done_callback(functools.partial(done, number))
+    return gathered
+
+
+class Loop(object):
+
+    """Single threaded event loop (mimics subset of asyncio's event loop).
+
+    Connection to X Server is read by the loop, so replies to pipelined
+    requests are collected without blocking. Events are dispatched by the
+    loop too, after attach() is called.
+
+    """
+
+    def __init__(self):
+        self.__ready = collections.deque() # [(callback, args), ]
+        self.__timers = [] # heap of (when, number, callback, args)
+        self.__numbers = itertools.count()
+        self.__readers = {} # {fd: (callback, args), }
+        self.__pollers = [] # called after every iteration
+        self.__requests = [] # [(Prefetch, Future), ]
+        self.__atoms = {} # {name: atom, }
+        self.__stopping = False
+        self.__wakeup = os.pipe()
+        # thread running the loop
+        self.thread = None
+        self.add_reader(self.__wakeup[0], os.read, self.__wakeup[0], 4096)
+        self.add_reader(XObject.fileno(), XObject.pending_events)
+        self.add_poller(self.__poll_requests)
+
+    def call_soon(self, callback, *args):
+        """Call callback(*args) in next iteration of the loop."""
+        self.__ready.append((callback, args))
+
+    def call_soon_threadsafe(self, callback, *args):
+        """Like call_soon(), but can be called from any thread."""
+        # deque.append() is thread-safe
+        self.__ready.append((callback, args))
+        os.write(self.__wakeup[1], '\0')
+
+    def call_later(self, delay, callback, *args):
+        """Call callback(*args) after delay in seconds."""
+        heapq.heappush(self.__timers, (time.time() + delay,
+                                       self.__numbers.next(),
+                                       callback, args))
+
+    def add_reader(self, fd, callback, *args):
+        """Call callback(*args) whenever fd is ready for reading."""
+        self.__readers[fd] = (callback, args)
+
+    def remove_reader(self, fd):
+        """Stop watching fd, return True if it was watched."""
+        return self.__readers.pop(fd, None) is not None
+
+    def add_poller(self, poller):
+        """Call poller() before waiting for readers, or timers."""
+        if poller not in self.__pollers:
+            self.__pollers.append(poller)
+
+    def remove_poller(self, poller):
+        """Stop calling poller()."""
+        if poller in self.__pollers:
+            self.__pollers.remove(poller)
+
+    def attach(self):
+        """Dispatch X events in the loop (not in EventDispatcher thread)."""
+        XObject.set_event_loop(self)
+
+    def detach(self):
+        """Dispatch X events in EventDispatcher thread again."""
+        XObject.set_event_loop(None)
+
+    def stop(self):
+        """Stop run_forever() after current iteration (thread-safe)."""
+        self.__stopping = True
+        os.write(self.__wakeup[1], '\0')
+
+    def close(self):
+        """Close pipe used to wake up the loop."""
+        self.remove_reader(self.__wakeup[0])
+        for fd in self.__wakeup:
+            os.close(fd)
+
+    def run_forever(self):
+        """Run the loop until stop() is called."""
+        self.thread = threading.currentThread()
+        self.__stopping = False
+        try:
+            while not self.__stopping:
+                self.__run_once()
+        finally:
+            self.thread = None
+
+    def run_until_complete(self, future):
+        """Run the loop until Future is done, return its result."""
+        self.thread = threading.currentThread()
+        self.__stopping = False
+        # don't wait for readers, or timers after Future is done
+        future.add_done_callback(lambda future: self.stop())
+        try:
+            while not future.done():
+                self.__run_once()
+        finally:
+            self.thread = None
+        return future.result()
+
+    def __run_once(self):
+        """Wait for readers, or timers, and call all ready callbacks."""
+        # replies, and events could be already read by blocking requests
+        for poller in list(self.__pollers):
+            self.__call(poller, ())
+        if self.__ready or self.__stopping:
+            timeout = 0
+        elif self.__timers:
+            timeout = max(0, self.__timers[0][0] - time.time())
+        else:
+            timeout = None
+        if self.__requests and \
+           (timeout is None or timeout > REQUESTS_POLL_INTERVAL):
+            timeout = REQUESTS_POLL_INTERVAL
+        try:
+            readable = select.select(self.__readers.keys(), [], [],
+                                     timeout)[0]
+        except select.error, exc:
+            if exc.args[0] != errno.EINTR:
+                raise
+            readable = []
+        for fd in readable:
+            if fd in self.__readers:
+                self.__ready.append(self.__readers[fd])
+        now = time.time()
+        while self.__timers and self.__timers[0][0] <= now:
+            when, number, callback, args = heapq.heappop(self.__timers)
+            self.__ready.append((callback, args))
+        # callbacks added while running are called in next iteration
+        for number in range(len(self.__ready)):
+            callback, args = self.__ready.popleft()
+            self.__call(callback, args)
+
+    def __call(self, callback, args):
+        """Call callback, log (and ignore) exceptions."""
+        try:
+            callback(*args)
+        except Exception, exc:
+            log.exception('Exception %s in %s' % (exc, callback))
+
+    def atom(self, name):
+        """Return (cached) atom with given name."""
+        if name not in self.__atoms:
+            self.__atoms[name] = XObject.atom(name)
+        return self.__atoms[name]
+
+    def fetch(self, objects, names=(), geometry=False):
+        """Return Future of list of dicts like XObject.prefetch() returns.
+
+        Requests are sent immediately, and replies are collected by the
+        loop, so requests of concurrently running coroutines are pipelined.
+
+        """
+        atoms = [(name, self.atom(name)) for name in names]
+        future = Future()
+        backend = XObject.backend()
+        self.__requests.append((backend.prefetch(objects, atoms, geometry),
+                                future))
+        backend.flush()
+        XObject.flush()
+        return future
+
+    def __poll_requests(self):
+        """Set results of fetch() Futures with all replies received."""
+        requests, self.__requests = self.__requests, []
+        pending = []
+        for prefetch, future in requests:
+            if not prefetch.ready():
+                pending.append((prefetch, future))
+                continue
+            try:
+                future.set_result(prefetch.replies())
+            except Exception, exc:
+                future.set_exception(exc)
+        self.__requests[:0] = pending
+
+    def get_property(self, win, name):
+        """Return Future of window's property (None if there's no such)."""
+        return Task(self.__get_property(win, name), self)
+
+    def __get_property(self, win, name):
+        prefetched = yield self.fetch([win], [name])
+        raise Return(prefetched[0] and prefetched[0][name])
+
+    def geometry(self, win):
+        """Return Future of window's geometry (see Window.geometry).
+
+        Requests needed only by some Window Managers (see Hacks) are still
+        sent one by one.
+
+        """
+        return Task(self.__geometry(win), self)
+
+    def __geometry(self, win):
+        prefetched = yield self.fetch([win], GEOMETRY_PROPERTIES,
+                                      geometry=True)
+        # window that doesn't exist raises BadWindow as Window.geometry
+        raise Return(WindowSnapshot(win.id, prefetched[0] or {}).geometry)
+
+    def configure(self, win, geometry, on_resize=Gravity(0, 0)):
+        """Return Future done when window is moved, or resized.
+
+        See Window.set_geometry().
+
+        """
+        return Task(self.__configure(win, geometry, on_resize), self)
+
+    def __configure(self, win, geometry, on_resize):
+        prefetched = yield self.fetch([win], CONFIGURE_PROPERTIES,
+                                      geometry=True)
+        snapshot = WindowSnapshot(win.id, prefetched[0] or {})
+        snapshot.set_geometry(geometry, on_resize)
+        yield self.sync()
+
+    def sync(self):
+        """Return Future done when X Server processed all sent requests."""
+        return Task(self.__sync(), self)
+
+    def __sync(self):
+        # requests are processed in order, so reply to any request means
+        # that all previous ones were processed
+        yield self.fetch([WindowManager()], ['_NET_SUPPORTING_WM_CHECK'])
+
+    def perform(self, action, win, **kwargs):
+        """Return Future done when action is performed on the window.
+
+        Actions are blocking, so other coroutines run only while waiting
+        until X Server processes requests sent by the action.
+
+        """
+        return Task(self.__perform(action, win, kwargs), self)
+
+    def __perform(self, action, win, kwargs):
+        action(win, **kwargs)
+        yield self.sync()
+
+
+class EventStream(object):
+
+    """Events handled by EventHandler, delivered as Futures.
+
+    Stream is iterated inside coroutine, like asynchronous iterator:
+
+        stream = EventStream(WM, PropertyNotifyHandler, ['_NET_WM_NAME'])
+        for next_event in stream:
+            event = yield next_event
+
+    Loop must be attached (see Loop.attach()), so events are delivered
+    in the loop's thread.
+
+    """
+
+    def __init__(self, window, handler_class, *args, **kwargs):
+        """
+        window - window (or WindowManager) handler is registered for
+        handler_class - EventHandler class, stream's put() is passed as
+                        its first handler function, followed by args
+        """
+        self.window = window
+        self.handler = handler_class(self.put, *args, **kwargs)
+        self.closed = False
+        self.__events = collections.deque()
+        self.__waiting = collections.deque()
+        window.register(self.handler)
+
+    def put(self, event):
+        """Deliver event to the first waiting Future, or queue it."""
+        if self.__waiting:
+            self.__waiting.popleft().set_result(event)
+        else:
+            self.__events.append(event)
+
+    def next(self):
+        """Return Future of the next event."""
+        future = Future()
+        if self.__events:
+            future.set_result(self.__events.popleft())
+        elif self.closed:
+            future.set_exception(StreamClosed())
+        else:
+            self.__waiting.append(future)
+        return future
+
+    def __iter__(self):
+        while not self.closed or self.__events:
+            yield self.next()
+
+    def close(self):
+        """Unregister handler, waiting Futures raise StreamClosed."""
+        if self.closed:
+            return
+        self.closed = True
+        self.window.unregister(self.handler)
+        while self.__waiting:
+            self.__waiting.popleft().set_exception(StreamClosed())
+
+
+LOOP = None
+
+
+def get_event_loop():
+    """Return default Loop (created when needed)."""
+    global LOOP
+    if LOOP is None:
+        LOOP = Loop()
+    return LOOP
+
+
+def set_event_loop(loop):
+    """Set default Loop."""
+    global LOOP
+    LOOP = loop
+
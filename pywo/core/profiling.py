@@ -0,0 +1,266 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""profiling.py - on demand CPU, and memory profiling of running PyWO.
+
+PROFILER - cProfile based, profiles every thread calling run() (event
+           handlers in EventDispatcher, and actions), stats are merged
+SAMPLER - samples stacks of all threads, including the ones not calling run()
+SNAPSHOTS - memory snapshots, using tracemalloc if available, or counting
+            objects tracked by garbage collector by type otherwise
+
+"""
+
+import cProfile
+import gc
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from pywo.core import accounting
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+# Directory where profiles are dumped
+PROFILE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                            os.path.join(os.path.expanduser('~'), '.cache'),
+                            'pywo')
+
+# Number of lines in memory snapshots reports
+TOP = 20
+
+
+def profile_filename(extension):
+    """Return new filename in PROFILE_PATH."""
+    if not os.path.exists(PROFILE_PATH):
+        os.makedirs(PROFILE_PATH)
+    name = 'pywo-%s.%s' % (time.strftime('%Y%m%d-%H%M%S'), extension)
+    return os.path.join(PROFILE_PATH, name)
+
+
+class Profiler(object):
+
+    """cProfile profiler for all threads calling run().
+
+    cProfile can't be enabled for already running threads, so each thread
+    gets its own cProfile.Profile, enabled only inside run().
+
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__profiles = []
+        self.__local = threading.local()
+        self.running = False
+
+    def start(self):
+        """Start profiling."""
+        with self.__lock:
+            self.__profiles = []
+            self.__local = threading.local()
+            self.running = True
+
+    def run(self, function, *args, **kwargs):
+        """Call function, profile it if profiling is started."""
+        local = self.__local
+        if not self.running or getattr(local, 'active', False):
+            return function(*args, **kwargs)
+        profile = getattr(local, 'profile', None)
+        if profile is None:
+            profile = local.profile = cProfile.Profile()
+            with self.__lock:
+                self.__profiles.append(profile)
+        local.active = True
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            local.active = False
+
+    def stop(self, filename=None):
+        """Stop profiling, dump pstats to file, and return filename.
+
+        Returns None if nothing was profiled.
+
+        """
+        with self.__lock:
+            self.running = False
+            profiles, self.__profiles = self.__profiles, []
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        filename = filename or profile_filename('pstats')
+        stats.dump_stats(filename)
+        return filename
+
+
+class Sampler(object):
+
+    """Sampling profiler, collecting stacks of all threads.
+
+    Stacks are dumped in "collapsed" format (thread;function;...;function
+    number_of_samples), used by flame graph tools.
+
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = {} # {(thread, function, ...): samples, }
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    @property
+    def running(self):
+        return self.__thread is not None
+
+    def start(self):
+        """Start sampling in new thread."""
+        if self.__thread:
+            return
+        self.stacks = {}
+        self.__stopped.clear()
+        self.__thread = threading.Thread(name='Sampler', target=self.__run)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+
+    def __run(self):
+        """Take samples until stopped."""
+        own = threading.currentThread().ident
+        while not self.__stopped.wait(self.interval):
+            names = dict([(thread.ident, thread.getName())
+                          for thread in threading.enumerate()])
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append('%s (%s:%s)' %
+                                 (code.co_name,
+                                  os.path.basename(code.co_filename),
+                                  code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stack = tuple(reversed(stack))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self, filename=None):
+        """Stop sampling, dump stacks to file, and return filename.
+
+        Returns None if sampler wasn't started.
+
+        """
+        if not self.__thread:
+            return None
+        self.__stopped.set()
+        self.__thread.join()
+        self.__thread = None
+        filename = filename or profile_filename('stacks')
+        with open(filename, 'w') as stacks_file:
+            for stack, samples in sorted(self.stacks.items()):
+                stacks_file.write('%s %s\n' % (';'.join(stack), samples))
+        return filename
+
+
+class Snapshots(object):
+
+    """Memory snapshots, and differences between consecutive ones.
+
+    Along with memory, numbers of X requests are compared, so leaked X
+    resources (like never freed GCs) are visible too.
+
+    """
+
+    def __init__(self):
+        self.__previous = None
+        self.__requests = {}
+
+    def take(self):
+        """Take snapshot, return report of differences from previous one."""
+        requests = accounting.STATISTICS.requests()
+        if tracemalloc:
+            lines = self.__tracemalloc()
+        else:
+            lines = self.__gc()
+        lines.append('X requests since previous snapshot:')
+        for kind, (number, seconds) in sorted(requests.items()):
+            difference = number - self.__requests.get(kind, (0, 0))[0]
+            if difference:
+                lines.append('  %-22s %+d' % (kind, difference))
+        self.__requests = requests
+        return lines
+
+    def __tracemalloc(self):
+        """Return report of differences using tracemalloc."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self.__previous = None
+        snapshot = tracemalloc.take_snapshot()
+        if self.__previous:
+            statistics = snapshot.compare_to(self.__previous, 'lineno')
+        else:
+            statistics = snapshot.statistics('lineno')
+        self.__previous = snapshot
+        lines = ['Memory allocated (tracemalloc):']
+        lines.extend(['  %s' % (statistic,) for statistic in statistics[:TOP]])
+        return lines
+
+    def __gc(self):
+        """Return report of differences in numbers of objects by type."""
+        gc.collect()
+        counts = {}
+        for obj in gc.get_objects():
+            name = type(obj).__name__
+            counts[name] = counts.get(name, 0) + 1
+        previous = self.__previous or {}
+        self.__previous = counts
+        differences = [(name, number, number - previous.get(name, 0))
+                       for name, number in counts.items()]
+        differences.sort(key=lambda item: abs(item[2]), reverse=True)
+        lines = ['Objects tracked by garbage collector, by type:']
+        lines.extend(['  %-30s %8d %+8d' % difference
+                      for difference in differences[:TOP] if difference[2]])
+        return lines
+
+
+PROFILER = Profiler()
+SAMPLER = Sampler()
+SNAPSHOTS = Snapshots()
+
+
+def run(function, *args, **kwargs):
+    """Call function, profile it if PROFILER is started."""
+    if not PROFILER.running:
+        return function(*args, **kwargs)
+    return PROFILER.run(function, *args, **kwargs)
+
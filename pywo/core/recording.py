@@ -0,0 +1,274 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""recording.py - recording X events, and actions for offline replay.
+
+Recording is gzip compressed stream of pickled records:
+
+('header', VERSION, started, root_id, screens) - screens as [(x, y, w, h), ]
+('window', seconds, win_id, state) - snapshot of the window (or root)
+('event', seconds, fields, state) - raw X event fields, and state of the
+                                    window changed by the event (or None)
+('action', seconds, name, win_id, kwargs) - performed action
+
+seconds - time since the start of recording
+state - {'properties': {name: (format, value), }, 'geometry': (x, y, w, h),
+         'hints': {name: value, }}, only changed properties for events
+
+Windows (resources) in event fields are stored as (WINDOW, id), and atoms
+as names. Recordings are pickled, so never replay untrusted ones.
+Recordings are replayed by benchmarks/replay.py.
+
+"""
+
+import cPickle
+import gzip
+import logging
+import threading
+import time
+
+from Xlib import X
+
+from pywo.core.windows import Window, WindowManager, WindowSnapshot
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+VERSION = 1
+
+# Marker of window id in recorded event fields
+WINDOW = 'window'
+
+ROOT_PROPERTIES = ['_NET_SUPPORTED', '_NET_SUPPORTING_WM_CHECK',
+                   '_NET_CLIENT_LIST', '_NET_CLIENT_LIST_STACKING',
+                   '_NET_ACTIVE_WINDOW', '_NET_NUMBER_OF_DESKTOPS',
+                   '_NET_CURRENT_DESKTOP', '_NET_DESKTOP_NAMES',
+                   '_NET_DESKTOP_GEOMETRY', '_NET_DESKTOP_VIEWPORT',
+                   '_NET_DESKTOP_LAYOUT', '_NET_WORKAREA']
+
+WINDOW_PROPERTIES = ['_NET_WM_NAME', 'WM_NAME',
+                     '_NET_WM_ICON_NAME', 'WM_ICON_NAME',
+                     'WM_CLASS', 'WM_CLIENT_MACHINE', 'WM_STATE',
+                     'WM_TRANSIENT_FOR', 'WM_NORMAL_HINTS',
+                     '_NET_WM_WINDOW_TYPE', '_NET_WM_STATE',
+                     '_NET_WM_DESKTOP', '_NET_FRAME_EXTENTS',
+                     '_NET_WM_STRUT', '_NET_WM_STRUT_PARTIAL']
+
+HINTS = ['base_width', 'base_height', 'width_inc', 'height_inc',
+         'min_width', 'min_height', 'max_width', 'max_height',
+         'win_gravity']
+
+# Fields holding atoms in raw events
+ATOM_FIELDS = ['atom', 'client_type']
+
+
+def property_value(property):
+    """Return (format, value) of raw property, or None."""
+    if property is None:
+        return None
+    value = property.value
+    if not isinstance(value, basestring):
+        value = list(value)
+    return (property.format, value)
+
+
+class Recorder(object):
+
+    """Writes snapshots of windows, events, and actions to the file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.started = time.time()
+        self.records = 0
+        self.__lock = threading.Lock()
+        self.__file = gzip.open(filename, 'wb')
+        self.__atoms = {} # {atom: name, }
+        self.__windows = set() # ids of windows with snapshots recorded
+        self.__root_id = WindowManager().id
+        screens = [(screen.x, screen.y, screen.width, screen.height)
+                   for screen in WindowManager().screen_geometries()]
+        self.write('header', VERSION, self.started, self.__root_id, screens)
+        self.snapshot_root()
+        self.snapshot(WindowManager().windows_ids())
+
+    def write(self, kind, *fields):
+        """Write record."""
+        with self.__lock:
+            if self.__file is None:
+                return
+            cPickle.dump((kind,) + fields, self.__file, 2)
+            self.records += 1
+
+    def close(self):
+        """Close the file."""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    @property
+    def seconds(self):
+        return time.time() - self.started
+
+    def snapshot_root(self):
+        """Record root window's properties."""
+        WM = WindowManager()
+        prefetched = WM.prefetch([WM], ROOT_PROPERTIES)[0]
+        properties = dict([(name, property_value(property))
+                           for name, property in prefetched.items()])
+        self.write('window', self.seconds, self.__root_id,
+                   {'properties': properties})
+
+    def snapshot(self, windows_ids):
+        """Record properties, geometry, and hints of windows."""
+        windows_ids = [win_id for win_id in windows_ids
+                       if win_id not in self.__windows]
+        windows = [Window(win_id) for win_id in windows_ids]
+        prefetched = WindowManager().prefetch(windows, WINDOW_PROPERTIES,
+                                              geometry=True)
+        for win_id, data in zip(windows_ids, prefetched):
+            if data is None:
+                continue
+            self.__windows.add(win_id)
+            snapshot = WindowSnapshot(win_id, data)
+            try:
+                state = {'geometry': self.__geometry(snapshot),
+                         'hints': self.__hints(snapshot)}
+            except Exception, exc:
+                log.debug("Can't snapshot window %s: %s" % (win_id, exc))
+                continue
+            state['properties'] = dict([(name, property_value(property))
+                                        for name, property in data.items()
+                                        if name != 'geometry'])
+            self.write('window', self.seconds, win_id, state)
+
+    def __geometry(self, window):
+        """Return window's geometry as (x, y, width, height)."""
+        geometry = window.geometry
+        return (geometry.x, geometry.y, geometry.width, geometry.height)
+
+    def __hints(self, window):
+        """Return window's WM_NORMAL_HINTS as dict."""
+        hints = window._get_normal_hints()
+        if hints is None:
+            return {}
+        return dict([(name, getattr(hints, name, 0)) for name in HINTS])
+
+    def __atom_name(self, atom):
+        """Return (cached) atom's name."""
+        if atom not in self.__atoms:
+            self.__atoms[atom] = Window.atom_name(atom)
+        return self.__atoms[atom]
+
+    def event(self, event):
+        """Record raw X event, and state of the window it changed."""
+        data = getattr(event, '_data', None) or vars(event)
+        fields = {}
+        for name, value in data.items():
+            if hasattr(value, 'id'):
+                value = (WINDOW, value.id)
+            elif name in ATOM_FIELDS and value:
+                value = self.__atom_name(value)
+            elif isinstance(value, (tuple, list)):
+                value = list(value)
+            fields[name] = value
+        try:
+            state = self.__changed_state(event, fields)
+        except Exception, exc:
+            # window could be already destroyed
+            log.debug('Exception %s while recording %s' % (exc, fields))
+            state = None
+        self.write('event', self.seconds, fields, state)
+
+    def __changed_state(self, event, fields):
+        """Return state of the window changed by event."""
+        win_id = event.window.id
+        if event.type == X.PropertyNotify:
+            name = fields['atom']
+            value = None
+            if event.state == X.PropertyNewValue:
+                window = [Window(win_id), WindowManager()][
+                                                win_id == self.__root_id]
+                value = property_value(window.get_property(name))
+            if name in ['_NET_CLIENT_LIST', '_NET_CLIENT_LIST_STACKING'] \
+               and value:
+                self.snapshot(value[1])
+            return {'properties': {name: value}}
+        if event.type == X.ConfigureNotify and win_id != self.__root_id:
+            return {'geometry': self.__geometry(Window(win_id))}
+        if event.type in (X.CreateNotify, X.MapNotify):
+            self.snapshot([win_id])
+        return None
+
+    def action(self, name, win, kwargs):
+        """Record action performed on window."""
+        self.write('action', self.seconds, name, win and win.id, kwargs)
+
+
+def load(filename):
+    """Yield records from the recording."""
+    with gzip.open(filename, 'rb') as recording:
+        header = cPickle.load(recording)
+        if header[0] != 'header' or header[1] != VERSION:
+            raise ValueError('Unsupported recording: %s' % (header[:2],))
+        yield header
+        while True:
+            try:
+                yield cPickle.load(recording)
+            except EOFError:
+                return
+
+
+RECORDER = None
+
+
+def start(filename):
+    """Start recording events, and actions to the file."""
+    global RECORDER
+    stop()
+    log.info('Recording events, and actions to %s' % filename)
+    RECORDER = Recorder(filename)
+    Window.set_recorder(RECORDER)
+    return RECORDER
+
+
+def stop():
+    """Stop recording, return Recorder or None if not recording."""
+    global RECORDER
+    recorder = RECORDER
+    if recorder is None:
+        return None
+    RECORDER = None
+    Window.set_recorder(None)
+    recorder.close()
+    log.info('Recorded %s records to %s' %
+             (recorder.records, recorder.filename))
+    return recorder
+
+
+def action(name, win, kwargs):
+    """Record action performed on window, if recording."""
+    recorder = RECORDER
+    if recorder is not None:
+        recorder.action(name, win, kwargs)
+
@@ -0,0 +1,144 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""rectangles.py - geometry computations for many windows at once.
+
+Rectangles keeps edges of many geometries, and checks all of them against
+given area in single call, returning mask (sequence of booleans).
+If NumPy is available, and there are enough geometries, edges are kept
+in (N, 4) array and all checks are vectorised.
+
+Converting geometries to array costs more than all checks, so NumPy pays
+off only when the same Rectangles are checked many times (like in 
+WindowIndex). Rectangles built for single check should be pure Python.
+
+"""
+
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+# Below this number of geometries pure Python checks are faster than NumPy
+# (measured with benchmarks/rectangles.py, NumPy 1.16, CPython 2.7)
+NUMPY_THRESHOLD = 100
+
+# Indexes of edges for axes
+_AXES = {'x': (0, 2), 'y': (1, 3)}
+
+
+class Rectangles(object):
+
+    """Edges of geometries, pure Python implementation."""
+
+    def __init__(self, geometries):
+        self.edges = [(geometry.x, geometry.y, geometry.x2, geometry.y2)
+                      for geometry in geometries]
+
+    def overlap(self, area, touching=False):
+        """Return mask of geometries overlapping area.
+
+        If touching is True geometries touching area's edges are included.
+
+        """
+        x, y, x2, y2 = area.x, area.y, area.x2, area.y2
+        if touching:
+            return [left <= x2 and right >= x and top <= y2 and bottom >= y
+                    for left, top, right, bottom in self.edges]
+        return [left < x2 and right > x and top < y2 and bottom > y
+                for left, top, right, bottom in self.edges]
+
+    def in_axis(self, axis, start, end, touching=True):
+        """Return mask of geometries overlapping range in given axis."""
+        first, second = _AXES[axis]
+        if touching:
+            return [edges[first] <= end and edges[second] >= start
+                    for edges in self.edges]
+        return [edges[first] < end and edges[second] > start
+                for edges in self.edges]
+
+    def intersection_areas(self, area):
+        """Return list of areas of intersections with given area."""
+        x, y, x2, y2 = area.x, area.y, area.x2, area.y2
+        return [max(0, min(right, x2) - max(left, x)) * \
+                max(0, min(bottom, y2) - max(top, y))
+                for left, top, right, bottom in self.edges]
+
+    def __len__(self):
+        return len(self.edges)
+
+
+class NumpyRectangles(Rectangles):
+
+    """Edges of geometries, kept in NumPy (N, 4) array."""
+
+    def __init__(self, geometries):
+        edges = [(geometry.x, geometry.y, geometry.x2, geometry.y2)
+                 for geometry in geometries]
+        self.edges = numpy.array(edges, dtype=numpy.int64).reshape(-1, 4)
+
+    def overlap(self, area, touching=False):
+        left, top, right, bottom = self.edges.T
+        if touching:
+            return (left <= area.x2) & (right >= area.x) & \
+                   (top <= area.y2) & (bottom >= area.y)
+        return (left < area.x2) & (right > area.x) & \
+               (top < area.y2) & (bottom > area.y)
+
+    def in_axis(self, axis, start, end, touching=True):
+        first, second = _AXES[axis]
+        if touching:
+            return (self.edges[:, first] <= end) & \
+                   (self.edges[:, second] >= start)
+        return (self.edges[:, first] < end) & (self.edges[:, second] > start)
+
+    def intersection_areas(self, area):
+        left, top, right, bottom = self.edges.T
+        width = numpy.minimum(right, area.x2) - numpy.maximum(left, area.x)
+        height = numpy.minimum(bottom, area.y2) - numpy.maximum(top, area.y)
+        return (numpy.maximum(width, 0) * numpy.maximum(height, 0)).tolist()
+
+
+def rectangles(geometries, threshold=NUMPY_THRESHOLD):
+    """Return Rectangles implementation best suited for given geometries.
+
+    NumpyRectangles is used only if NumPy is available, and there are at
+    least threshold geometries.
+
+    """
+    if numpy is not None and len(geometries) >= threshold:
+        return NumpyRectangles(geometries)
+    return Rectangles(geometries)
+
+
+def select(items, mask):
+    """Return items (list) for which mask is True."""
+    if numpy is not None and isinstance(mask, numpy.ndarray):
+        return [items[index] for index in numpy.flatnonzero(mask)]
+    return [item for item, selected in zip(items, mask) if selected]
+
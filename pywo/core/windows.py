@@ -20,14 +20,19 @@
 
 """windows.py - classes and functions related to windows and window managers."""
 
+import heapq
 import logging
 import time
 
 from Xlib import X, Xutil, Xatom
+from Xlib.protocol import rq
+from Xlib.xobject import icccm
 
+from pywo.core import accounting
 from pywo.core.basic import CustomTuple
 from pywo.core.basic import Gravity, Position, Size, Geometry, Extents 
 from pywo.core.basic import Layout, Strut
+from pywo.core.rectangles import Rectangles, select
 from pywo.core.xlib import XObject
 
 
@@ -131,6 +136,18 @@ class Window(XObject):
     # _NET_WM_DESKTOP returns this value when in STATE_STICKY
     ALL_DESKTOPS = 0xFFFFFFFF
 
+    # Properties needed by window's attributes, used for prefetching
+    # {attribute: [property_name, ], }
+    FIELDS = {'type': ['_NET_WM_WINDOW_TYPE'],
+              'state': ['_NET_WM_STATE'],
+              'desktop': ['_NET_WM_DESKTOP'],
+              'name': ['_NET_WM_NAME', 'WM_NAME'],
+              'class_name': ['WM_CLASS'],
+              'strut': ['_NET_WM_STRUT_PARTIAL', '_NET_WM_STRUT'],
+              'extents': ['_NET_FRAME_EXTENTS', '_NET_WM_STATE'],
+              'geometry': ['_NET_FRAME_EXTENTS', '_NET_WM_STATE'],
+              'hints': ['WM_NORMAL_HINTS'], }
+
     def __init__(self, win_id):
         XObject.__init__(self, win_id)
 
@@ -155,7 +172,8 @@ class Window(XObject):
     @property
     def parent_id(self):
         """Return window's parent id."""
-        parent = self._win.get_wm_transient_for()
+        parent = accounting.call('GetProperty', 'WM_TRANSIENT_FOR', 
+                                 self._win.get_wm_transient_for)
         if parent:
             return parent.id
         else:
@@ -176,7 +194,8 @@ class Window(XObject):
         # _NET_WM_NAME, UTF8_STRING
         name = self.get_property('_NET_WM_NAME')
         if not name:
-            name = self._win.get_full_property(Xatom.WM_NAME, 0)
+            # WM_NAME, STRING
+            name = self.get_property('WM_NAME')
             if not name:        
                 return ''
         return name.value
@@ -184,15 +203,19 @@ class Window(XObject):
     @property
     def class_name(self):
         """Return window's class name."""
-        class_name = self._win.get_wm_class()
+        # WM_CLASS, STRING instance\0class\0
+        class_name = self.get_property('WM_CLASS')
         if class_name:
-            return '.'.join(class_name)
+            parts = class_name.value.split('\0')
+            if len(parts) >= 2:
+                return '.'.join(parts[:2])
         return ''
 
     @property
     def client_machine(self):
         """Return name of window's client machine."""
-        client = self._win.get_wm_client_machine()
+        client = accounting.call('GetProperty', 'WM_CLIENT_MACHINE', 
+                                 self._win.get_wm_client_machine)
         return client
 
     @property
@@ -302,12 +325,51 @@ class Window(XObject):
             #extents = (0, 0, 0, 0) # if border is not retained
         return Extents(*extents)
 
+    def _get_geometry(self):
+        """Return raw geometry as returned by X Server."""
+        return accounting.call('GetGeometry', None, 
+                               self.backend().get_geometry, self._win)
+
+    def _get_normal_hints(self):
+        """Return WM_NORMAL_HINTS as returned by X Server."""
+        return accounting.call('GetProperty', 'WM_NORMAL_HINTS', 
+                               self._win.get_wm_normal_hints)
+
+    @property
+    def size_limits(self):
+        """Return minimal, and maximal size of the window (with extents).
+
+        Width, or height is 0 if it's not limited.
+
+        """
+        hints = self._get_normal_hints()
+        if not hints:
+            return Size(0, 0), Size(0, 0)
+        extents = self.extents
+        def limit(value, extent):
+            return value and value + extent
+        return (Size(limit(hints.min_width, extents.horizontal),
+                     limit(hints.min_height, extents.vertical)),
+                Size(limit(hints.max_width, extents.horizontal),
+                     limit(hints.max_height, extents.vertical)))
+
+    @property
+    def size_increments(self):
+        """Return size increments of the window (1 if size is not stepped)."""
+        hints = self._get_normal_hints()
+        if not hints:
+            return Size(1, 1)
+        return Size(hints.width_inc or 1, hints.height_inc or 1)
+
     def __geometry(self):
         """Return raw geometry info (translated if needed)."""
-        geometry = self._win.get_geometry()
+        geometry = self._get_geometry()
         if self.wm_type in Hacks.PARENT_XY:
             # Hack for Fluxbox, Window Maker
-            parent_geo = self._win.query_tree().parent.get_geometry()
+            parent = accounting.call('QueryTree', None, 
+                                     self._win.query_tree).parent
+            parent_geo = accounting.call('GetGeometry', None, 
+                                         parent.get_geometry)
             geometry.x = parent_geo.x
             geometry.y = parent_geo.y
         return (geometry.x, geometry.y, 
@@ -358,7 +420,7 @@ class Window(XObject):
         height = geometry.height - extents.vertical
         geometry_size = (width, height)
         current = self.__geometry()
-        hints = self._win.get_wm_normal_hints()
+        hints = self._get_normal_hints()
         # This is a fix for WINE, OpenOffice and KeePassX windows
         if hints and hints.win_gravity == X.StaticGravity:
             x += extents.left
@@ -396,7 +458,8 @@ class Window(XObject):
         if (width, height) != geometry_size:
             x = x + (geometry_size[0] - width) * on_resize.x
             y = y + (geometry_size[1] - height) * on_resize.y
-        self._win.configure(x=x, y=y, width=width, height=height)
+        accounting.call('ConfigureWindow', None, self._win.configure, 
+                        x=x, y=y, width=width, height=height)
 
     def moveresize(self, geometry):
         """Works like set_geometry, but using _NET_MOVERESIZE_WINDOW
@@ -439,7 +502,8 @@ class Window(XObject):
 
     def iconify(self, mode):
         """Iconify (minimize) window."""
-        state = self._win.get_wm_state().state
+        state = accounting.call('GetProperty', 'WM_STATE', 
+                                self._win.get_wm_state).state
         if mode == 1 or \
            mode == 2 and state == Xutil.NormalState:
             set_state = Xutil.IconicState
@@ -517,8 +581,8 @@ class Window(XObject):
 
     def destroy(self):
         """Unmap and destroy window."""
-        self._win.unmap()
-        self._win.destroy()
+        accounting.call('UnmapWindow', None, self._win.unmap)
+        accounting.call('DestroyWindow', None, self._win.destroy)
 
     def __change_state(self, data):
         """Send _NET_WM_STATE event to the root window."""
@@ -572,6 +636,69 @@ class Window(XObject):
         logger.info('Query_tree=%s' % getattr(win.query_tree(), '_data'))
 
 
+class WindowSnapshot(Window):
+
+    """Window with some properties, and geometry already fetched.
+
+    Prefetched values are never updated, so use snapshot only for short 
+    computations (like filtering windows) and drop it afterwards.
+
+    """
+
+    def __init__(self, win_id, prefetched):
+        """
+        win_id - id of the window
+        prefetched - dict as returned by XObject.prefetch()
+        """
+        Window.__init__(self, win_id)
+        self.__prefetched = prefetched
+
+    def get_property(self, name):
+        """Return prefetched property, or fetch it if needed."""
+        if name in self.__prefetched:
+            return self.__prefetched[name]
+        return Window.get_property(self, name)
+
+    def _get_geometry(self):
+        """Return prefetched raw geometry, or fetch it if needed."""
+        if 'geometry' in self.__prefetched:
+            return self.__prefetched['geometry']
+        return Window._get_geometry(self)
+
+    def _get_normal_hints(self):
+        """Return prefetched WM_NORMAL_HINTS, or fetch them if needed."""
+        hints = self.__prefetched.get('WM_NORMAL_HINTS')
+        if hints and hints.format == 32:
+            # Mimics Xlib's Window.get_wm_normal_hints()
+            value = rq.encode_array(hints.value)
+            if len(value) == icccm.WMNormalHints.static_size:
+                return icccm.WMNormalHints.parse_binary(value, 
+                                                        self._win.display)[0]
+        return Window._get_normal_hints(self)
+
+    def __repr__(self):
+        return '<WindowSnapshot id=%s>' % (self.id,)
+
+
+def match_points(match, name, class_name):
+    """Return points for window's name and class name matching given text.
+
+    All arguments should be lowercase unicode strings. 
+    Returns 0 if neither name, nor class name match.
+
+    """
+    points = 0
+    if name == match:
+        points += 200
+    elif match in name:
+        left = name.find(match)
+        right = (name.rfind(match) - len(name) + len(match)) * -1
+        points += 150 - min(left, right)
+    if match in class_name:
+        points += 100
+    return points
+
+
 class WindowManager(XObject):
     
     """Window Manager (or root window in X programming terms).
@@ -601,6 +728,10 @@ class WindowManager(XObject):
             return cls.__INSTANCE
         manager = object.__new__(cls)
         XObject.__init__(manager)
+        # WindowIndex kept up to date by events (see core.index), or None
+        manager.index = None
+        # FocusHistory of recently active windows (see focus_service), or None
+        manager.history = None
         cls.__INSTANCE = manager
         manager.update_type()
         return manager
@@ -783,11 +914,11 @@ class WindowManager(XObject):
         Position is relative to desktop.
         
         """
-        screens_by_intersection = ((screen & geometry, screen)
-                                   for screen in self.screen_geometries())
-        screens_by_area = ((intersection.area, screen)
-                           for intersection, screen in screens_by_intersection
-                           if intersection)
+        screens = self.screen_geometries()
+        edges = Rectangles(screens)
+        screens_by_area = select(zip(edges.intersection_areas(geometry), 
+                                     screens),
+                                 edges.overlap(geometry, touching=True))
         largest_area, screen = sorted(screens_by_area)[-1]
         return screen & self.workarea_geometry
 
@@ -821,51 +952,101 @@ class WindowManager(XObject):
         windows_ids.reverse()
         return windows_ids
 
-    def windows(self, filter=None, match='', stacking=True):
-        """Return list of all windows (newest/on top first)."""
+    def snapshots(self, windows, fields):
+        """Return list of WindowSnapshots with given fields prefetched.
+
+        Snapshot is None if window doesn't exist anymore.
+
+        """
+        names = set()
+        for field in fields:
+            names.update(Window.FIELDS.get(field, []))
+        geometry = 'geometry' in fields
+        snapshots = []
+        for window, data in zip(windows, 
+                                self.prefetch(windows, names, geometry)):
+            if data is None:
+                snapshots.append(None)
+            else:
+                snapshots.append(WindowSnapshot(window.id, data))
+        return snapshots
+
+    def windows(self, filter=None, match='', stacking=True, limit=None):
+        """Return list of all windows (newest/on top first).
+
+        If match is given windows are sorted by name matching, and only
+        limit best matching windows are returned (all if limit is None).
+        
+        If filter provides select(windows) method (see core.filters) it is 
+        used, so all windows are checked using single prefetch.
+        If WindowIndex is running, and filter provides narrow(index) method,
+        only windows returned by the index are checked.
+
+        """
         # TODO: regexp matching?
         windows_ids = self.windows_ids(stacking)
+        if filter and self.index is not None and hasattr(filter, 'narrow'):
+            indexed = filter.narrow(self.index)
+            if indexed is not None:
+                windows_ids = [win_id for win_id in windows_ids 
+                                      if win_id in indexed]
         windows = [Window(win_id) for win_id in windows_ids]
-        if filter:
+        if filter and hasattr(filter, 'select'):
+            windows = filter.select(windows)
+        elif filter:
             windows = [window for window in windows if filter(window)]
         if match:
-            windows = self.__name_matcher(windows, match)
+            windows = self.__name_matcher(windows, match, limit)
         return windows
 
-    def __name_matcher(self, windows, match):
-        """Filter and sort windows with matching name or class name."""
+    def __name_matcher(self, windows, match, limit=None):
+        """Filter and sort windows with matching name or class name.
+
+        If WindowIndex is running windows are found using its search index,
+        so names of all windows don't need to be fetched.
+
+        """
         match = match.strip().lower()
-        # TODO: match.decode('utf-8') if not unicode
+        if not isinstance(match, unicode):
+            match = match.decode('utf-8')
+        if self.index is not None:
+            windows_ids = [window.id for window in windows]
+            windows = dict(zip(windows_ids, windows))
+            windows_ids = self.index.search(match, windows_ids, limit)
+            return [windows[win_id] for win_id in windows_ids]
         desktop = self.desktop
         workarea = self.workarea_geometry
-        def mapper(window, points=0):
-            name = window.name.lower().decode('utf-8')
-            if name == match:
-                points += 200
-            elif match in name:
-                left = name.find(match)
-                right = (name.rfind(match) - len(name) + len(match)) * -1
-                points += 150 - min(left, right)
-            if match in window.class_name.lower():
-                points += 100
+        def mapper(window):
+            name = window.name.decode('utf-8', 'replace').lower()
+            class_name = window.class_name.decode('utf-8', 'replace').lower()
+            points = match_points(match, name, class_name)
             try:
                 geometry = window.geometry
             except:
-                return (window, 0)
+                return (window, 0, None)
             if points and \
                (window.desktop == desktop or \
                 window.desktop == Window.ALL_DESKTOPS):
                 points += 50
-                if geometry.x < workarea.x2 and \
-                   geometry.x2 > workarea.x and \
-                   geometry.y < workarea.y2 and \
-                   geometry.y2 > workarea.y:
-                    points += 100
-            return (window, points)
-        windows = map(mapper, windows)
-        windows.sort(key=lambda win: win[1], reverse=True)
-        windows = [win for win, points in windows if points]
-        return windows
+                return (window, points, geometry)
+            return (window, points, None)
+        scored = [(window, points, geometry) 
+                  for window, points, geometry in map(mapper, windows)
+                  if points]
+        # windows on current desktop get bonus if they are on workarea too
+        on_desktop = [number for number, (window, points, geometry) 
+                             in enumerate(scored) if geometry is not None]
+        on_workarea = Rectangles([scored[number][2] 
+                                  for number in on_desktop]).overlap(workarea)
+        bonus = set(select(on_desktop, on_workarea))
+        windows = [(window, points + 100 * (number in bonus)) 
+                   for number, (window, points, geometry) in enumerate(scored)]
+        key = lambda win: win[1]
+        if limit:
+            windows = heapq.nlargest(limit, windows, key=key)
+        else:
+            windows.sort(key=key, reverse=True)
+        return [win for win, points in windows]
 
     def unregister_all(self):
         """Unregister all event handlers for all windows."""
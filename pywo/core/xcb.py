@@ -0,0 +1,241 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""xcb.py - optional XCB (xcffib) backend for the X layer.
+
+XCBBackend sends GetProperty, and GetGeometry requests on its own XCB
+connection. Every request returns a cookie right away, and replies are
+collected later, so prefetching properties of many windows takes single
+round trip without python-xlib's request queue (and its locks).
+Replies are converted to what python-xlib returns, so the rest of PyWO
+works the same with both backends.
+
+Events, key grabs, and all other requests still use python-xlib.
+Requests queued by python-xlib are flushed before XCB requests are sent,
+but connections are not synchronized.
+
+Enabled with "xcb_backend = on" in [SETTINGS], if xcffib is installed.
+
+"""
+
+import logging
+import time
+from array import array
+
+try:
+    import xcffib
+    import xcffib.xproto
+except ImportError:
+    xcffib = None
+
+from Xlib import X
+from Xlib.protocol import rq
+
+from pywo.core import accounting
+from pywo.core.xlib import XlibBackend, XObject
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+# Length of property (in 32-bit units) requested first, like python-xlib does
+SIZE_HINT = 64
+
+
+class Property(object):
+
+    """GetProperty reply converted to python-xlib's GetProperty reply."""
+
+    def __init__(self, reply):
+        self.property_type = reply.type
+        self.format = reply.format
+        self.bytes_after = reply.bytes_after
+        data = reply.value.buf()
+        if reply.format == 8:
+            self.value = data
+        else:
+            code = rq.array_unsigned_codes[reply.format // 8]
+            self.value = array(code, data)
+
+
+def errors():
+    """Return exceptions raised for windows that don't exist anymore."""
+    return (xcffib.xproto.BadWindow, xcffib.xproto.BadDrawable)
+
+
+class XCBPrefetch(object):
+
+    """Pipelined requests for properties, and geometries of objects.
+
+    Same as xlib.Prefetch, but using XCB cookies.
+
+    """
+
+    def __init__(self, backend, objects, atoms, geometry=False):
+        """
+        backend - XCBBackend sending requests
+        objects - XObjects
+        atoms - list of (name, atom) of properties
+        geometry - fetch raw geometry too
+        """
+        self.__backend = backend
+        self.__atoms = atoms
+        self.__pending = []
+        for obj in objects:
+            win = obj._win
+            cookies = {}
+            for name, atom in atoms:
+                cookies[name] = backend.request_property(win, atom)
+                accounting.add('GetProperty', name, round_trip=False)
+            if geometry:
+                cookies['geometry'] = backend.request_geometry(win)
+                accounting.add('GetGeometry', round_trip=False)
+            self.__pending.append((win, cookies))
+        self.__pipelined = len(objects) * (len(atoms) + bool(geometry))
+
+    def ready(self):
+        """Return True, replies() waits for replies if needed.
+
+        xcffib doesn't check for replies without blocking, but all
+        requests are already sent, so it's single round trip anyway.
+
+        """
+        return True
+
+    def replies(self):
+        """Return list of prefetched dicts, wait for replies if needed."""
+        start = time.time()
+        prefetched = []
+        for win, cookies in self.__pending:
+            try:
+                prefetched.append(self.__replies(win, cookies))
+            except errors():
+                prefetched.append(None)
+        if self.__pipelined:
+            # single round trip for all pipelined requests
+            accounting.add('Pipeline', '%s replies' % self.__pipelined,
+                           time.time() - start)
+        return prefetched
+
+    def __replies(self, win, cookies):
+        """Return properties, and geometry from cookies."""
+        fetched = {}
+        for name, atom in self.__atoms:
+            reply = cookies[name].reply()
+            if reply.bytes_after:
+                # Property is longer than expected, fetch the rest
+                fetched[name] = accounting.call('GetProperty', name,
+                                                self.__backend.rest,
+                                                win, atom, reply)
+            else:
+                fetched[name] = reply.type and Property(reply) or None
+        if 'geometry' in cookies:
+            fetched['geometry'] = cookies['geometry'].reply()
+        return fetched
+
+
+class XCBBackend(object):
+
+    """Backend sending property, and geometry requests using xcffib.
+
+    Same interface as xlib.XlibBackend.
+
+    """
+
+    name = 'xcb'
+
+    def __init__(self, display_name=None):
+        self.__connection = xcffib.connect(display=display_name)
+        self.__core = self.__connection.core
+
+    def request_property(self, win, atom, offset=0, length=SIZE_HINT):
+        """Send GetProperty request, return cookie."""
+        return self.__core.GetProperty(False, win.id, atom,
+                                       X.AnyPropertyType, offset, length)
+
+    def request_geometry(self, win):
+        """Send GetGeometry request, return cookie."""
+        return self.__core.GetGeometry(win.id)
+
+    def rest(self, win, atom, reply):
+        """Return Property with the rest of value fetched after reply.
+
+        Mimics Window.get_full_property().
+
+        """
+        rest = self.request_property(win, atom, SIZE_HINT,
+                                     reply.bytes_after // 4 + 1).reply()
+        property = Property(reply)
+        property.value += Property(rest).value
+        property.bytes_after = rest.bytes_after
+        return property
+
+    def get_property(self, win, atom):
+        """Return property of window (None if there's no such property)."""
+        XObject.flush()
+        reply = self.request_property(win, atom).reply()
+        if not reply.type:
+            return None
+        if reply.bytes_after:
+            return self.rest(win, atom, reply)
+        return Property(reply)
+
+    def get_geometry(self, win):
+        """Return raw geometry of window."""
+        XObject.flush()
+        return self.request_geometry(win).reply()
+
+    def prefetch(self, objects, atoms, geometry=False):
+        """Return XCBPrefetch with requests sent for all objects."""
+        XObject.flush()
+        prefetch = XCBPrefetch(self, objects, atoms, geometry)
+        self.flush()
+        return prefetch
+
+    def flush(self):
+        """Flush request queue to X Server."""
+        self.__connection.flush()
+
+    def close(self):
+        """Close connection to X Server."""
+        self.__connection.disconnect()
+
+
+def enable(display_name=None):
+    """Use XCBBackend for all XObjects.
+
+    Return False (and keep current backend) if xcffib is not available.
+
+    """
+    if xcffib is None:
+        log.warning('xcffib not available, using python-xlib backend')
+        return False
+    XObject.set_backend(XCBBackend(display_name))
+    return True
+
+
+def disable():
+    """Use python-xlib backend for all XObjects."""
+    backend = XObject.backend()
+    if backend.name == XCBBackend.name:
+        backend.close()
+        XObject.set_backend(XlibBackend())
@@ -21,13 +21,18 @@
 """xlib.py - connecting with X Server, and handling all communication."""
 
 import logging
+import time
+import weakref
 
 # NOTE: without import Xlib.threaded python-xlib is not thread-safe!
 from Xlib import threaded
 from Xlib import X, XK, error
 from Xlib.display import Display
+from Xlib.protocol import request
 from Xlib.protocol.event import ClientMessage
+from Xlib.xobject.drawable import Drawable
 
+from pywo.core import accounting
 from pywo.core.basic import CustomTuple, Geometry
 from pywo.core.dispatch import EventDispatcher
 
@@ -38,6 +43,37 @@ __author__ = "Wojciech 'KosciaK' Pietrzok, Antti Kaihola"
 log = logging.getLogger(__name__)
 
 
+class XlibBackend(object):
+
+    """Backend sending property, and geometry requests using python-xlib.
+
+    Backend is used by XObject for GetProperty, and GetGeometry requests,
+    which are the most frequent ones. Backends must return properties
+    like Window.get_full_property(), and geometries like 
+    Window.get_geometry() does (see pywo/core/xcb.py).
+
+    """
+
+    name = 'xlib'
+
+    def get_property(self, win, atom):
+        """Return property of window (None if there's no such property)."""
+        return win.get_full_property(atom, 0)
+
+    def get_geometry(self, win):
+        """Return raw geometry of window."""
+        return win.get_geometry()
+
+    def prefetch(self, objects, atoms, geometry=False):
+        """Return Prefetch with requests sent for all objects."""
+        return Prefetch(objects, atoms, geometry)
+
+    def flush(self):
+        """Flush request queue to X Server."""
+        # requests are sent using XObject's Display
+        pass
+
+
 class XObject(object):
 
     """Abstract base class for classes communicating with X Server.
@@ -50,6 +86,7 @@ class XObject(object):
     __DISPLAY = Display()
     __EVENT_DISPATCHER = EventDispatcher(__DISPLAY)
     __BAD_ACCESS = error.CatchError(error.BadAccess)
+    __BACKEND = XlibBackend()
 
     # List of recognized key modifiers
     __KEY_MODIFIERS = {'Alt': X.Mod1Mask,
@@ -66,6 +103,8 @@ class XObject(object):
                       }
 
     __KEYCODES = {}
+    # Interned atoms {display: {name: atom, }, }
+    __ATOMS = weakref.WeakKeyDictionary()
 
     __WM_TYPE = None
 
@@ -97,27 +136,65 @@ class XObject(object):
 
     @classmethod
     def atom(cls, name):
-        """Return atom with given name."""
-        return cls.__DISPLAY.intern_atom(name)
+        """Return atom with given name.
+
+        Atoms never change, so InternAtom is sent only once for every name.
+
+        """
+        atoms = cls.__ATOMS.setdefault(cls.__DISPLAY, {})
+        if name not in atoms:
+            atoms[name] = accounting.call('InternAtom', name, 
+                                          cls.__DISPLAY.intern_atom, name)
+        return atoms[name]
 
     @classmethod
     def atom_name(cls, atom):
         """Return atom's name."""
-        return cls.__DISPLAY.get_atom_name(atom)
+        return accounting.call('GetAtomName', atom, 
+                               cls.__DISPLAY.get_atom_name, atom)
 
     def get_property(self, name):
         """Return property (None if there's no such property)."""
         atom = self.atom(name)
-        property = self._win.get_full_property(atom, 0)
+        property = accounting.call('GetProperty', name, 
+                                   self.__BACKEND.get_property, 
+                                   self._win, atom)
         return property
 
+    @classmethod
+    def prefetch(cls, objects, names=(), geometry=False):
+        """Return list of properties, and geometries of all given objects.
+
+        For every object dict {name: property, } is returned, with raw 
+        geometry stored as 'geometry' (if requested), or None if object 
+        doesn't exist anymore.
+        All requests are sent before waiting for any reply, so it takes one 
+        round trip to X Server no matter how many objects and properties 
+        are fetched.
+
+        """
+        atoms = [(name, cls.atom(name)) for name in names]
+        return cls.__BACKEND.prefetch(objects, atoms, geometry).replies()
+
+    @classmethod
+    def set_backend(cls, backend):
+        """Set backend used for property, and geometry requests."""
+        log.debug('Using %s backend' % backend.name)
+        cls.__BACKEND = backend
+
+    @classmethod
+    def backend(cls):
+        """Return backend used for property, and geometry requests."""
+        return cls.__BACKEND
+
     def send_event(self, data, event_type, mask):
         """Send event to the root window."""
         event = ClientMessage(
                     window=self._win,
                     client_type=event_type,
                     data=(32, (data)))
-        self.__root.send_event(event, event_mask=mask)
+        accounting.call('SendEvent', event_type, 
+                        self.__root.send_event, event, event_mask=mask)
 
     def register(self, event_handler):
         """Register new event handler and update event mask."""
@@ -133,6 +210,20 @@ class XObject(object):
         masks = self.__EVENT_DISPATCHER.unregister(self, event_handler)
         self.__set_event_mask(masks)
 
+    @classmethod
+    def set_event_loop(cls, loop):
+        """Read events in core.loop.Loop instead of EventDispatcher thread.
+
+        loop - Loop, or None to use EventDispatcher thread again
+
+        """
+        cls.__EVENT_DISPATCHER.set_loop(loop)
+
+    @classmethod
+    def set_recorder(cls, recorder):
+        """Set recorder of all dispatched events (None to stop recording)."""
+        cls.__EVENT_DISPATCHER.recorder = recorder
+
     def _unregister_all(self):
         """Unregister all event handlers for all windows."""
         masks = self.__EVENT_DISPATCHER.unregister()
@@ -146,13 +237,15 @@ class XObject(object):
                   ([str(e) for e in masks], self))
         for mask in masks:
             event_mask = event_mask | mask
-        self._win.change_attributes(event_mask=event_mask)
+        accounting.call('ChangeWindowAttributes', None, 
+                        self._win.change_attributes, event_mask=event_mask)
 
     def __grab_key(self, keycode, modifiers):
         """Grab key."""
-        self._win.grab_key(keycode, modifiers, 
-                           1, X.GrabModeAsync, X.GrabModeAsync,
-                           onerror=self.__BAD_ACCESS)
+        accounting.call('GrabKey', None, 
+                        self._win.grab_key, keycode, modifiers, 
+                        1, X.GrabModeAsync, X.GrabModeAsync,
+                        onerror=self.__BAD_ACCESS)
         self.sync()
         if self.__BAD_ACCESS.get_error():
             log.error("Can't use %s" % self.keycode2str(modifiers, keycode))
@@ -179,23 +272,30 @@ class XObject(object):
 
         """
         if numlock in [0, 2] and capslock in [0, 1]:
-            self._win.ungrab_key(keycode, modifiers)
+            self.__ungrab_key(keycode, modifiers)
         if numlock in [0, 2] and capslock in [1, 2]:
-            self._win.ungrab_key(keycode, modifiers | X.LockMask)
+            self.__ungrab_key(keycode, modifiers | X.LockMask)
         if numlock in [1, 2] and capslock in [0, 2]:
-            self._win.ungrab_key(keycode, modifiers | X.Mod2Mask)
+            self.__ungrab_key(keycode, modifiers | X.Mod2Mask)
         if numlock in [1, 2] and capslock in [1, 2]:
-            self._win.ungrab_key(keycode, modifiers | X.LockMask | X.Mod2Mask)
+            self.__ungrab_key(keycode, modifiers | X.LockMask | X.Mod2Mask)
+
+    def __ungrab_key(self, keycode, modifiers):
+        """Ungrab key."""
+        accounting.call('UngrabKey', None, 
+                        self._win.ungrab_key, keycode, modifiers)
 
     def draw_rectangle(self, x, y, width, height, line):
         """Draw simple rectangle on screen."""
         color = self.__DISPLAY.screen().black_pixel
-        gc = self.__root.create_gc(line_width=line,
-                                   join_style=X.JoinRound,
-                                   foreground=color,
-                                   function=X.GXinvert,
-                                   subwindow_mode=X.IncludeInferiors,)
-        self.__root.rectangle(gc, x, y, width, height)
+        gc = accounting.call('CreateGC', None, 
+                             self.__root.create_gc, line_width=line,
+                             join_style=X.JoinRound,
+                             foreground=color,
+                             function=X.GXinvert,
+                             subwindow_mode=X.IncludeInferiors,)
+        accounting.call('PolyRectangle', None, 
+                        self.__root.rectangle, gc, x, y, width, height)
 
     def _translate_coords(self, x, y):
         """Return translated coordinates.
@@ -204,7 +304,8 @@ class XObject(object):
         Translated coordinates are relative to desktop.
 
         """
-        return self._win.translate_coords(self.__root, x, y)
+        return accounting.call('TranslateCoords', None, 
+                               self._win.translate_coords, self.__root, x, y)
 
     @classmethod
     def str2modifiers(cls, masks, splitted=False):
@@ -290,7 +391,9 @@ class XObject(object):
         """
         try:
             geometries = []
-            for screen in cls.__DISPLAY.xinerama_query_screens().screens:
+            screens = accounting.call('XineramaQueryScreens', None,
+                                      cls.__DISPLAY.xinerama_query_screens)
+            for screen in screens.screens:
                 geometries.append(Geometry(screen.x, screen.y,
                                            screen.width, screen.height))
             return geometries
@@ -298,6 +401,20 @@ class XObject(object):
             root = cls.__DISPLAY.root
             return [Geometry(0, 0, root.screen_width, root.screen_height)]
 
+    @classmethod
+    def fileno(cls):
+        """Return file descriptor of connection to X Server."""
+        return cls.__DISPLAY.fileno()
+
+    @classmethod
+    def pending_events(cls):
+        """Read data available on connection, return number of events queued.
+
+        Replies to pipelined requests are read as well.
+
+        """
+        return cls.__DISPLAY.pending_events()
+
     @classmethod
     def flush(cls):
         """Flush request queue to X Server."""
@@ -306,5 +423,111 @@ class XObject(object):
     @classmethod
     def sync(cls):
         """Flush request queue to X Server, wait until server processes them."""
-        cls.__DISPLAY.sync()
+        # Xlib waits for reply to GetInputFocus request
+        accounting.call('GetInputFocus', None, cls.__DISPLAY.sync)
 
+
+class Prefetch(object):
+
+    """Pipelined requests for properties, and geometries of objects.
+
+    All requests are sent (queued) when Prefetch is created, replies are
+    collected by replies(). Use ready() to check if replies() would block.
+
+    """
+
+    def __init__(self, objects, atoms, geometry=False):
+        """
+        objects - XObjects
+        atoms - list of (name, atom) of properties
+        geometry - fetch raw geometry too
+        """
+        self.__atoms = atoms
+        self.__pending = []
+        self.__pipelined = 0
+        for obj in objects:
+            win = obj._win
+            if not isinstance(win, Drawable):
+                # Can't pipeline requests, fetch them one by one
+                self.__pending.append((win, None))
+                continue
+            requests = {}
+            for name, atom in atoms:
+                requests[name] = request.GetProperty(
+                                    display=win.display, defer=True,
+                                    delete=0, window=win, property=atom,
+                                    type=X.AnyPropertyType,
+                                    long_offset=0, long_length=64)
+                accounting.add('GetProperty', name, round_trip=False)
+            if geometry:
+                requests['geometry'] = request.GetGeometry(
+                                        display=win.display, defer=True,
+                                        drawable=win)
+                accounting.add('GetGeometry', round_trip=False)
+            self.__pending.append((win, requests))
+            self.__pipelined += len(requests)
+        self.__geometry = geometry
+
+    def ready(self):
+        """Return True if all replies (or errors) have been received."""
+        for win, requests in self.__pending:
+            for reply in (requests or {}).values():
+                # NOTE: python-xlib sets _data, or _error of the request
+                #       when response is read from the connection
+                if reply._data is None and reply._error is None:
+                    return False
+        return True
+
+    def replies(self):
+        """Return list of prefetched dicts, wait for replies if needed."""
+        start = time.time()
+        prefetched = []
+        for win, requests in self.__pending:
+            try:
+                if requests is None:
+                    prefetched.append(self.__fetch(win))
+                else:
+                    prefetched.append(self.__replies(win, requests))
+            except (error.BadWindow, error.BadDrawable):
+                prefetched.append(None)
+        if self.__pipelined:
+            # single round trip for all pipelined requests
+            accounting.add('Pipeline', '%s replies' % self.__pipelined, 
+                           time.time() - start)
+        return prefetched
+
+    def __fetch(self, win):
+        """Return properties, and geometry fetched one by one."""
+        fetched = {}
+        for name, atom in self.__atoms:
+            fetched[name] = accounting.call('GetProperty', name, 
+                                            win.get_full_property, atom, 0)
+        if self.__geometry:
+            fetched['geometry'] = accounting.call('GetGeometry', None, 
+                                                  win.get_geometry)
+        return fetched
+
+    def __replies(self, win, requests):
+        """Return properties, and geometry from pipelined requests.
+        
+        Mimics Window.get_full_property() for each property.
+
+        """
+        fetched = {}
+        for name, atom in self.__atoms:
+            reply = requests[name]
+            reply.reply()
+            if not reply.property_type:
+                fetched[name] = None
+            elif reply.bytes_after:
+                # Property is longer than expected, fetch it again
+                fetched[name] = accounting.call('GetProperty', name, 
+                                                win.get_full_property, 
+                                                atom, 0)
+            else:
+                reply.format, reply.value = reply.value
+                fetched[name] = reply
+        if 'geometry' in requests:
+            requests['geometry'].reply()
+            fetched['geometry'] = requests['geometry']
+        return fetched
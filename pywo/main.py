@@ -29,7 +29,7 @@ import tempfile
 from pywo import actions, commandline
 from pywo.config import Config
 from pywo.core import Window, WindowManager, State, Type
-from pywo.core import filters
+from pywo.core import accounting, filters, recording, xcb
 from pywo.services import daemon
 
 
@@ -69,10 +69,18 @@ def run():
     # load config settings
     config = Config(options.config)
 
+    if config.settings.get('xcb_backend') == Config.ON:
+        xcb.enable()
+
     if options.start_daemon:
         log.info('Starting PyWO daemon...')
         daemon.setup(config)
-        daemon.start()
+        if options.record:
+            recording.start(options.record)
+        try:
+            daemon.start()
+        finally:
+            recording.stop()
     elif options.list_windows:
         WM = WindowManager()
         windows = WM.windows(filters.AND(
@@ -104,10 +112,16 @@ def run():
     elif options.help_more:
         commandline.print_help_more(config)
     elif args or options.action:
+        if options.explain:
+            accounting.start_trace()
         try:
             actions.perform(options, args, config)
         except actions.ActionException, exc:
             commandline.print_error(exc)
+        finally:
+            trace = accounting.stop_trace()
+            if trace:
+                print '\n'.join(trace.report(Window.atom_name))
     else:
         commandline.print_help()
 
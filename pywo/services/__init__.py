@@ -45,6 +45,11 @@ class Service(object):
     These three methods/functions must be implemented.
     You can't rely on the order of services to be loaded, started, or stopped.
 
+    Service can also implement optional reload(config) method/function. 
+    It is called on running service when configuration is reloaded, 
+    and should apply only changed settings. Services without reload() are
+    stopped, set up, and started again, but only if configuration changed.
+
     """
 
     def setup(self, config):
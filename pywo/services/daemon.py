@@ -24,13 +24,20 @@ It works almost like any other service, except it doesn't start new thread.
 
 """
 
+import errno
+import fcntl
 import logging
+import os
+import select
 import signal
-import time
 import threading
 
 from pywo.core import WindowManager
+from pywo.core.events import PropertyNotifyHandler
+from pywo.core.index import WindowIndex
 from pywo import actions
+from pywo.actions import grid_actions
+from pywo.config import Config
 from pywo.services import manager
 
 
@@ -42,6 +49,21 @@ log = logging.getLogger(__name__)
 
 __CONFIG = None
 WM = WindowManager()
+INDEX = WindowIndex()
+# Set when PyWO is exiting, main thread waits for it
+EXITING = threading.Event()
+# Pipe (read_fd, write_fd) waking up main-thread waiting in wait()
+__WAKEUP = None
+
+
+def wm_changed(event):
+    """Detect Window Manager type again, after it has been changed."""
+    log.info('Window Manager changed, detecting its type')
+    WM.update_type()
+
+# New Window Manager sets _NET_SUPPORTING_WM_CHECK when started
+WM_CHECK_HANDLER = PropertyNotifyHandler(wm_changed, 
+                                         ['_NET_SUPPORTING_WM_CHECK'])
 
 
 def setup(config):
@@ -56,6 +78,10 @@ def setup(config):
         actions.register(name='reload')(reload_pywo)
     __CONFIG = config
     WM.update_type()
+    try:
+        grid_actions.TABLES.load(__CONFIG)
+    except Exception, exc:
+        log.exception('Exception %s while building grid tables' % (exc,))
     manager.load(__CONFIG)
     failed = []
     for service in manager.get_all():
@@ -70,6 +96,11 @@ def setup(config):
 
 def start():
     """Start all services."""
+    EXITING.clear()
+    try:
+        INDEX.start()
+    except Exception, exc:
+        log.exception('Exception %s while %s start' % (exc, INDEX))
     failed = []
     for service in manager.get_all():
         try:
@@ -79,19 +110,60 @@ def start():
             failed.append(service)
     for service in failed:
         manager.remove(service)
+    WM.register(WM_CHECK_HANDLER)
     log.info('PyWO ready and running!')
-    # Simple loop for keeping main-thread running and make signal handlers work
-    counter = 0
-    while threading.currentThread().getName() == 'MainThread'  and \
-          threading.activeCount() > 1: 
-        time.sleep(1)
-        counter += 1
-        if counter % 10 == 0:
-            counter = 0
-            WM.update_type() # update WM type every 10 seconds
+    if threading.currentThread().getName() == 'MainThread':
+        wait()
     log.debug('Exited daemon loop, in %s' % threading.currentThread())
 
 
+def wait():
+    """Keep main-thread running until PyWO exits.
+
+    Main-thread sleeps in select() on a pipe, until wakeup() is called, 
+    or any signal is received (see signal.set_wakeup_fd), so signal 
+    handlers work, and there are no periodic wake-ups. Pipe is not lost 
+    if EXITING is set just before select() is called.
+
+    """
+    global __WAKEUP
+    read_fd, write_fd = os.pipe()
+    for fd in [read_fd, write_fd]:
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    __WAKEUP = (read_fd, write_fd)
+    previous = signal.set_wakeup_fd(write_fd)
+    try:
+        while not EXITING.isSet():
+            try:
+                select.select([read_fd], [], [])
+            except select.error, exc:
+                if exc.args[0] != errno.EINTR:
+                    raise
+            try:
+                os.read(read_fd, 4096)
+            except OSError, exc:
+                if exc.errno != errno.EAGAIN:
+                    raise
+    finally:
+        signal.set_wakeup_fd(previous)
+        __WAKEUP = None
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def wakeup():
+    """Wake up main-thread waiting in wait() (can be called from any thread)."""
+    wakeup_pipe = __WAKEUP
+    if wakeup_pipe is None:
+        return
+    try:
+        os.write(wakeup_pipe[1], '\0')
+    except OSError, exc:
+        # pipe is full (main-thread will wake up anyway), or already closed
+        log.debug("Can't wake up main-thread: %s" % (exc,))
+
+
 def stop():
     """Stop all services."""
     for service in manager.get_all():
@@ -99,24 +171,65 @@ def stop():
             service.stop()
         except Exception, exc:
             log.exception('Exception %s while %s stop' % (exc, service))
+    INDEX.stop()
+    WM.unregister(WM_CHECK_HANDLER)
     WM.unregister_all() # unregister all remaining EventHandlers
 
 
 def reload_pywo(win, config=None, *args):
-    """Stop services, (re)load configuration file, and start again."""
+    """(Re)load configuration file, and update services.
+
+    Running services implementing reload(config) are updated in place, 
+    other services are restarted only if configuration has changed.
+    WindowIndex, and grid tables (if sections are the same) are kept.
+
+    """
+    global __CONFIG
     log.info('Reloading PyWO...')
-    stop()
     filename = config or __CONFIG.filename
     log.info('Reloading configuration file: %s' % filename)
-    config = __CONFIG.load(filename)
-    setup(__CONFIG)
-    start()
+    old_config = __CONFIG
+    __CONFIG = Config(filename)
+    changed = __CONFIG != old_config
+    if not changed:
+        log.info('Configuration not changed')
+    try:
+        grid_actions.TABLES.load(__CONFIG)
+    except Exception, exc:
+        log.exception('Exception %s while building grid tables' % (exc,))
+    running = set(manager.get_all())
+    manager.load(__CONFIG)
+    for service in running - set(manager.get_all()):
+        try:
+            service.stop()
+        except Exception, exc:
+            log.exception('Exception %s while %s stop' % (exc, service))
+    failed = []
+    for service in manager.get_all():
+        try:
+            if service not in running:
+                service.setup(__CONFIG)
+                service.start()
+            elif hasattr(service, 'reload'):
+                service.reload(__CONFIG)
+            elif changed:
+                service.stop()
+                service.setup(__CONFIG)
+                service.start()
+        except Exception, exc:
+            log.exception('Exception %s while %s reload' % (exc, service))
+            failed.append(service)
+    for service in failed:
+        manager.remove(service)
+    log.info('PyWO reloaded')
 
 
 def exit_pywo(*args):
     """Stop sevices, and exit PyWO."""
     log.info('Exiting PyWO...')
     stop() # stop all services
+    EXITING.set()
+    wakeup()
 
 
 def interrupt_handler(*args):
@@ -32,6 +32,7 @@ import dbus.service
 from pywo import actions
 from pywo.core import WindowManager
 from pywo.core import filters
+from pywo.core import latency
 from pywo.actions import manager
 from pywo.actions import parser
 
@@ -102,6 +103,13 @@ class DBusService(dbus.service.Object):
                  (geometry.width, geometry.height),
                 )]
 
+    @dbus.service.method("net.kosciak.PyWO", 
+                         in_signature='', 
+                         out_signature='a(ssidddd)')
+    def GetLatency(self):
+        """Return [(action, stage, count, p50, p95, p99, max), ] in seconds."""
+        return latency.LATENCY.summary()
+
     # TODO: GetDesktops
     # TODO: GetDesktopInfo
 
@@ -123,6 +131,9 @@ loop = gobject.MainLoop()
 def setup(config):
     service.CONFIG = config
 
+def reload(config):
+    service.CONFIG = config
+
 def start():
     log.info('Starting PyWO D-Bus Service')
     thread = threading.Thread(name='D-Bus Service', target=loop.run)
@@ -0,0 +1,171 @@
+#
+# PyWO - Python Window Organizer
+# Copyright 2010, Wojciech 'KosciaK' Pietrzok
+#
+# This file is part of PyWO.
+#
+# PyWO is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyWO is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyWO.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""focus_service.py - keeps history of recently active windows.
+
+FocusHistory is attached to WindowManager as WindowManager().history, 
+so actions can find previously active windows without querying X Server.
+
+"""
+
+import collections
+import logging
+import threading
+
+from pywo.core import Window, WindowManager
+from pywo.core.events import PropertyNotifyHandler
+
+
+__author__ = "Wojciech 'KosciaK' Pietrzok"
+
+
+log = logging.getLogger(__name__)
+
+WM = WindowManager()
+
+# Maximal number of windows kept in history
+HISTORY_SIZE = 64
+
+
+class FocusHistory(object):
+
+    """Most recently used (active) windows' ids.
+
+    History is updated on _NET_ACTIVE_WINDOW changes, and windows no 
+    longer present in _NET_CLIENT_LIST are removed.
+
+    """
+
+    __ACTIVE_WINDOW = Window.atom('_NET_ACTIVE_WINDOW')
+    __CLIENT_LIST = Window.atom('_NET_CLIENT_LIST')
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.size = size
+        self.__lock = threading.Lock()
+        self.__windows = collections.OrderedDict() # {win_id: None, }
+        self.__handler = PropertyNotifyHandler(self.property, 
+                                               [self.__ACTIVE_WINDOW,
+                                                self.__CLIENT_LIST])
+
+    def start(self):
+        """Start listening for changes of active window."""
+        self.clear()
+        # Stacking order is the best guess of windows' focus order
+        for win_id in reversed(WM.windows_ids(stacking=True)):
+            self.activated(win_id)
+        active_id = WM.active_window_id()
+        if active_id:
+            self.activated(active_id)
+        WM.register(self.__handler)
+        WM.history = self
+        log.debug('%s started' % (self,))
+
+    def stop(self):
+        """Stop listening, and clear history."""
+        if WM.history is self:
+            WM.history = None
+        WM.unregister(self.__handler)
+        self.clear()
+        log.debug('%s stopped' % (self,))
+
+    def property(self, event):
+        """Handle PropertyNotifyEvent of the root window."""
+        if event.atom == self.__ACTIVE_WINDOW:
+            active_id = WM.active_window_id()
+            if active_id:
+                self.activated(active_id)
+        elif event.atom == self.__CLIENT_LIST:
+            self.prune(WM.windows_ids(stacking=False))
+
+    def activated(self, win_id):
+        """Move window to the top of the history."""
+        with self.__lock:
+            self.__windows.pop(win_id, None)
+            self.__windows[win_id] = None
+            while len(self.__windows) > self.size:
+                self.__windows.popitem(last=False)
+
+    def remove(self, win_id):
+        """Remove window from history."""
+        with self.__lock:
+            self.__windows.pop(win_id, None)
+
+    def prune(self, windows_ids):
+        """Remove windows not present in given windows' ids."""
+        windows_ids = set(windows_ids)
+        with self.__lock:
+            for win_id in self.__windows.keys():
+                if win_id not in windows_ids:
+                    del self.__windows[win_id]
+
+    def recent(self, number=0, skip=None):
+        """Return id of number-th most recent window, or None.
+
+        0 is the most recent (active) window. If skip is given, this 
+        window is not counted.
+
+        """
+        with self.__lock:
+            for win_id in reversed(self.__windows):
+                if win_id == skip:
+                    continue
+                if not number:
+                    return win_id
+                number -= 1
+        return None
+
+    def windows_ids(self):
+        """Return list of windows' ids, most recent first."""
+        with self.__lock:
+            return list(reversed(self.__windows))
+
+    def clear(self):
+        """Remove all windows from history."""
+        with self.__lock:
+            self.__windows.clear()
+
+    def __contains__(self, win_id):
+        return win_id in self.__windows
+
+    def __len__(self):
+        return len(self.__windows)
+
+    def __str__(self):
+        return '<FocusHistory windows=%s>' % (len(self.__windows),)
+
+
+HISTORY = FocusHistory()
+
+
+def setup(config):
+    pass
+
+def reload(config):
+    # history doesn't depend on config, keep it
+    pass
+
+def start():
+    log.info('Starting focus history')
+    HISTORY.start()
+
+
+def stop():
+    HISTORY.stop()
+    log.info('Focus history stopped')
+
@@ -26,6 +26,7 @@ import time
 from pywo import actions
 from pywo.core import WindowManager
 from pywo.core import events
+from pywo.core import latency
 
 
 __author__ = "Wojciech 'KosciaK' Pietrzok"
@@ -35,6 +36,9 @@ log = logging.getLogger(__name__)
 
 WM = WindowManager()
 
+# Log key press latency summary at most once per SUMMARY_INTERVAL seconds
+SUMMARY_INTERVAL = 600
+
 
 class PywoKeyPressHandler(events.KeyHandler):
 
@@ -43,29 +47,59 @@ class PywoKeyPressHandler(events.KeyHandler):
     def __init__(self, config=None):
         events.KeyHandler.__init__(self)
         self.config = config
-        self.mappings = {} # {(modifiers, keycode): (action, section), }
+        self.mappings = {} # {(modifiers, keycode): ActionPlan, }
+        self.clock = latency.ServerClock()
+        self.summary_logged = time.time()
         if self.config:
             self.set_config(self.config)
 
     def key_press(self, event):
-        """Event handler method for KeyPressEventHandler."""
-        if not (event.modifiers, event.keycode) in self.mappings:
+        """Event handler method for KeyPressEventHandler.
+
+        Time of every stage, from key press to the end of action, is added
+        to latency.LATENCY histograms. Key presses not reaching 'sync'
+        stage (action rejected by filter, or failed before performing) are
+        not recorded.
+
+        """
+        plan = self.mappings.get((event.modifiers, event.keycode))
+        if not plan:
             return
-        log.debug('%s' % (event,))
-        action, section = self.mappings[event.modifiers, event.keycode]
+        pressed = event.time and self.clock.to_local(event.time)
+        latency.start(pressed)
+        if pressed:
+            latency.mark('wakeup')
         try:
-            window = WM.active_window()
-            kwargs = action.get_kwargs(self.config, section)
-            action(window, **kwargs)
+            win = WM.active_window()
+            latency.mark('window')
+            plan(win)
         except actions.ActionException, exc:
             log.error(exc)
         except Exception, exc:
             log.exception(exc)
+        finally:
+            latency.finish(getattr(getattr(plan, 'action', None),
+                                   'name', None),
+                           required='sync')
+        if time.time() - self.summary_logged > SUMMARY_INTERVAL:
+            self.log_summary()
+
+    def log_summary(self):
+        """Log key press latency summary."""
+        self.summary_logged = time.time()
+        log.info('Key press latency:\n%s' %
+                 '\n'.join(latency.LATENCY.report()))
     
     def set_config(self, config):
-        """Set key mappings from config."""
+        """Set key mappings from config.
+        
+        Every key is mapped to ActionPlan, so all action's arguments are 
+        resolved here, and not when key is pressed.
+        
+        """
         self.config = config
-        self.mappings.clear()
+        # Build new mappings first, so keys are never left without actions
+        mappings = {}
         for action in actions.manager.get_all():
             if action.need_section:
                 mask = config.keys.get(action.name)
@@ -78,12 +112,15 @@ class PywoKeyPressHandler(events.KeyHandler):
                             (mod, keycode) = WM.str2modifiers_keycode(mask, key)
                         except ValueError:
                             log.exception('Invalid key for section %s' % section)
-                        self.mappings[(mod, keycode)] = (action, section)
+                            continue
+                        mappings[(mod, keycode)] = action.plan(config, 
+                                                               section)
             else:
                 key = config.keys.get(action.name)
                 if key and action not in config.ignored:
                     (mod, keycode) = WM.str2modifiers_keycode(key)
-                    self.mappings[(mod, keycode)] = (action, None)
+                    mappings[(mod, keycode)] = action.plan(config)
+        self.mappings = mappings
         self.keys = self.mappings.keys()
         self.numlock = config.numlock
         self.capslock = config.capslock
@@ -101,6 +138,7 @@ class ModalKeyHandler(events.KeyHandler):
 
     def __init__(self, config=None):
         events.KeyHandler.__init__(self)
+        self.config = None
         self.use_modal_mode = False
         self.in_pywo_mode = False
         self.pywo_handler = PywoKeyPressHandler()
@@ -145,8 +183,16 @@ class ModalKeyHandler(events.KeyHandler):
         WM.draw_rectangle(geo.x+2, geo.y+2, geo.width-4, geo.height-4, 4)
         WM.flush()
 
+    @staticmethod
+    def modal_settings(config):
+        """Return settings that can't be changed without regrabbing all keys."""
+        return (config.keys.get('pywo_mode'), 
+                getattr(config, 'modal_mode', None),
+                config.numlock, config.capslock)
+
     def set_config(self, config):
         """Set key mappings from config."""
+        self.config = config
         self.pywo_handler.set_config(config)
         pywo_mode_key = config.keys.get('pywo_mode')
         if not pywo_mode_key:
@@ -159,6 +205,25 @@ class ModalKeyHandler(events.KeyHandler):
         if not self.use_modal_mode:
             self.in_pywo_mode = True
 
+    def update_config(self, config, window):
+        """Set new key mappings, and grab or ungrab only changed keys.
+
+        Returns False if modal mode, NumLock or CapsLock settings changed,
+        so config can't be updated without ungrabbing all keys.
+
+        """
+        if not self.config or \
+           self.modal_settings(config) != self.modal_settings(self.config):
+            return False
+        self.config = config
+        old_keys = self.pywo_handler.keys
+        self.pywo_handler.set_config(config)
+        if self.in_pywo_mode or not self.use_modal_mode:
+            # PywoKeyPressHandler's keys are grabbed now
+            self.pywo_handler.regrab_keys(window, old_keys)
+        log.debug('Updated key mappings')
+        return True
+
     def grab_keys(self, window):
         """Grab keys for self, or PywoKeyPressHandler."""
         if self.use_modal_mode:
@@ -182,6 +247,12 @@ HANDLER = ModalKeyHandler()
 def setup(config):
     HANDLER.set_config(config)
 
+def reload(config):
+    if not HANDLER.update_config(config, WM):
+        stop()
+        setup(config)
+        start()
+
 def start():
     log.info('Registering keyboard shortcuts')
     HANDLER.grab_keys(WM)
@@ -189,6 +260,7 @@ def start():
 
 def stop():
     HANDLER.ungrab_keys(WM)
+    HANDLER.pywo_handler.log_summary()
     log.info('Keyboard shortcuts unregistered')
 
 
@@ -2,6 +2,8 @@
 
 To be used for testing purposes by emulating Xlib and Window Managers behaviour.
 Only methods used by PyWO will be implemented!
+Display counts requests sent by PyWO (by request type), and can simulate
+network latency by sleeping on every request waiting for a reply.
 It should be enough to just change the core.XObject._XObject__DISPLAY 
 to new mock instance, and change core.ClientMessage.
 
@@ -15,17 +17,26 @@ for them.
 import copy
 import collections
 import random
+import time
 
 from Xlib import X, XK, Xatom, Xutil, protocol, error
 import Xlib.display
 
 
+# Requests waiting for reply from X Server (round trips)
+REPLY_REQUESTS = frozenset(['GetProperty', 'GetGeometry', 'TranslateCoords',
+                            'QueryTree', 'InternAtom', 'GetAtomName',
+                            'GetWindowAttributes', 'GetInputFocus',
+                            'Pipeline'])
+
+
 class Value(object):
 
     """Simple wrapper for get_full_property()"""
 
     def __init__(self, value):
         self.value = value
+        self.format = [32, 8][isinstance(value, basestring)]
 
 
 class Geometry(object):
@@ -145,24 +156,54 @@ class Display(Xlib.display.Display):
 
     def __init__(self, screen_width, screen_height, 
                  desktops=1, viewports=None,
-                 extensions=None):
+                 extensions=None, latency=0):
         Xlib.display.Display.__init__(self)
         self.screen_width = screen_width
         self.screen_height = screen_height
+        # simulated round trip time in seconds (e.g. 0.005 for ssh -X)
+        self.latency = latency
+        # number of requests sent by PyWO, by request type
+        self.requests = collections.Counter()
+        self.atoms = {}
         # list of all created windows, oldest first
         self.all_windows = []
+        # the same windows by id, for fast lookups
+        self.windows_by_id = {}
         # stack of mapped windows
         self.windows_stack = collections.deque()
         self.root_id = Xlib.display.Display.screen(self).root.id
         self.root = RootWindow(self, desktops, viewports or [1, 1])
         self.extensions = extensions  or []
 
+    def request(self, name):
+        """Count request, wait for reply if it's reply-bearing request."""
+        self.requests[name] += 1
+        if self.latency and name in REPLY_REQUESTS:
+            time.sleep(self.latency)
+
+    @property
+    def round_trips(self):
+        """Return number of requests that waited for reply."""
+        return sum([count for name, count in self.requests.items()
+                          if name in REPLY_REQUESTS])
+
+    def reset_requests(self):
+        """Forget all counted requests."""
+        self.requests.clear()
+
+    def atom(self, name):
+        """Return atom, used by mock itself so request is not counted."""
+        if not name in self.atoms:
+            self.atoms[name] = Xlib.display.Display.intern_atom(self, name)
+        return self.atoms[name]
+
     def intern_atom(self, name, only_if_exists=0):
-        # Just delegate to real Display
-        return Xlib.display.Display.intern_atom(self, name, only_if_exists)
+        self.request('InternAtom')
+        return self.atom(name)
 
     def get_atom_name(self, atom):
         # Just delegate to real Display
+        self.request('GetAtomName')
         return Xlib.display.Display.get_atom_name(self, atom)
 
     def keysym_to_keycode(self, keysym):
@@ -179,56 +220,56 @@ class Display(Xlib.display.Display):
     def send_event(self, dest, event, event_mask, propagate, onerror):
         # ROOT related
         if dest == self.root and  \
-           event.client_type == self.intern_atom('_NET_CURRENT_DESKTOP'):
+           event.client_type == self.atom('_NET_CURRENT_DESKTOP'):
             desktop = event.data[1][0]
             desktop = max(desktop, 0)
             desktop = min(desktop, 
                           dest._prop('_NET_NUMBER_OF_DESKTOPS')[0] - 1)
             dest._prop('_NET_CURRENT_DESKTOP', [desktop])
         if dest == self.root and \
-           event.client_type == self.intern_atom('_NET_NUMBER_OF_DESKTOPS'):
+           event.client_type == self.atom('_NET_NUMBER_OF_DESKTOPS'):
             desktops = max(1, event.data[1][0])
             event.window._set_desktops(desktops)
         if dest == self.root and \
-           event.client_type == self.intern_atom('_NET_DESKTOP_VIEWPORT'):
+           event.client_type == self.atom('_NET_DESKTOP_VIEWPORT'):
             # TODO: set proper x, y
             pass
         # Window related
-        if event.client_type == self.intern_atom('_NET_ACTIVE_WINDOW'):
+        if event.client_type == self.atom('_NET_ACTIVE_WINDOW'):
             if event.window in self.windows_stack:
                 self.windows_stack.remove(event.window)
                 self.windows_stack.append(event.window)
                 event.window._prop('WM_STATE', [Xutil.NormalState, X.NONE])
                 event.window.wm_state = WM_STATE_NORMAL
                 state = event.window._prop('_NET_WM_STATE')
-                atom = self.intern_atom('_NET_WM_STATE_HIDDEN')
+                atom = self.atom('_NET_WM_STATE_HIDDEN')
                 if atom in state:
                     state.remove(atom)
                     event.window._prop('_NET_WM_STATE', state)
             # TODO: change viewport
-        if event.client_type == self.intern_atom('_NET_WM_DESKTOP'):
+        if event.client_type == self.atom('_NET_WM_DESKTOP'):
             desktop = event.data[1][0]
             desktop = max(desktop, 0)
             desktop = min(desktop, 
                           self.root._prop('_NET_NUMBER_OF_DESKTOPS')[0] - 1)
             event.window._prop('_NET_WM_DESKTOP', [desktop])
-        if event.client_type == self.intern_atom('WM_CHANGE_STATE') and \
+        if event.client_type == self.atom('WM_CHANGE_STATE') and \
            event.data[1][0] == Xutil.IconicState:
             event.window._prop('WM_STATE', [Xutil.IconicState, X.NONE])
             state = event.window._prop('_NET_WM_STATE')
-            atom = self.intern_atom('_NET_WM_STATE_HIDDEN')
+            atom = self.atom('_NET_WM_STATE_HIDDEN')
             if not atom in state:
                 state.append(atom)
                 event.window._prop('_NET_WM_STATE', state)
-        if event.client_type == self.intern_atom('WM_CHANGE_STATE') and \
+        if event.client_type == self.atom('WM_CHANGE_STATE') and \
            event.data[1][0] == Xutil.NormalState:
             event.window._prop('WM_STATE', [Xutil.NormalState, X.NONE])
             state = event.window._prop('_NET_WM_STATE')
-            atom = self.intern_atom('_NET_WM_STATE_HIDDEN')
+            atom = self.atom('_NET_WM_STATE_HIDDEN')
             if atom in state:
                 state.remove(atom)
                 event.window._prop('_NET_WM_STATE', state)
-        if event.client_type == self.intern_atom('_NET_WM_STATE'):
+        if event.client_type == self.atom('_NET_WM_STATE'):
             mode = event.data[1][0]
             atom = event.data[1][1]
             atom2 = event.data[1][2]
@@ -236,7 +277,7 @@ class Display(Xlib.display.Display):
                 event.window._set_state(atom, mode)
             if atom2:
                 event.window._set_state(atom2, mode)
-        if event.client_type == self.intern_atom('_NET_CLOSE_WINDOW'):
+        if event.client_type == self.atom('_NET_CLOSE_WINDOW'):
             event.window.destroy()
 
     def flush(self):
@@ -245,23 +286,25 @@ class Display(Xlib.display.Display):
 
     def sync(self):
         # No need to flush or sync, incoming events are processed as they come
-        pass
+        # but Xlib's sync() waits for reply to GetInputFocus request
+        self.request('GetInputFocus')
 
     def pending_events(self):
         # No events support for now
         return 0
 
     def next_event(self):
-        # This method should block when there are no events, but just return None
+        # This method should block when there are no events, 
+        # but just block for a while and return None
+        time.sleep(0.01)
         return None
 
     def create_resource_object(self, type, id):
         if type == 'window':
             if id == self.root.id:
                 return self.root
-            for win in self.all_windows:
-                if win.id == id:
-                    return win
+            if id in self.windows_by_id:
+                return self.windows_by_id[id]
             raise error.BadWindow() # Window with this id not found
         else:
             # only need to return windows
@@ -273,21 +316,25 @@ class AbstractWindow(object):
 
     def __init__(self, display, id=None):
         self.display = display
-        while not id and \
-              id not in self.display.all_windows:
+        while not id or id in self.display.windows_by_id:
             id = random.randint(1000, self.display.root_id + 10000)
         self.id = id
         self.properties = {}
         self.display.all_windows.append(self)
+        self.display.windows_by_id[id] = self
 
     def get_full_property(self, property, type, sizehint=10):
+        self.display.request('GetProperty')
+        return self._full_property(property)
+
+    def _full_property(self, property):
         value = self.properties.get(property, None)
         if value:
             return Value(value)
         return None
 
     def atom(self, name):
-        return self.display.intern_atom(name)
+        return self.display.atom(name)
 
     def _prop(self, name, value=None):
         atom = self.atom(name)
@@ -305,8 +352,9 @@ class Window(AbstractWindow):
                  extents=EXTENTS_NORMAL, 
                  normal_hints=HINTS_NORMAL,
                  type=[],
-                 modal=False):
-        AbstractWindow.__init__(self, display)
+                 modal=False,
+                 id=None):
+        AbstractWindow.__init__(self, display, id)
         # Always place windows on FIRST desktop
         desktop = 0
         properties = {
@@ -324,65 +372,82 @@ class Window(AbstractWindow):
         }
         self.properties.update(properties)
         if class_name:
-            self.properties[Xatom.WM_CLASS] = class_name
+            # instance\0class\0
+            self.properties[Xatom.WM_CLASS] = '\0'.join(class_name) + '\0'
         self.current_geometry = geometry
         self.normal_geometry = geometry
         self.normal_hints = normal_hints
         self._set_extents(extents)
 
     def map(self, onerror=None):
+        self.display.request('MapWindow')
         self.display.windows_stack.append(self)
 
     def unmap(self, onerror=None):
+        self.display.request('UnmapWindow')
         if self in self.display.windows_stack:
             self.display.windows_stack.remove(self)
 
     def destroy(self, onerror=None):
-        self.unmap()
+        self.display.request('DestroyWindow')
+        if self in self.display.windows_stack:
+            self.display.windows_stack.remove(self)
         self.display.all_windows.remove(self)
+        del self.display.windows_by_id[self.id]
 
     def get_wm_transient_for(self):
         # Parent window
+        self.display.request('GetProperty')
         return None
 
     def get_wm_client_machine(self):
-        return self.get_full_property(Xatom.WM_CLIENT_MACHINE, 0).value
+        self.display.request('GetProperty')
+        return self._full_property(Xatom.WM_CLIENT_MACHINE).value
 
     def get_wm_class(self):
-        return self.get_full_property(Xatom.WM_CLASS, 0).value
+        self.display.request('GetProperty')
+        value = self._full_property(Xatom.WM_CLASS).value
+        return tuple(value.split('\0')[:2])
 
     def get_wm_state(self):
+        self.display.request('GetProperty')
         return WM_State(*self._prop('WM_STATE'))
 
     def get_geometry(self):
+        self.display.request('GetGeometry')
         return self.current_geometry.copy()
 
     def translate_coords(self, src_window, x, y):
         # Now it works like in Metacity
+        self.display.request('TranslateCoords')
         extents = self._get_extents()
         return TranslateCoords((x - extents.left) * -1, 
                                (y - extents.top) * -1)
 
     def query_tree(self):
+        self.display.request('QueryTree')
         return QueryTree(parent=self.display.root,
                          root=self.display.root,
                          children=[])
 
     def get_wm_normal_hints(self):
+        self.display.request('GetProperty')
         return self.normal_hints
 
     def get_attributes(self):
         # Only need in debug_info, no need to implemet it
+        self.display.request('GetWindowAttributes')
         return None
 
     def change_attributes(self, onerror=None, **keys):
         # used to set event_mask
-        pass
+        self.display.request('ChangeWindowAttributes')
 
     def configure(self, onerror=None, 
                   x=None, y=None, 
                   width=None, height=None,
                   **keys):
+        self.display.request('ConfigureWindow')
         extents = self._get_extents()
         if x is not None:
             x = x + extents.left
@@ -431,10 +496,10 @@ class Window(AbstractWindow):
     def grab_key(self, key, modifiers, 
                  owner_events, pointer_mode, keyboard_mode, 
                  onerror=None):
-        pass
+        self.display.request('GrabKey')
 
     def ungrab_key(self, key, modifiers, onerror = None):
-        pass
+        self.display.request('UngrabKey')
 
     def _set_state(self, atom, mode):
         state = self._prop('_NET_WM_STATE')
@@ -551,12 +616,13 @@ class RootWindow(AbstractWindow):
         return win.id
 
 
-    def get_full_property(self, property, type, sizehint=10):
+    def _full_property(self, property):
         if property == self.atom('_NET_CLIENT_LIST_STACKING'):
             return Value([win.id for win in self.display.windows_stack])
         if property == self.atom('_NET_CLIENT_LIST'):
+            mapped = set(self.display.windows_stack)
             return Value([win.id for win in self.display.all_windows
-                                 if win in self.display.windows_stack])
+                                 if win in mapped])
         if property == self.atom('_NET_ACTIVE_WINDOW'):
             if not self.display.windows_stack:
                 return None
@@ -566,11 +632,16 @@ class RootWindow(AbstractWindow):
         if property == self.atom('_NET_WORKAREA'):
             desktops = self._prop('_NET_NUMBER_OF_DESKTOPS')[0]
             return Value(self._prop('_NET_WORKAREA') * desktops)
-        return AbstractWindow.get_full_property(self, property, type, sizehint)
+        return AbstractWindow._full_property(self, property)
 
     def send_event(self, event, event_mask=0, propagate=0, onerror=None):
+        self.display.request('SendEvent')
         self.display.send_event(self, event, event_mask, propagate, onerror)
 
+    def change_attributes(self, onerror=None, **keys):
+        # used to set event_mask
+        self.display.request('ChangeWindowAttributes')
+
     def create_gc(self, **keys):
         raise NotImplementedError()
 
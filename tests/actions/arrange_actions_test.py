@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from tests.common_test import MockedXlibTests
+from tests.common_test import DESKTOP_WIDTH, DESKTOP_HEIGHT
+from tests.common_test import WIN_WIDTH, WIN_HEIGHT
+
+from pywo import actions, core
+from pywo.actions import arrange_actions
+
+
+WORKAREA = core.Geometry(0, 0, 800, 600)
+
+
+def geometries(count, width=100, height=100):
+    return [core.Geometry(0, 0, width, height) for number in range(count)]
+
+
+class LayoutsTests(unittest.TestCase):
+
+    def test_grid(self):
+        self.assertEqual(arrange_actions.grid(geometries(1), WORKAREA),
+                         [WORKAREA])
+        self.assertEqual(arrange_actions.grid(geometries(3), WORKAREA),
+                         [core.Geometry(0, 0, 400, 300),
+                          core.Geometry(400, 0, 400, 300),
+                          core.Geometry(0, 300, 800, 300)])
+
+    def test_grid__no_gaps(self):
+        cells = arrange_actions.grid(geometries(7), WORKAREA)
+        self.assertEqual(sum([cell.area for cell in cells]), WORKAREA.area)
+        for cell in cells:
+            self.assertEqual(cell & WORKAREA, cell)
+
+    def test_columns(self):
+        self.assertEqual(arrange_actions.columns(geometries(3), WORKAREA),
+                         [core.Geometry(0, 0, 266, 600),
+                          core.Geometry(266, 0, 267, 600),
+                          core.Geometry(533, 0, 267, 600)])
+
+    def assertNotOverlapping(self, cells):
+        for number, cell in enumerate(cells):
+            self.assertEqual(cell & WORKAREA, cell)
+            for other in cells[number + 1:]:
+                intersection = cell & other
+                self.assertTrue(not intersection or not intersection.area,
+                                '%s overlaps %s' % (cell, other))
+
+    def test_pack(self):
+        sizes = geometries(2, 300, 200) + geometries(1, 400, 400) + \
+                geometries(1, 1000, 100)
+        self.assertEqual(arrange_actions.pack(sizes[:3], WORKAREA),
+                         [core.Geometry(400, 0, 300, 200),
+                          core.Geometry(0, 400, 300, 200),
+                          core.Geometry(0, 0, 400, 400)])
+        cells = arrange_actions.pack(sizes, WORKAREA)
+        self.assertNotOverlapping(cells)
+        # all windows are scaled down to fit
+        self.assertEqual(cells[2], core.Geometry(0, 0, 324, 324))
+
+    def test_pack__limits(self):
+        sizes = geometries(4, 400, 300) + geometries(1, 300, 300)
+        no_limits = (core.Size(0, 0), core.Size(0, 0))
+        limits = [(core.Size(400, 300), core.Size(0, 0))] * 4 + \
+                 [(core.Size(0, 0), core.Size(100, 200))]
+        cells = arrange_actions.pack(sizes, WORKAREA, [no_limits] * 5)
+        self.assertNotOverlapping(cells)
+        # all windows are scaled by the same factor
+        self.assertEqual(cells[4].width, cells[4].height)
+        cells = arrange_actions.pack(sizes[4:], WORKAREA, limits[4:])
+        self.assertEqual(cells, [core.Geometry(0, 0, 100, 200)])
+        # windows can't be scaled down, use grid
+        cells = arrange_actions.pack(sizes, WORKAREA, limits)
+        self.assertNotOverlapping(cells)
+        self.assertEqual(cells, arrange_actions.grid(sizes, WORKAREA))
+
+    def test_empty(self):
+        for layout in arrange_actions.LAYOUTS.values():
+            self.assertEqual(layout([], WORKAREA), [])
+
+
+class ArrangeActionTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.action = actions.manager.get('arrange')
+        self.windows = [self.win, self.map_window(), self.map_window()]
+
+    def test_grid(self):
+        active = self.windows[1]
+        self.action(active)
+        self.assertEqual(active.geometry, 
+                         core.Geometry(0, 0, DESKTOP_WIDTH / 2, 
+                                       DESKTOP_HEIGHT / 2))
+        cells = set([(win.geometry.x, win.geometry.y, 
+                      win.geometry.width, win.geometry.height) 
+                     for win in self.windows])
+        self.assertEqual(cells, set([(0, 0, 400, 300), (400, 0, 400, 300),
+                                     (0, 300, 800, 300)]))
+
+    def test_pack(self):
+        self.action(self.win, layout='pack')
+        self.assertEqual(self.win.geometry,
+                         core.Geometry(0, 0, WIN_WIDTH, WIN_HEIGHT))
+        self.assertEqual(sorted([win.geometry.x for win in self.windows]),
+                         [0, WIN_WIDTH, WIN_WIDTH * 2])
+        for win in self.windows:
+            self.assertEqual(win.geometry.height, WIN_HEIGHT)
+
+    def test_other_desktop(self):
+        other = self.map_window(desktop=1)
+        self.action(self.win, layout='columns')
+        self.assertEqual(other.geometry.width, WIN_WIDTH)
+        self.assertEqual(self.win.geometry.width, DESKTOP_WIDTH / 3)
+
+    def test_invalid(self):
+        self.assertRaises(actions.ActionException, 
+                          self.action.perform, self.win, layout='spiral')
+        self.assertRaises(actions.ActionException, 
+                          self.action.perform, self.win, filter='none')
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [LayoutsTests,
+                  ArrangeActionTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
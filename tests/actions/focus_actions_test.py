@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from tests.common_test import MockedXlibTests
+
+from pywo import actions
+from pywo.services.focus_service import FocusHistory
+
+
+class FocusActionsTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.win2 = self.map_window(x=200, width=200)
+        self.win3 = self.map_window(x=400, height=100)
+        self.history = FocusHistory()
+        for win in [self.win, self.win2, self.win3]:
+            self.history.activated(win.id)
+        self.WM.history = self.history
+
+    def tearDown(self):
+        self.WM.history = None
+
+    def test_focus_previous(self):
+        actions.manager.get('focus_previous')(self.win3)
+        self.assertEqual(self.WM.active_window(), self.win2)
+
+    def test_focus_recent(self):
+        actions.manager.get('focus_recent')(self.win3, recent=2)
+        self.assertEqual(self.WM.active_window(), self.win)
+
+    def test_swap_with_previous(self):
+        geometry, geometry2 = self.win3.geometry, self.win2.geometry
+        actions.manager.get('swap_with_previous')(self.win3)
+        self.assertEqual(self.win3.geometry, geometry2)
+        self.assertEqual(self.win2.geometry, geometry)
+
+    def test_no_history(self):
+        self.WM.history = None
+        action = actions.manager.get('focus_previous')
+        self.assertRaises(actions.ActionException, action.perform, self.win)
+        self.WM.history = FocusHistory()
+        self.assertRaises(actions.ActionException, action.perform, self.win)
+
+    def test_empty_history(self):
+        # empty FocusHistory is false, but it's still available
+        self.WM.history = FocusHistory()
+        try:
+            actions.manager.get('focus_previous').perform(self.win)
+        except actions.ActionException, exc:
+            self.assertEqual(str(exc), 'No previously active window')
+        else:
+            self.fail('ActionException not raised')
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [FocusActionsTests, ]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+
+import copy
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from Xlib import X
+
+from tests import Xlib_mock
+from tests.common_test import MockedXlibTests
+from tests.common_test import DESKTOP_WIDTH, DESKTOP_HEIGHT
+from tests.core.index_test import RawEvent
+
+from pywo import core
+from pywo.actions import grid_actions
+from pywo.config import Config
+from pywo.core import xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.events import ConfigureNotifyEvent, PropertyNotifyEvent
+from pywo.core.index import WindowIndex
+
+
+TOP_LEFT = core.Gravity.parse('NW')
+BOTTOM_RIGHT = core.Gravity.parse('SE')
+WIDTHS = core.Size([0.5, 0.25, 0.75], 0)
+HEIGHTS = core.Size(0, [0.5])
+
+
+class GridActionTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        grid_actions.CYCLERS.clear()
+        self.grid = grid_actions.GridAction('grid_width_test', '',
+                                            grid_actions.CYCLE_WIDTH)
+
+    def put(self, win, position=TOP_LEFT):
+        self.grid.perform(win, position,
+                          width=WIDTHS, height=HEIGHTS,
+                          invert_on_resize=False)
+        return win.geometry.width
+
+    def test_perform(self):
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.75)
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.5)
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.25)
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.75)
+        self.assertEqual(len(grid_actions.CYCLERS), 1)
+
+    def test_perform__alternating_windows(self):
+        win2 = self.map_window(x=DESKTOP_WIDTH - 50)
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.75)
+        self.assertEqual(self.put(win2, BOTTOM_RIGHT), DESKTOP_WIDTH * 0.75)
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.5)
+        self.assertEqual(self.put(win2, BOTTOM_RIGHT), DESKTOP_WIDTH * 0.5)
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.25)
+        self.assertEqual(len(grid_actions.CYCLERS), 2)
+
+    def test_perform__moved(self):
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.75)
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.5)
+        self.win.set_geometry(core.Geometry(DESKTOP_WIDTH / 2,
+                                            DESKTOP_HEIGHT / 2, 100, 100))
+        self.assertEqual(self.put(self.win), DESKTOP_WIDTH * 0.75)
+        self.assertEqual(len(grid_actions.CYCLERS), 1)
+
+    def test_perform__size_increments(self):
+        self.win._win.normal_hints = Xlib_mock.HINTS_TERMINAL
+        widths = [self.put(self.win) for number in range(4)]
+        # sizes adjusted to increments are still recognized as own ones
+        self.assertTrue(widths[0] > widths[1] > widths[2])
+        self.assertEqual(widths[3], widths[0])
+        self.assertNotEqual(widths[0], DESKTOP_WIDTH * 0.75)
+
+
+class CyclerCacheTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.cache = grid_actions.CyclerCache(2)
+        self.args = (TOP_LEFT, TOP_LEFT, grid_actions.NO_SIZE, WIDTHS, HEIGHTS)
+
+    def test_get(self):
+        self.assertEqual(self.cache.get(self.win, self.args), None)
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry)
+        self.assertEqual(self.cache.get(self.win, self.args), 'cycler')
+        other_args = (BOTTOM_RIGHT,) + self.args[1:]
+        self.assertEqual(self.cache.get(self.win, other_args), None)
+
+    def test_get__changed(self):
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry)
+        geometry = self.win.geometry
+        geometry.x += geometry.width
+        self.win.set_geometry(geometry)
+        self.assertEqual(self.cache.get(self.win, self.args), None)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_get__resized(self):
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry,
+                       core.Size(7, 15))
+        geometry = self.win.geometry
+        # the same center, so resized by user, not adjusted to increments
+        self.win.set_geometry(core.Geometry(geometry.x + 20, geometry.y + 20,
+                                            geometry.width - 40,
+                                            geometry.height - 40))
+        self.assertEqual(self.cache.get(self.win, self.args), None)
+
+    def test_get__tolerance(self):
+        geometry = self.win.geometry
+        self.cache.set(self.win.id, self.args, 'cycler', 
+                       core.Geometry(geometry.x, geometry.y,
+                                     geometry.width + 6, geometry.height + 14),
+                       core.Size(7, 15))
+        self.assertEqual(self.cache.get(self.win, self.args), 'cycler')
+
+    def test_set__lru(self):
+        windows = [self.win, self.map_window(), self.map_window()]
+        for win in windows:
+            self.cache.set(win.id, self.args, win.id, win.geometry)
+            self.cache.get(self.win, self.args)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get(windows[0], self.args), windows[0].id)
+        self.assertEqual(self.cache.get(windows[1], self.args), None)
+        self.assertEqual(self.cache.get(windows[2], self.args), windows[2].id)
+
+    def test_invalidate(self):
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry)
+        self.cache.invalidate(self.win.id)
+        self.assertEqual(self.cache.get(self.win, self.args), None)
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry)
+        self.assertEqual(self.cache.get(self.win, self.args), 'cycler')
+
+
+class IndexedCyclerCacheTests(CyclerCacheTests):
+
+    def setUp(self):
+        CyclerCacheTests.setUp(self)
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+        self.index = WindowIndex()
+        self.index.start()
+
+    def tearDown(self):
+        self.index.stop()
+        self.WM.unregister_all()
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+
+    def configure(self, window):
+        geometry = window.geometry
+        event = RawEvent(X.ConfigureNotify, window.id,
+                         border_width=0, override=False,
+                         x=geometry.x, y=geometry.y,
+                         width=geometry.width, height=geometry.height)
+        self.index.configure(ConfigureNotifyEvent(event))
+
+    def test_get__changed(self):
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry)
+        geometry = self.win.geometry
+        geometry.x += geometry.width
+        self.win.set_geometry(geometry)
+        self.assertEqual(len(self.cache), 1)
+        self.configure(self.win)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.get(self.win, self.args), None)
+
+    def test_get__resized(self):
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry,
+                       core.Size(7, 15))
+        geometry = self.win.geometry
+        self.win.set_geometry(core.Geometry(geometry.x + 20, geometry.y + 20,
+                                            geometry.width - 40,
+                                            geometry.height - 40))
+        self.configure(self.win)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_get__tolerance(self):
+        geometry = self.win.geometry
+        self.cache.set(self.win.id, self.args, 'cycler', 
+                       core.Geometry(geometry.x, geometry.y,
+                                     geometry.width + 6, geometry.height + 14),
+                       core.Size(7, 15))
+        self.configure(self.win)
+        self.assertEqual(self.cache.get(self.win, self.args), 'cycler')
+
+    def test_configured__own_geometry(self):
+        geometry = self.win.geometry
+        self.cache.set(self.win.id, self.args, 'cycler', geometry)
+        moved = core.Geometry(geometry.x2, geometry.y, 
+                              geometry.width, geometry.height)
+        self.cache.set(self.win.id, self.args, 'cycler', moved)
+        # late ConfigureNotify for previous geometry
+        self.configure(self.win)
+        self.win.set_geometry(moved)
+        self.configure(self.win)
+        self.assertEqual(self.cache.get(self.win, self.args), 'cycler')
+
+    def test_configured__destroyed(self):
+        self.cache.set(self.win.id, self.args, 'cycler', self.win.geometry)
+        self.win.destroy()
+        self.index.property(PropertyNotifyEvent(RawEvent(
+                X.PropertyNotify, self.WM.id, 
+                atom=core.Window.atom('_NET_CLIENT_LIST'),
+                state=PropertyNotifyEvent.NEW_VALUE)))
+        self.assertEqual(len(self.cache), 0)
+
+
+class GridTablesTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.config = Config()
+        self.tables = grid_actions.GridTables()
+        self.tables.load(self.config)
+        self.workarea = self.WM.workarea_geometry
+
+    def get(self, section, workarea=None, width=grid_actions.NO_SIZE):
+        section = self.config.section(section)
+        return self.tables.get(self.win, workarea or self.workarea,
+                               section.position, section.size,
+                               width, grid_actions.NO_SIZE)
+
+    def test_get(self):
+        for name in self.config.sections:
+            section = self.config.section(name)
+            position, sizes = self.get(name)
+            self.assertEqual(position, grid_actions.absolute_position(
+                                           self.workarea, section.position))
+            self.assertEqual(sizes, grid_actions.absolute_size(
+                                        self.win, self.workarea, section.size,
+                                        grid_actions.NO_SIZE,
+                                        grid_actions.NO_SIZE))
+
+    def test_get__copy(self):
+        position, sizes = self.get('top')
+        sizes.width.reverse()
+        sizes.width.append(1)
+        self.assertNotEqual(self.get('top')[1], sizes)
+
+    def test_get__width(self):
+        position, sizes = self.get('top', width=core.Size([0.25], 0))
+        self.assertEqual(sizes.width, [DESKTOP_WIDTH * 0.25])
+
+    def test_load__no_size(self):
+        section = copy.copy(self.config.section('top'))
+        section.size = None
+        self.config.sections['no_size'] = section
+        tables = grid_actions.GridTables()
+        tables.load(self.config)
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(tables.get(self.win, self.workarea,
+                                    section.position, 
+                                    self.config.section('top').size,
+                                    grid_actions.NO_SIZE,
+                                    grid_actions.NO_SIZE),
+                         self.get('top'))
+
+    def test_rebuild__workarea_changed(self):
+        self.assertEqual(len(self.tables), 1)
+        workarea = core.Geometry(0, 20, DESKTOP_WIDTH, DESKTOP_HEIGHT - 20)
+        position, sizes = self.get('bottom', workarea)
+        self.assertEqual(position.y, DESKTOP_HEIGHT)
+        self.assertEqual(sizes.height, [(DESKTOP_HEIGHT - 20) / 2.0])
+        self.assertEqual(len(self.tables), 1)
+
+    def test_rebuild__screens(self):
+        self.display.xinerama_query_screens = lambda: Xlib_mock.ScreensQuery(
+            (0, 0, 400, 600),
+            (400, 0, 400, 600))
+        self.tables.rebuild()
+        self.assertEqual(len(self.tables), 3)
+        position, sizes = self.get('top', core.Geometry(400, 0, 400, 600))
+        self.assertEqual(position.x, 600)
+        self.assertEqual([int(width) for width in sizes.width],
+                         [133, 266, 400])
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [GridActionTests,
+                  CyclerCacheTests,
+                  IndexedCyclerCacheTests,
+                  GridTablesTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
@@ -213,10 +213,27 @@ class FloatActionTests(MoveresizeActionsTests):
         geometry = self.get_geometry(0, DESKTOP_HEIGHT/2-WIN_HEIGHT/2)
 
 
+class RoundTripsTests(MoveresizeActionsTests):
+
+    def setUp(self):
+        MoveresizeActionsTests.setUp(self)
+        for x in [300, 350, 400]:
+            self.map_window(x=x)
+
+    def test_expand(self):
+        self.assertRoundTrips(64, actions.manager.get('expand'),
+                              self.win, direction=TOP)
+
+    def test_put(self):
+        self.assertRoundTrips(16, actions.manager.get('put'),
+                              self.win, position=TOP)
+
+
 if __name__ == '__main__':
     main_suite = unittest.TestSuite()
     for suite in [PutActionTests, 
-                  FloatActionTests, ]:
+                  FloatActionTests, 
+                  RoundTripsTests, ]:
         main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
     unittest.TextTestRunner(verbosity=2).run(main_suite)
 
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from pywo.core import Gravity, Size
+from pywo.actions import parser
+
+
+class ParseArgsTests(unittest.TestCase):
+
+    def setUp(self):
+        parser.CACHE.clear()
+
+    def test_parse_args(self):
+        options, args = parser.parse_args('put -p TOP_LEFT -w HALF Terminal')
+        self.assertEqual(options.action, 'put')
+        self.assertEqual(options.position, Gravity(0, 0))
+        self.assertEqual(options.gravity, Gravity(0, 0))
+        self.assertEqual(options.width, Size(0.5, 0))
+        self.assertEqual(args, ['Terminal'])
+
+    def test_parse_args__cached(self):
+        command = 'expand -d LEFT'
+        options, args = parser.parse_args(command)
+        self.assertEqual(len(parser.CACHE), 1)
+        cached_options, cached_args = parser.parse_args(command)
+        self.assertTrue(cached_options is options)
+        self.assertEqual(cached_args, args)
+        self.assertEqual(len(parser.CACHE), 1)
+
+    def test_parse_args__immutable(self):
+        command = 'grid_width top-left some window'
+        options, args = parser.parse_args(command)
+        self.assertRaises(AttributeError, setattr, options, 'action', 'put')
+        self.assertRaises(AttributeError, delattr, options, 'mode')
+        args.pop(0)
+        options, args = parser.parse_args(command)
+        self.assertEqual(options.action, None)
+        self.assertEqual(args, ['grid_width', 'top-left', 'some', 'window'])
+
+    def test_parse_args__list(self):
+        options, args = parser.parse_args(['put', '-p', 'TOP'])
+        self.assertEqual(options.position, Gravity(0.5, 0))
+        self.assertEqual(len(parser.CACHE), 0)
+        options.action = 'expand' # not cached, can be changed
+
+    def test_parse_args__error(self):
+        self.assertRaises(parser.ParserException,
+                          parser.parse_args, 'put -p NOT_A_GRAVITY')
+        self.assertEqual(len(parser.CACHE), 0)
+
+
+class ParsedCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = parser.ParsedCache(2)
+
+    def test_get(self):
+        self.assertEqual(self.cache.get('put'), None)
+        options, args = parser.parse_args(['put', '-p', 'TOP', 'window'])
+        self.cache.set('put -p TOP window', options, args)
+        cached_options, cached_args = self.cache.get('put -p TOP window')
+        self.assertEqual(cached_options.action, 'put')
+        self.assertEqual(cached_args, ['window'])
+
+    def test_set__lru(self):
+        for command in ['put', 'expand', 'shrink']:
+            options, args = parser.parse_args([command])
+            self.cache.set(command, options, args)
+            self.cache.get('put')
+        self.assertEqual(len(self.cache), 2)
+        self.assertNotEqual(self.cache.get('put'), None)
+        self.assertEqual(self.cache.get('expand'), None)
+        self.assertNotEqual(self.cache.get('shrink'), None)
+
+    def test_clear(self):
+        options, args = parser.parse_args(['put'])
+        self.cache.set('put', options, args)
+        self.cache.clear()
+        self.assertEqual(self.cache.get('put'), None)
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [ParseArgsTests, 
+                  ParsedCacheTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
@@ -11,6 +11,9 @@ from tests.common_test import DESKTOP_WIDTH, DESKTOP_HEIGHT
 
 from pywo import core
 from pywo.actions import resizer
+from pywo.core import xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.index import WindowIndex
 
 
 TOP_LEFT = core.Gravity.parse('NW')
@@ -125,10 +128,79 @@ class ShrinkWindowTests(MockedXlibTests):
         self.assertEqual(resized, geometry)
 
 
+class ExpandWindowNeighboursTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.resize = resizer.expand_window
+
+    def test_neighbours(self):
+        geometry = self.win.geometry
+        self.map_window(x=300, y=geometry.y, width=100, height=100)
+        self.map_window(x=geometry.x, y=400, width=100, height=100)
+        self.map_window(x=500, y=500, width=50, height=50)
+        resized = self.resize(self.win, RIGHT)
+        self.assertEqual(resized.x2, 300)
+        self.assertEqual(resized.y2, geometry.y2)
+        self.win.set_geometry(geometry)
+        resized = self.resize(self.win, BOTTOM)
+        self.assertEqual(resized.x2, geometry.x2)
+        self.assertEqual(resized.y2, 400)
+        self.win.set_geometry(geometry)
+        resized = self.resize(self.win, BOTTOM_RIGHT)
+        self.assertEqual(resized.x2, 300)
+        self.assertEqual(resized.y2, 400)
+
+
+class IndexedNeighboursTests(ExpandWindowNeighboursTests):
+
+    def setUp(self):
+        self.index = None
+        ExpandWindowNeighboursTests.setUp(self)
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+        self.index = WindowIndex()
+        self.index.start()
+
+    def tearDown(self):
+        self.index.stop()
+        self.WM.unregister_all()
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+
+    def map_window(self, **kwargs):
+        window = ExpandWindowNeighboursTests.map_window(self, **kwargs)
+        if self.index is not None:
+            # restart index, so it knows all mapped windows
+            self.index.stop()
+            self.index.start()
+        return window
+
+    def test_index_used(self):
+        self.map_window(x=300, y=self.win.geometry.y, width=100, height=100)
+        self.assertTrue(self.WM.index is self.index)
+        geometry = self.win.geometry
+        # intern all atoms first
+        self.resize(self.win, RIGHT)
+        self.win.set_geometry(geometry)
+        self.display.reset_requests()
+        self.resize(self.win, RIGHT)
+        requests = dict(self.display.requests)
+        for i in range(10):
+            self.map_window(x=500, y=400, width=50, height=50)
+        self.win.set_geometry(geometry)
+        self.display.reset_requests()
+        self.resize(self.win, RIGHT)
+        # windows not placed in axis are not checked at all
+        self.assertEqual(dict(self.display.requests), requests)
+
+
 if __name__ == '__main__':
     main_suite = unittest.TestSuite()
     for suite in [ExpandWindowTests, 
-                  ShrinkWindowTests]:
+                  ShrinkWindowTests,
+                  ExpandWindowNeighboursTests,
+                  IndexedNeighboursTests]:
         main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
     unittest.TextTestRunner(verbosity=2).run(main_suite)
 
@@ -9,6 +9,7 @@ sys.path.insert(0, './')
 from tests import Xlib_mock
 
 from pywo.core import xlib
+from pywo import config
 from pywo import core
 
 
@@ -30,6 +31,10 @@ WIN_HEIGHT = 150
 class MockedXlibTests(unittest.TestCase):
 
     def setUp(self):
+        # don't read or write user's config cache (restored by cleanup, 
+        # as subclasses don't always call MockedXlibTests.tearDown)
+        self.addCleanup(setattr, config, 'CACHE_PATH', config.CACHE_PATH)
+        config.CACHE_PATH = None
         # setup Window Manager
         display = Xlib_mock.Display(screen_width=DESKTOP_WIDTH, 
                                     screen_height=DESKTOP_HEIGHT,
@@ -68,3 +73,12 @@ class MockedXlibTests(unittest.TestCase):
         win.set_desktop(desktop)
         return win
 
+    def assertRoundTrips(self, maximum, function, *args, **kwargs):
+        """Check number of requests waiting for reply sent by function."""
+        self.display.reset_requests()
+        function(*args, **kwargs)
+        round_trips = self.display.round_trips
+        self.assertTrue(round_trips <= maximum,
+                        '%s round trips, expected at most %s: %s' % 
+                        (round_trips, maximum, dict(self.display.requests)))
+
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from pywo import config
+from pywo.config import Config
+
+
+class ConfigTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_path = config.CACHE_PATH
+        config.CACHE_PATH = None
+
+    def tearDown(self):
+        config.CACHE_PATH = self.cache_path
+
+    def test_eq(self):
+        self.assertEqual(Config(), Config())
+        changed = Config()
+        changed.sections['top'].size = None
+        self.assertNotEqual(changed, Config())
+        changed = Config()
+        changed.settings['numlock'] = Config.ON
+        self.assertNotEqual(changed, Config())
+
+
+class ConfigCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_path = config.CACHE_PATH
+        self.directory = tempfile.mkdtemp()
+        config.CACHE_PATH = os.path.join(self.directory, 'cache', 'config')
+        self.filename = os.path.join(self.directory, 'pyworc')
+        self.write('[SETTINGS]\nlayout = grid_2x2\n')
+
+    def tearDown(self):
+        config.CACHE_PATH = self.cache_path
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+        with open(self.filename, 'w') as pyworc:
+            pyworc.write(text)
+
+    def test_load(self):
+        loaded = Config(self.filename)
+        self.assertTrue(os.path.exists(config.CACHE_PATH))
+        parsed = []
+        original = config._Section.__init__
+        config._Section.__init__ = lambda *args: parsed.append(args)
+        try:
+            cached = Config(self.filename)
+        finally:
+            config._Section.__init__ = original
+        self.assertEqual(parsed, [])
+        self.assertEqual(cached, loaded)
+        self.assertEqual(cached.numlock, loaded.numlock)
+        self.assertEqual(cached.filename, self.filename)
+        self.assertTrue('top' in cached.sections)
+
+    def test_load__changed(self):
+        Config(self.filename)
+        self.write('[SETTINGS]\nlayout = grid_3x3\nnumlock = on\n')
+        os.utime(self.filename, (0, 0))
+        loaded = Config(self.filename)
+        self.assertEqual(loaded.numlock, Config.ON)
+        self.assertEqual(loaded, Config(self.filename))
+        self.assertNotEqual(loaded, Config(''))
+
+    def test_load__other_filename(self):
+        self.write('[SETTINGS]\nnumlock = on\n')
+        default = Config('')
+        loaded = Config(self.filename)
+        self.assertNotEqual(default, loaded)
+        self.assertEqual(Config(''), default)
+        self.assertEqual(Config(self.filename), loaded)
+
+    def test_files_state(self):
+        missing = os.path.join(self.directory, 'missing')
+        state = config.files_state([self.filename, missing])
+        self.assertEqual(state[1], (missing, None, None))
+        self.assertEqual(state[0][2], os.path.getsize(self.filename))
+
+    def test_broken_cache(self):
+        os.makedirs(os.path.dirname(config.CACHE_PATH))
+        with open(config.CACHE_PATH, 'w') as cache:
+            cache.write('broken')
+        self.assertEqual(config.load_cached(self.filename), None)
+        self.assertTrue('top' in Config(self.filename).sections)
+        self.assertNotEqual(config.load_cached(self.filename), None)
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [ConfigTests,
+                  ConfigCacheTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
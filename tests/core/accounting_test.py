@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+import logging
+import threading
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from tests.common_test import MockedXlibTests
+from pywo import actions
+from pywo.core import accounting
+from pywo.core.xlib import XObject
+
+
+class LogRecorder(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class StatisticsTests(unittest.TestCase):
+
+    def test_add(self):
+        statistics = accounting.Statistics()
+        statistics.add('GetProperty', 0.5)
+        statistics.add('GetProperty', 0.25)
+        statistics.add('ConfigureWindow', 0)
+        self.assertEqual(statistics.requests(),
+                         {'GetProperty': (2, 0.75),
+                          'ConfigureWindow': (1, 0)})
+        self.assertTrue(statistics.report()[0].startswith('GetProperty'))
+        statistics.clear()
+        self.assertEqual(statistics.requests(), {})
+
+
+class TraceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = accounting.Trace()
+        self.trace.add('InternAtom', '_NET_WM_NAME', 0.001)
+        self.trace.add('GetProperty', '_NET_WM_NAME', 0.001)
+        self.trace.add('GetProperty', '_NET_WM_NAME', 0.001)
+        self.trace.add('GetProperty', 'WM_STATE', 0, round_trip=False)
+        self.trace.add('ConfigureWindow')
+
+    def test_round_trips(self):
+        self.assertEqual(self.trace.round_trips, 3)
+
+    def test_kinds(self):
+        self.assertEqual(self.trace.kinds(),
+                         {'InternAtom': (1, 0.001),
+                          'GetProperty': (3, 0.002),
+                          'ConfigureWindow': (1, 0)})
+        self.assertEqual(self.trace.properties(),
+                         {'_NET_WM_NAME': 2, 'WM_STATE': 1})
+
+    def test_report(self):
+        report = self.trace.report()
+        self.assertEqual(len(report), 5 + 1 + 3 + 2)
+        self.assertTrue(report[1].endswith('* GetProperty _NET_WM_NAME'))
+        self.assertTrue(report[3].endswith('  GetProperty WM_STATE'))
+        self.assertTrue(report[-1].startswith('Requests: 5, '
+                                              'round trips (*): 3'))
+        self.assertTrue('_NET_WM_NAME x2' in report[-2])
+
+
+class AccountingTests(MockedXlibTests):
+
+    def tearDown(self):
+        accounting.stop_trace()
+
+    def test_call(self):
+        before = accounting.STATISTICS.requests().get('GetProperty', (0, 0))
+        self.display.reset_requests()
+        trace = accounting.start_trace()
+        self.win.name
+        self.win.set_geometry(self.win.geometry)
+        self.assertTrue(accounting.stop_trace() is trace)
+        self.assertEqual(accounting.stop_trace(), None)
+        self.assertTrue(('GetProperty', '_NET_WM_NAME') in
+                        [request[:2] for request in trace.requests])
+        self.assertTrue('ConfigureWindow' in trace.kinds())
+        self.assertEqual(trace.round_trips, self.display.round_trips)
+        after = accounting.STATISTICS.requests()['GetProperty']
+        self.assertTrue(after[0] > before[0])
+
+    def test_prefetch(self):
+        windows = [self.win, self.map_window()]
+        trace = accounting.start_trace()
+        XObject.prefetch(windows, ['_NET_WM_NAME'], geometry=True)
+        accounting.stop_trace()
+        self.assertEqual(trace.kinds()['GetProperty'][0], 2)
+        self.assertEqual(trace.kinds()['GetGeometry'][0], 2)
+
+    def test_other_thread(self):
+        trace = accounting.start_trace()
+        thread = threading.Thread(target=lambda: self.win.name)
+        thread.start()
+        thread.join()
+        self.assertEqual(trace.requests, [])
+
+    def test_debug_trace(self):
+        recorder = LogRecorder()
+        logger = logging.getLogger('pywo.actions')
+        logger.addHandler(recorder)
+        logger.setLevel(logging.INFO)
+        try:
+            actions.manager.get('debug_trace')(self.win)
+            actions.manager.get('sticky')(self.win, mode=1)
+            actions.manager.get('sticky')(self.win, mode=0)
+        finally:
+            logger.removeHandler(recorder)
+            logger.setLevel(logging.NOTSET)
+        traces = [message for message in recorder.messages
+                  if message.startswith('X requests sent by')]
+        self.assertEqual(len(traces), 1)
+        self.assertTrue("<Action 'sticky'>" in traces[0])
+        self.assertTrue('SendEvent _NET_WM_STATE' in traces[0])
+        self.assertFalse(actions.TRACE_NEXT.is_set())
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [StatisticsTests,
+                  TraceTests,
+                  AccountingTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
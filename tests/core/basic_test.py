@@ -39,6 +39,32 @@ class SizeTests(unittest.TestCase):
         self.assertEqual(Size.parse_value(' '), None)
         self.assertRaises(ValueError, Size.parse_value, 'fasdfa')
 
+    def test_parse_value__expressions(self):
+        self.assertEqual(Size.parse_value('HALF+H'), 1.0)
+        self.assertEqual(Size.parse_value('THIRD+T*2'), 1.0)
+        self.assertEqual(Size.parse_value(' 1 / 2 '), 0.5)
+        self.assertEqual(Size.parse_value('-H+F'), 0.5)
+        self.assertEqual(Size.parse_value('F--H'), 1.5)
+        self.assertEqual(Size.parse_value('.5*2'), 1.0)
+        self.assertEqual(Size.parse_value(u'Q*2'), 0.5)
+        self.assertEqual(Size.parse_value('T, H,F, '), [1.0/3, 0.5, 1.0])
+
+    def test_parse_value__invalid(self):
+        self.assertRaises(ValueError, Size.parse_value, 'HH')
+        self.assertRaises(ValueError, Size.parse_value, 'half')
+        self.assertRaises(ValueError, Size.parse_value, 'H+')
+        self.assertRaises(ValueError, Size.parse_value, 'H H')
+        self.assertRaises(ValueError, Size.parse_value, '*H')
+        self.assertRaises(ValueError, Size.parse_value, 'F/0')
+        self.assertRaises(ValueError, Size.parse_value, '(1)')
+        self.assertRaises(ValueError, Size.parse_value, 'H, foo')
+        self.assertRaises(ValueError, Size.parse_value, '__import__("os")')
+
+    def test_parse_value__cached(self):
+        sizes = Size.parse_value('H,F')
+        sizes.append(0.25)
+        self.assertEqual(Size.parse_value('H,F'), [0.5, 1.0])
+
     def test_parse(self):
         self.assertEqual(Size.parse('', ''), None)
         self.assertEqual(Size.parse('', 'FULL'), None)
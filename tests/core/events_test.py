@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from Xlib import X
+
+from tests.common_test import MockedXlibTests
+from pywo.core import Window
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.events import PropertyNotifyHandler
+
+
+class RawEvent(object):
+
+    """Simple raw X.PropertyNotify event."""
+
+    def __init__(self, window, atom):
+        self.type = X.PropertyNotify
+        self.window = window
+        self.atom = atom
+        self.state = X.PropertyNewValue
+
+
+class PropertyNotifyHandlerTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.handled = []
+        self.active = Window.atom('_NET_ACTIVE_WINDOW')
+        self.client_list = Window.atom('_NET_CLIENT_LIST')
+
+    def test_accepts(self):
+        handler = PropertyNotifyHandler(self.handled.append)
+        self.assertEqual(handler.atoms, None)
+        self.assertTrue(handler.accepts(RawEvent(self.win, self.active)))
+        handler = PropertyNotifyHandler(self.handled.append, 
+                                        ['_NET_ACTIVE_WINDOW', 
+                                         self.client_list])
+        self.assertEqual(handler.atoms, 
+                         frozenset([self.active, self.client_list]))
+        self.assertTrue(handler.accepts(RawEvent(self.win, self.active)))
+        self.assertFalse(handler.accepts(
+                RawEvent(self.win, Window.atom('_NET_WORKAREA'))))
+
+    def test_dispatch(self):
+        dispatcher = EventDispatcher(self.display)
+        handler = PropertyNotifyHandler(self.handled.append, 
+                                        ['_NET_ACTIVE_WINDOW'])
+        # register without starting dispatcher thread
+        dispatcher.start = lambda: None
+        dispatcher.register(self.win, handler)
+        dispatch = dispatcher._EventDispatcher__dispatch
+        dispatch(RawEvent(self.win._win, self.client_list))
+        self.assertEqual(self.handled, [])
+        dispatch(RawEvent(self.win._win, self.active))
+        self.assertEqual([event.atom for event in self.handled], 
+                         [self.active])
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [PropertyNotifyHandlerTests, ]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
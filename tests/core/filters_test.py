@@ -256,13 +256,78 @@ class CombinedFiltersTests(FiltersTest):
                             self.desktop1_viewport1_win])
 
 
+class CompiledFiltersTests(FiltersTest):
+
+    def setUp(self):
+        super(CompiledFiltersTests, self).setUp()
+        self.desktop2_win = self.map_window(desktop=1)
+        self.dock_win = self.map_window(type=Type.DOCK)
+
+    def test_fields(self):
+        self.assertEqual(filters.NORMAL_TYPE.fields, ('type',))
+        self.assertEqual(filters.NORMAL_STATE.fields, ('state',))
+        self.assertEqual(filters.DESKTOP.fields, ('desktop',))
+        self.assertEqual(filters.WORKAREA.fields, ('desktop', 'geometry'))
+        self.assertEqual(filters.STANDARD_ON_WORKAREA.fields,
+                         ('desktop', 'geometry', 'state', 'type'))
+        self.assertEqual(filters.AND(filters.ALL_FILTER, 
+                                     filters.NORMAL_TYPE).fields, 
+                         ('type',))
+
+    def test_compile(self):
+        self.WM.set_desktop(0)
+        on_desktop = filters.DESKTOP.compile()
+        on_workarea = filters.NORMAL_ON_WORKAREA.compile()
+        self.WM.set_desktop(1)
+        # current desktop was read while compiling
+        self.assertTrue(on_desktop(self.win))
+        self.assertFalse(on_desktop(self.desktop2_win))
+        self.assertTrue(on_workarea(self.win))
+        self.assertFalse(on_workarea(self.desktop2_win))
+        self.assertFalse(on_workarea(self.dock_win))
+        # but calling filter reads it again
+        self.assertFalse(filters.DESKTOP(self.win))
+        self.assertTrue(filters.DESKTOP(self.desktop2_win))
+
+    def test_compile_filter(self):
+        self.assertEqual(filters.compile_filter(filters.ALL_FILTER), 
+                         filters.ALL_FILTER)
+        self.assertEqual(filters.compile_filter(filters.NORMAL_TYPE), 
+                         filters.NORMAL_TYPE)
+        self.assertTrue(filters.compile_filter(filters.NORMAL)(self.win))
+
+    def test_not_implemented(self):
+        class Incomplete(filters.Filter):
+            pass
+        self.assertRaises(TypeError, Incomplete(), self.win)
+        self.assertRaises(TypeError, Incomplete().mask, [self.win])
+
+    def test_select(self):
+        windows = self.WM.windows()
+        self.assertEqual(filters.NORMAL_ON_WORKAREA.select(windows), 
+                         [self.win])
+        self.assertEqual(filters.NORMAL.select(windows), 
+                         [self.desktop2_win, self.win])
+
+    def test_mask(self):
+        self.map_window(x=DESKTOP_WIDTH + 50)
+        windows = self.WM.windows()
+        for filter in [filters.WORKAREA, filters.NORMAL_ON_WORKAREA,
+                       filters.STANDARD_ON_WORKAREA, filters.NORMAL,
+                       filters.AND(filters.ALL_FILTER, filters.WORKAREA)]:
+            predicate = filters.compile_filter(filter)
+            self.assertEqual(filter.mask(windows), 
+                             [predicate(window) for window in windows])
+
+
 if __name__ == '__main__':
     main_suite = unittest.TestSuite()
     for suite in [IncludeExcludeTypeTests, 
                   IncludeExcludeStateTests, 
                   DesktopTests, 
                   WorkareaTests, 
-                  CombinedFiltersTests, ]:
+                  CombinedFiltersTests, 
+                  CompiledFiltersTests, ]:
         main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
     unittest.TextTestRunner(verbosity=2).run(main_suite)
 
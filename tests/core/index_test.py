@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+
+import random
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from Xlib import X
+
+from tests.common_test import MockedXlibTests
+from tests.common_test import DESKTOP_WIDTH
+from pywo.core import Geometry, Mode, Window
+from pywo.core import filters, xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.events import PropertyNotifyEvent, ConfigureNotifyEvent
+from pywo.core.index import EdgeIndex, WindowIndex
+
+
+class RawEvent(object):
+
+    """Simple wrapper for raw X events."""
+
+    def __init__(self, type, window_id, **kwargs):
+        self.type = type
+        self.window = Window(window_id)
+        self.__dict__.update(kwargs)
+
+
+class PipelinedBackend(xlib.XlibBackend):
+
+    """Backend counting prefetch of mock's windows as single round trip.
+
+    Mock's windows can't be pipelined, so requests are sent one by one, 
+    but only one 'Pipeline' request is counted.
+
+    """
+
+    def __init__(self, display):
+        self.display = display
+
+    def prefetch(self, objects, atoms, geometry=False):
+        requests = self.display.requests.copy()
+        prefetch = xlib.XlibBackend.prefetch(self, objects, atoms, geometry)
+        prefetch.replies = lambda replies=prefetch.replies(): replies
+        self.display.requests = requests
+        self.display.request('Pipeline')
+        return prefetch
+
+
+class EdgeIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.geometries = dict([(win_id, Geometry(random.randint(0, 500),
+                                                  random.randint(0, 500),
+                                                  random.randint(1, 300),
+                                                  random.randint(1, 300)))
+                                for win_id in range(200)])
+        self.edges = EdgeIndex(self.geometries)
+
+    def brute_force(self, axis, start, end, touching):
+        size = {'x': 'width', 'y': 'height'}[axis]
+        found = []
+        for win_id, geometry in self.geometries.items():
+            xy = getattr(geometry, axis)
+            xy2 = xy + getattr(geometry, size)
+            if (touching and xy <= end and xy2 >= start) or \
+               (not touching and xy < end and xy2 > start):
+                found.append(win_id)
+        return found
+
+    def assertOverlapping(self, axis, start, end, touching):
+        found = self.edges.overlapping(axis, start, end, touching)
+        expected = self.brute_force(axis, start, end, touching)
+        self.assertEqual(sorted(found), sorted(expected))
+
+    def test_overlapping(self):
+        for i in range(100):
+            start = random.randint(-100, 900)
+            end = start + random.randint(0, 300)
+            for axis in ['x', 'y']:
+                self.assertOverlapping(axis, start, end, True)
+                self.assertOverlapping(axis, start, end, False)
+
+    def test_overlapping__edges(self):
+        edges = EdgeIndex({1: Geometry(100, 0, 100, 100)})
+        self.assertEqual(edges.overlapping('x', 200, 300, True), [1])
+        self.assertEqual(edges.overlapping('x', 200, 300, False), [])
+        self.assertEqual(edges.overlapping('x', 0, 100, True), [1])
+        self.assertEqual(edges.overlapping('x', 0, 100, False), [])
+        self.assertEqual(edges.overlapping('x', 120, 150, False), [1])
+        self.assertEqual(edges.overlapping('y', 120, 150, True), [])
+
+    def test_add_remove(self):
+        for i in range(50):
+            win_id = random.randint(0, 250)
+            if win_id in self.geometries and random.randint(0, 1):
+                del self.geometries[win_id]
+                self.edges.remove(win_id)
+            else:
+                geometry = Geometry(random.randint(0, 500),
+                                    random.randint(0, 500),
+                                    random.randint(1, 300),
+                                    random.randint(1, 300))
+                self.geometries[win_id] = geometry
+                self.edges.add(win_id, geometry)
+            self.assertEqual(len(self.edges), len(self.geometries))
+            start = random.randint(-100, 900)
+            end = start + random.randint(0, 300)
+            for axis in ['x', 'y']:
+                self.assertOverlapping(axis, start, end, True)
+
+    def test_empty(self):
+        edges = EdgeIndex()
+        self.assertEqual(len(edges), 0)
+        self.assertEqual(edges.overlapping('x', 0, 100), [])
+        edges.remove(1)
+        self.edges.clear()
+        self.assertEqual(self.edges.overlapping('y', 0, 1000), [])
+
+
+class WindowIndexTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        # dispatcher thread can't be restarted, so use new one for each test
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+        self.desktop1_win = self.win
+        self.desktop1_viewport2_win = self.map_window(x=DESKTOP_WIDTH + 50)
+        self.desktop2_win = self.map_window(desktop=1)
+        self.all_desktops_win = self.map_window()
+        self.all_desktops_win.sticky(Mode.SET)
+        self.index = WindowIndex()
+        self.index.start()
+
+    def tearDown(self):
+        self.index.stop()
+        self.WM.unregister_all()
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+
+    def property(self, window, name):
+        event = RawEvent(X.PropertyNotify, window.id,
+                         atom=Window.atom(name),
+                         state=PropertyNotifyEvent.NEW_VALUE)
+        self.index.property(PropertyNotifyEvent(event))
+
+    def configure_event(self, window):
+        geometry = window.geometry
+        event = RawEvent(X.ConfigureNotify, window.id,
+                         border_width=0, override=False,
+                         x=geometry.x, y=geometry.y,
+                         width=geometry.width, height=geometry.height)
+        return ConfigureNotifyEvent(event)
+
+    def configure(self, window):
+        self.index.configure(self.configure_event(window))
+
+    def assertIndexed(self, ids, windows):
+        self.assertEqual(ids, set([win.id for win in windows]))
+
+    def test_start(self):
+        self.assertTrue(self.WM.index is self.index)
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.desktop, 0)
+        self.assertEqual(self.index.workarea, self.WM.workarea_geometry)
+        self.index.stop()
+        self.assertEqual(self.WM.index, None)
+        self.assertEqual(len(self.index), 0)
+
+    def test_windows_ids(self):
+        self.assertIndexed(self.index.windows_ids(),
+                           [self.desktop1_win, self.desktop1_viewport2_win,
+                            self.all_desktops_win])
+        self.assertIndexed(self.index.windows_ids(1),
+                           [self.desktop2_win, self.all_desktops_win])
+        self.assertIndexed(self.index.windows_ids(Window.ALL_DESKTOPS),
+                           [self.all_desktops_win])
+
+    def test_windows_ids__area(self):
+        self.assertIndexed(self.index.windows_ids(area=self.index.workarea),
+                           [self.desktop1_win, self.all_desktops_win])
+        self.assertIndexed(self.index.windows_ids(1, Geometry(0, 0, 10, 10)),
+                           [])
+
+    def test_property__desktop(self):
+        self.desktop1_win.set_desktop(1)
+        self.property(self.desktop1_win, '_NET_WM_DESKTOP')
+        self.assertIndexed(self.index.windows_ids(0),
+                           [self.desktop1_viewport2_win,
+                            self.all_desktops_win])
+        self.assertIndexed(self.index.windows_ids(1),
+                           [self.desktop1_win, self.desktop2_win,
+                            self.all_desktops_win])
+
+    def test_property__current_desktop(self):
+        self.WM.set_desktop(1)
+        self.property(self.WM, '_NET_CURRENT_DESKTOP')
+        self.assertEqual(self.index.desktop, 1)
+        self.assertIndexed(self.index.windows_ids(),
+                           [self.desktop2_win, self.all_desktops_win])
+
+    def test_property__client_list(self):
+        new_win = self.map_window()
+        self.property(self.WM, '_NET_CLIENT_LIST')
+        self.assertTrue(new_win.id in self.index)
+        self.desktop2_win.destroy()
+        new_win.destroy()
+        self.property(self.WM, '_NET_CLIENT_LIST')
+        self.assertFalse(new_win.id in self.index)
+        self.assertFalse(self.desktop2_win.id in self.index)
+        self.assertEqual(len(self.index), 3)
+
+    def test_configure(self):
+        self.desktop1_viewport2_win.set_geometry(Geometry(50, 50, 100, 100))
+        self.configure(self.desktop1_viewport2_win)
+        self.assertIndexed(self.index.windows_ids(area=self.index.workarea),
+                           [self.desktop1_win, self.desktop1_viewport2_win,
+                            self.all_desktops_win])
+
+    def test_windows_in_axis(self):
+        geometry = self.desktop1_win.geometry
+        found = self.index.windows_in_axis('x', geometry.x, geometry.x2)
+        self.assertEqual(set(found),
+                         set([self.desktop1_win.id, 
+                              self.all_desktops_win.id]))
+        self.assertEqual(found[self.desktop1_win.id], geometry)
+        self.assertEqual(self.index.windows_in_axis('x', 0, 10, 
+                                                    area=Geometry(0, 0, 
+                                                                  1, 1)), 
+                         {})
+
+    def test_windows_in_axis__updated(self):
+        self.desktop1_win.set_geometry(Geometry(500, 400, 100, 100))
+        self.configure(self.desktop1_win)
+        found = self.index.windows_in_axis('y', 450, 460)
+        self.assertEqual(found.keys(), [self.desktop1_win.id])
+        self.desktop1_win.destroy()
+        self.property(self.WM, '_NET_CLIENT_LIST')
+        self.assertEqual(self.index.windows_in_axis('y', 450, 460), {})
+
+    def test_configure__round_trips(self):
+        self.desktop1_win.set_geometry(Geometry(500, 400, 100, 100))
+        event = self.configure_event(self.desktop1_win)
+        backend = xlib.XObject.backend()
+        xlib.XObject.set_backend(PipelinedBackend(self.display))
+        try:
+            # single prefetch, and TranslateCoords needed for the geometry
+            self.assertRoundTrips(2, self.index.configure, event)
+        finally:
+            xlib.XObject.set_backend(backend)
+        found = self.index.windows_in_axis('y', 450, 460)
+        self.assertEqual(found.keys(), [self.desktop1_win.id])
+
+    def test_observe(self):
+        observed = []
+        observer = lambda win_id, geometry: observed.append((win_id, geometry))
+        self.index.observe(observer)
+        self.desktop1_win.set_geometry(Geometry(500, 400, 100, 100))
+        self.configure(self.desktop1_win)
+        self.assertEqual(observed, [(self.desktop1_win.id,
+                                     self.desktop1_win.geometry)])
+        self.desktop1_win.destroy()
+        self.property(self.WM, '_NET_CLIENT_LIST')
+        self.assertEqual(observed[1:], [(self.desktop1_win.id, None)])
+        self.index.unobserve(observer)
+        self.configure(self.desktop2_win)
+        self.assertEqual(len(observed), 2)
+
+    def test_search(self):
+        win1 = self.map_window(name='bar foo', class_name=['foo', 'iop'])
+        win2 = self.map_window(name='xyz', class_name=['qwe', 'asd'])
+        win3 = self.map_window(name='foo', desktop=1)
+        win4 = self.map_window(name='Foo bar', class_name=['xyz', 'iop'])
+        self.property(self.WM, '_NET_CLIENT_LIST')
+        ids = [win.id for win in self.WM.windows()]
+        self.assertEqual(self.index.search(u'foo', ids),
+                         [win1.id, win4.id, win3.id])
+        self.assertEqual(self.index.search(u'foo', ids, limit=2),
+                         [win1.id, win4.id])
+        self.assertEqual(self.index.search(u'fo'), 
+                         self.index.search(u'fo', ids))
+        self.assertEqual(self.index.search(u'qwe'), [win2.id])
+        self.assertEqual(self.index.search(u'window', ids[:2]), [ids[1]])
+        self.assertEqual(self.index.search(u'foobar'), [])
+
+    def test_search__same_as_unindexed(self):
+        self.map_window(name='baz Foo a')
+        self.map_window(name='Foo', desktop=1)
+        self.map_window(name='az Foo bar', class_name=['foo', 'bar'])
+        self.map_window(name='ABC', class_name=['abc', 'foo'])
+        self.property(self.WM, '_NET_CLIENT_LIST')
+        indexed = self.WM.windows(match='Foo')
+        self.WM.index = None
+        self.assertEqual(indexed, self.WM.windows(match='Foo'))
+        self.assertEqual(len(indexed), 4)
+
+    def test_property__name(self):
+        found = self.index.search(u'test window')
+        self.assertEqual(set(found[:2]), 
+                         set([self.desktop1_win.id, self.all_desktops_win.id]))
+        self.assertEqual(found[2:], 
+                         [self.desktop1_viewport2_win.id, self.desktop2_win.id])
+        raw = self.display.create_resource_object('window', 
+                                                  self.desktop2_win.id)
+        raw._prop('_NET_WM_NAME', 'Renamed')
+        self.property(self.desktop2_win, '_NET_WM_NAME')
+        self.assertEqual(self.index.search(u'renamed'), [self.desktop2_win.id])
+        self.assertFalse(self.desktop2_win.id in 
+                         self.index.search(u'test window'))
+
+    def test_filters(self):
+        self.assertEqual(filters.DESKTOP.narrow(self.index),
+                         self.index.windows_ids())
+        self.assertEqual(filters.NORMAL_TYPE.narrow(self.index), None)
+        self.assertIndexed(filters.STANDARD_ON_WORKAREA.narrow(self.index),
+                           [self.desktop1_win, self.all_desktops_win])
+        windows = self.WM.windows(filters.STANDARD_ON_WORKAREA)
+        self.assertEqual(set([win.id for win in windows]),
+                         set([self.desktop1_win.id,
+                              self.all_desktops_win.id]))
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [EdgeIndexTests, 
+                  WindowIndexTests, ]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+import random
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from pywo.core import latency
+
+
+class HistogramTests(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = latency.Histogram()
+
+    def test_index(self):
+        indexes = [latency.Histogram.index(value)
+                   for value in range(0, 100000, 7)]
+        self.assertEqual(indexes, sorted(indexes))
+        for value in range(latency.Histogram.SUB_BUCKETS):
+            self.assertEqual(latency.Histogram.index(value), value)
+
+    def test_value(self):
+        for value in [0, 1, 63, 64, 100, 1000, 123456, 10 ** 7]:
+            index = latency.Histogram.index(value)
+            bucket_value = latency.Histogram.value(index)
+            self.assertEqual(latency.Histogram.index(bucket_value), index)
+            self.assertTrue(abs(bucket_value - value) <= value / 32.0)
+
+    def test_percentile(self):
+        random.seed(0)
+        values = [random.uniform(0.001, 0.1) for i in range(1000)]
+        for value in values:
+            self.histogram.add(value)
+        values.sort()
+        for percent in [50, 95, 99]:
+            exact = values[int(len(values) * percent / 100.0) - 1]
+            self.assertAlmostEqual(self.histogram.percentile(percent),
+                                   exact, delta=exact * 0.04)
+        self.assertEqual(self.histogram.percentile(100),
+                         int(values[-1] * 1000000) / 1000000.0)
+
+    def test_summary(self):
+        self.assertEqual(self.histogram.summary(), (0, 0, 0, 0, 0))
+        self.histogram.add(0.000010)
+        self.histogram.add(0.002)
+        count, p50, p95, p99, max_ = self.histogram.summary()
+        self.assertEqual(count, 2)
+        self.assertEqual(p50, 0.000010)
+        self.assertEqual(max_, 0.002)
+        self.assertTrue(p95 == p99 == max_)
+
+
+class ServerClockTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = latency.ServerClock()
+
+    def test_to_local(self):
+        now = 1000000.0
+        self.assertEqual(self.clock.to_local(5000, now), now)
+        # delivered 20ms later than the first one
+        self.assertAlmostEqual(self.clock.to_local(5100, now + 0.120),
+                               now + 0.100)
+        # delivered 10ms faster than the first one
+        self.assertEqual(self.clock.to_local(6000, now + 0.990), now + 0.990)
+        self.assertAlmostEqual(self.clock.to_local(7000, now + 2.005),
+                               now + 1.990)
+
+    def test_to_local__wrap(self):
+        now = 1000000.0
+        self.clock.to_local(latency.ServerClock.WRAP - 10, now)
+        self.assertAlmostEqual(self.clock.to_local(10, now + 0.025),
+                               now + 0.020)
+
+
+class LatencyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.latency = latency.Latency()
+
+    def timeline(self, *stages):
+        timeline = latency.Timeline(100.0)
+        now = 100.0
+        for stage, seconds in stages:
+            now += seconds
+            timeline.mark(stage, now)
+        return timeline
+
+    def test_add(self):
+        self.latency.add('put', self.timeline(('wakeup', 0.002),
+                                              ('perform', 0.010)))
+        self.latency.add('put', self.timeline(('wakeup', 0.004),
+                                              ('perform', 0.010)))
+        self.latency.add('expand', self.timeline(('perform', 0.001)))
+        summary = self.latency.summary()
+        self.assertEqual([row[:3] for row in summary],
+                         [('expand', 'perform', 1),
+                          ('expand', 'total', 1),
+                          ('put', 'wakeup', 2),
+                          ('put', 'perform', 2),
+                          ('put', 'total', 2)])
+        self.assertAlmostEqual(summary[-1][-1], 0.014, 5)
+        self.assertEqual(len(self.latency.report()), 6)
+        self.latency.clear()
+        self.assertEqual(self.latency.summary(), [])
+
+    def test_finish(self):
+        latency.LATENCY.clear()
+        latency.mark('perform') # not started, ignored
+        timeline = latency.start()
+        latency.mark('window')
+        latency.mark('perform')
+        self.assertTrue(latency.finish('test') is timeline)
+        self.assertEqual([stage for stage, seconds in timeline.stages],
+                         ['window', 'perform'])
+        self.assertEqual(latency.finish('test'), None)
+        self.assertEqual(len(latency.LATENCY.summary()), 3)
+        latency.LATENCY.clear()
+
+    def test_finish__required(self):
+        latency.LATENCY.clear()
+        latency.start()
+        latency.mark('window')
+        timeline = latency.finish('test', required='sync')
+        self.assertFalse(timeline.marked('sync'))
+        self.assertEqual(latency.LATENCY.summary(), [])
+        latency.start()
+        latency.mark('window')
+        latency.mark('sync')
+        self.assertTrue(latency.finish('test', required='sync').marked('sync'))
+        self.assertEqual(len(latency.LATENCY.summary()), 3)
+        latency.LATENCY.clear()
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [HistogramTests,
+                  ServerClockTests,
+                  LatencyTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
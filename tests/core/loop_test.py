@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+
+import threading
+import time
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+import Xlib.display
+from Xlib import X
+
+from tests.common_test import MockedXlibTests
+from pywo import actions
+from pywo.core import Geometry, State, Window
+from pywo.core import loop, xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.events import PropertyNotifyHandler
+
+
+class RawEvent(object):
+
+    """Simple wrapper for raw X events."""
+
+    def __init__(self, type, window_id, **kwargs):
+        self.type = type
+        self.window = Window(window_id)
+        self.__dict__.update(kwargs)
+
+
+class Resource(object):
+
+    """Object with X resource, as used by Prefetch."""
+
+    def __init__(self, win):
+        self._win = win
+
+
+class FutureTests(unittest.TestCase):
+
+    def test_result(self):
+        future = loop.Future()
+        called = []
+        future.add_done_callback(called.append)
+        self.assertFalse(future.done())
+        self.assertRaises(loop.InvalidStateError, future.result)
+        future.set_result(1)
+        self.assertTrue(future.done())
+        self.assertEqual(future.result(), 1)
+        self.assertEqual(future.exception(), None)
+        self.assertEqual(called, [future])
+        future.add_done_callback(called.append)
+        self.assertEqual(called, [future, future])
+        self.assertRaises(loop.InvalidStateError, future.set_result, 2)
+
+    def test_exception(self):
+        future = loop.Future()
+        future.set_exception(ValueError('error'))
+        self.assertRaises(ValueError, future.result)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+
+    def test_gather(self):
+        futures = [loop.Future(), loop.Future()]
+        gathered = loop.gather(*futures)
+        futures[1].set_result(2)
+        self.assertFalse(gathered.done())
+        futures[0].set_result(1)
+        self.assertEqual(gathered.result(), [1, 2])
+        self.assertEqual(loop.gather().result(), [])
+
+
+class LoopTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+        self.loop = loop.Loop()
+        loop.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.WM.unregister_all()
+        self.loop.detach()
+        self.loop.close()
+        loop.set_event_loop(None)
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+
+    def test_coroutine(self):
+        @loop.coroutine
+        def double(value):
+            yield None
+            raise loop.Return(value * 2)
+        @loop.coroutine
+        def main():
+            values = yield [double(1), double(2)]
+            value = yield double(3)
+            raise loop.Return(values + [value])
+        self.assertEqual(self.loop.run_until_complete(main()), [2, 4, 6])
+
+    def test_coroutine__exception(self):
+        @loop.coroutine
+        def failing():
+            yield None
+            raise ValueError('error')
+        @loop.coroutine
+        def main():
+            try:
+                yield failing()
+            except ValueError:
+                raise loop.Return('caught')
+        self.assertEqual(self.loop.run_until_complete(main()), 'caught')
+        self.assertRaises(ValueError,
+                          self.loop.run_until_complete, failing())
+
+    def test_coroutine__not_generator(self):
+        function = loop.coroutine(lambda: 1)
+        self.assertEqual(self.loop.run_until_complete(function()), 1)
+
+    def test_call_later(self):
+        called = []
+        future = loop.Future()
+        self.loop.call_later(0.02, future.set_result, None)
+        self.loop.call_later(0.01, called.append, 1)
+        self.loop.call_soon(called.append, 0)
+        self.loop.run_until_complete(future)
+        self.assertEqual(called, [0, 1])
+
+    def test_call_soon_threadsafe(self):
+        future = loop.Future()
+        def set_result():
+            time.sleep(0.01)
+            self.loop.call_soon_threadsafe(future.set_result, 'thread')
+        thread = threading.Thread(target=set_result)
+        thread.start()
+        self.assertEqual(self.loop.run_until_complete(future), 'thread')
+        thread.join()
+
+    def test_run_forever(self):
+        self.loop.call_later(0.01, self.loop.stop)
+        self.loop.run_forever()
+        self.assertEqual(self.loop.thread, None)
+
+    def test_fetch(self):
+        win2 = self.map_window(name='Other')
+        names = ['_NET_WM_NAME', '_NET_WM_DESKTOP']
+        fetched = self.loop.run_until_complete(
+                self.loop.fetch([self.win, win2], names, geometry=True))
+        prefetched = Window.prefetch([self.win, win2], names, geometry=True)
+        for fetched_data, prefetched_data in zip(fetched, prefetched):
+            self.assertEqual(fetched_data['_NET_WM_NAME'].value,
+                             prefetched_data['_NET_WM_NAME'].value)
+            self.assertEqual(fetched_data['geometry'].x,
+                             prefetched_data['geometry'].x)
+
+    def test_fetch__replies_read_elsewhere(self):
+        # like EventDispatcher's thread, blocked in next_event(), reading
+        # replies between loop's pollers, and select
+        def read_replies():
+            end = time.time() + 0.1
+            while time.time() < end:
+                Xlib.display.Display.pending_events(self.display)
+        root = Xlib.display.Display.create_resource_object(
+                        self.display, 'window', self.display.root_id)
+        self.loop.add_poller(read_replies)
+        # without bounded select timeout only stop() would wake the loop up
+        guard = threading.Timer(2, self.loop.stop)
+        guard.start()
+        start = time.time()
+        try:
+            fetched = self.loop.run_until_complete(
+                    self.loop.fetch([Resource(root)], geometry=True))
+        finally:
+            guard.cancel()
+            self.loop.remove_poller(read_replies)
+        self.assertTrue(time.time() - start < 1)
+        self.assertEqual(fetched[0]['geometry'].__class__,
+                         Xlib.protocol.request.GetGeometry)
+
+    def test_get_property(self):
+        name = self.loop.run_until_complete(
+                self.loop.get_property(self.win, '_NET_WM_NAME'))
+        self.assertEqual(name.value, self.win.name)
+
+    def test_geometry(self):
+        geometry = self.loop.run_until_complete(self.loop.geometry(self.win))
+        self.assertEqual(geometry, self.win.geometry)
+
+    def test_configure(self):
+        geometry = Geometry(50, 60, 300, 200)
+        self.loop.run_until_complete(self.loop.configure(self.win, geometry))
+        self.assertEqual(self.win.geometry, geometry)
+
+    def test_perform(self):
+        action = actions.manager.get('sticky')
+        self.loop.run_until_complete(
+                self.loop.perform(action, self.win, mode=1))
+        self.assertTrue(State.STICKY in self.win.state)
+
+    def test_event_stream(self):
+        self.loop.attach()
+        stream = loop.EventStream(self.win, PropertyNotifyHandler,
+                                  ['_NET_WM_NAME'])
+        self.assertFalse(self.dispatcher.isAlive())
+        dispatch = self.dispatcher._EventDispatcher__dispatch
+        for name in ['_NET_WM_NAME', '_NET_WM_DESKTOP', '_NET_WM_NAME']:
+            self.loop.call_soon(dispatch,
+                                RawEvent(X.PropertyNotify, self.win.id,
+                                         atom=Window.atom(name),
+                                         state=X.PropertyNewValue))
+        @loop.coroutine
+        def main():
+            events = []
+            for next_event in stream:
+                event = yield next_event
+                events.append(event.atom_name)
+                if len(events) == 2:
+                    stream.close()
+            raise loop.Return(events)
+        self.assertEqual(self.loop.run_until_complete(main()),
+                         ['_NET_WM_NAME', '_NET_WM_NAME'])
+        self.assertRaises(loop.StreamClosed, stream.next().result)
+
+
+class PrefetchTests(MockedXlibTests):
+
+    def test_ready(self):
+        # Mock's windows can't be pipelined, use real window resource
+        root = Xlib.display.Display.create_resource_object(
+                        self.display, 'window', self.display.root_id)
+        resource = Resource(root)
+        prefetch = xlib.Prefetch([resource], [], geometry=True)
+        self.assertFalse(prefetch.ready())
+        Xlib.display.Display.flush(self.display)
+        end = time.time() + 1
+        while not prefetch.ready() and time.time() < end:
+            Xlib.display.Display.pending_events(self.display)
+        self.assertTrue(prefetch.ready())
+        self.assertEqual(prefetch.replies()[0]['geometry'].__class__,
+                         Xlib.protocol.request.GetGeometry)
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [FutureTests,
+                  LoopTests,
+                  PrefetchTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from pywo.core import accounting
+from pywo.core import profiling
+
+
+def busy(seconds):
+    """Keep CPU busy for given time."""
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+    return seconds
+
+
+class ProfilingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'profile')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+class ProfilerTests(ProfilingTests):
+
+    def setUp(self):
+        ProfilingTests.setUp(self)
+        self.profiler = profiling.Profiler()
+
+    def test_run(self):
+        self.assertEqual(self.profiler.run(busy, 0), 0)
+        self.profiler.start()
+        self.assertEqual(self.profiler.run(busy, 0.01), 0.01)
+        thread = threading.Thread(target=self.profiler.run, args=(busy, 0.01))
+        thread.start()
+        thread.join()
+        self.assertEqual(self.profiler.stop(self.filename), self.filename)
+        stats = pstats.Stats(self.filename)
+        calls = [stat[0] for function, stat in stats.stats.items()
+                 if function[2] == 'busy']
+        self.assertEqual(calls, [2])
+
+    def test_run__nested(self):
+        self.profiler.start()
+        self.profiler.run(self.profiler.run, busy, 0.01)
+        self.assertEqual(self.profiler.stop(self.filename), self.filename)
+
+    def test_stop__not_started(self):
+        self.assertEqual(self.profiler.stop(self.filename), None)
+        self.assertFalse(os.path.exists(self.filename))
+
+
+class SamplerTests(ProfilingTests):
+
+    def test_stop(self):
+        sampler = profiling.Sampler(0.001)
+        self.assertEqual(sampler.stop(self.filename), None)
+        sampler.start()
+        thread = threading.Thread(name='Busy', target=busy, args=(0.1,))
+        thread.start()
+        thread.join()
+        self.assertEqual(sampler.stop(self.filename), self.filename)
+        self.assertFalse(sampler.running)
+        lines = open(self.filename).readlines()
+        busy_lines = [line for line in lines
+                      if line.startswith('Busy;') and 'busy (' in line]
+        self.assertTrue(busy_lines)
+        self.assertTrue(all([int(line.split()[-1]) > 0 for line in lines]))
+
+
+class SnapshotsTests(unittest.TestCase):
+
+    def test_take(self):
+        snapshots = profiling.Snapshots()
+        snapshots.take()
+        leaked = [threading.Event() for i in range(1000)]
+        accounting.add('CreateGC')
+        report = '\n'.join(snapshots.take())
+        self.assertTrue('CreateGC' in report)
+        self.assertTrue('+1' in report)
+        if profiling.tracemalloc is None:
+            self.assertTrue('_Event' in report or 'Condition' in report)
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [ProfilerTests,
+                  SamplerTests,
+                  SnapshotsTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
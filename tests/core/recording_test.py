@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from Xlib import X
+
+from tests.common_test import MockedXlibTests
+from pywo import actions
+from pywo.core import Geometry, Window
+from pywo.core import recording, xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.events import PropertyNotifyHandler
+
+
+class RawEvent(object):
+
+    """Simple wrapper for raw X events."""
+
+    def __init__(self, type, window_id, **kwargs):
+        self.type = type
+        self.window = Window(window_id)
+        self.__dict__.update(kwargs)
+
+
+class RecordingTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'recording')
+
+    def tearDown(self):
+        recording.stop()
+        self.WM.unregister_all()
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+        shutil.rmtree(self.path)
+
+    def records(self, kind=None):
+        return [record for record in recording.load(self.filename)
+                if kind is None or record[0] == kind]
+
+    def dispatch(self, event):
+        self.dispatcher._EventDispatcher__dispatch(event)
+
+    def test_start(self):
+        recorder = recording.start(self.filename)
+        self.assertTrue(recording.RECORDER is recorder)
+        self.assertTrue(self.dispatcher.recorder is recorder)
+        self.assertTrue(recording.stop() is recorder)
+        self.assertEqual(recording.stop(), None)
+        self.assertEqual(self.dispatcher.recorder, None)
+        header = self.records()[0]
+        self.assertEqual(header[:2], ('header', recording.VERSION))
+        self.assertEqual(header[3], self.WM.id)
+        windows = dict([record[2:] for record in self.records('window')])
+        self.assertEqual(set(windows),
+                         set([self.WM.id] + self.WM.windows_ids()))
+        root = windows[self.WM.id]['properties']
+        self.assertEqual(root['_NET_ACTIVE_WINDOW'][1], [self.win.id])
+        state = windows[self.win.id]
+        self.assertEqual(state['properties']['_NET_WM_NAME'][1],
+                         self.win.name)
+        geometry = self.win.geometry
+        self.assertEqual(state['geometry'], (geometry.x, geometry.y,
+                                             geometry.width, geometry.height))
+        self.assertEqual(state['hints']['min_width'], 0)
+
+    def test_event__property(self):
+        self.WM.register(PropertyNotifyHandler())
+        recording.start(self.filename)
+        self.display.windows_by_id[self.win.id]._prop('_NET_WM_NAME', 'New')
+        self.dispatch(RawEvent(X.PropertyNotify, self.win.id,
+                               atom=Window.atom('_NET_WM_NAME'),
+                               state=X.PropertyNewValue))
+        recording.stop()
+        events = self.records('event')
+        self.assertEqual(len(events), 1)
+        fields, state = events[0][2:]
+        self.assertEqual(fields['atom'], '_NET_WM_NAME')
+        self.assertEqual(fields['window'], (recording.WINDOW, self.win.id))
+        self.assertEqual(state, {'properties': {'_NET_WM_NAME': (8, 'New')}})
+
+    def test_event__new_window(self):
+        recording.start(self.filename)
+        win = self.map_window()
+        self.dispatch(RawEvent(X.PropertyNotify, self.WM.id,
+                               atom=Window.atom('_NET_CLIENT_LIST'),
+                               state=X.PropertyNewValue))
+        recording.stop()
+        windows = [record[2] for record in self.records('window')]
+        self.assertEqual(windows.count(win.id), 1)
+        self.assertEqual(windows.count(self.win.id), 1)
+
+    def test_event__configure(self):
+        recording.start(self.filename)
+        self.win.set_geometry(Geometry(10, 20, 300, 200))
+        self.dispatch(RawEvent(X.ConfigureNotify, self.win.id,
+                               x=10, y=20, width=300, height=200,
+                               border_width=0, override=False))
+        recording.stop()
+        fields, state = self.records('event')[0][2:]
+        self.assertEqual(state, {'geometry': (10, 20, 300, 200)})
+        self.assertEqual(fields['width'], 300)
+
+    def test_action(self):
+        recording.start(self.filename)
+        actions.manager.get('sticky')(self.win, mode=1)
+        recording.stop()
+        self.assertEqual(self.records('action')[0][2:],
+                         ('sticky', self.win.id, {'mode': 1}))
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [RecordingTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import random
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from pywo.core import Geometry
+from pywo.core import rectangles
+
+
+AREA = Geometry(100, 100, 200, 200)
+GEOMETRIES = [Geometry(150, 150, 50, 50), # inside
+              Geometry(0, 0, 150, 150), # overlapping
+              Geometry(0, 0, 100, 100), # touching corner
+              Geometry(300, 120, 50, 50), # touching right edge
+              Geometry(400, 400, 10, 10), # outside
+              Geometry(50, 120, 400, 10)] # crossing
+
+
+class RectanglesTests(unittest.TestCase):
+
+    implementation = rectangles.Rectangles
+
+    def setUp(self):
+        self.rectangles = self.implementation(GEOMETRIES)
+
+    def test_overlap(self):
+        self.assertEqual(list(self.rectangles.overlap(AREA)),
+                         [True, True, False, False, False, True])
+        self.assertEqual(list(self.rectangles.overlap(AREA, touching=True)),
+                         [True, True, True, True, False, True])
+
+    def test_in_axis(self):
+        self.assertEqual(list(self.rectangles.in_axis('x', 300, 400)),
+                         [False, False, False, True, True, True])
+        self.assertEqual(list(self.rectangles.in_axis('x', 300, 400, False)),
+                         [False, False, False, True, False, True])
+        self.assertEqual(list(self.rectangles.in_axis('y', 0, 100, False)),
+                         [False, True, True, False, False, False])
+
+    def test_intersection_areas(self):
+        self.assertEqual(self.rectangles.intersection_areas(AREA),
+                         [2500, 2500, 0, 0, 0, 2000])
+
+    def test_empty(self):
+        empty = self.implementation([])
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(list(empty.overlap(AREA)), [])
+        self.assertEqual(empty.intersection_areas(AREA), [])
+
+
+class NumpyRectanglesTests(RectanglesTests):
+
+    implementation = rectangles.NumpyRectangles
+
+    def setUp(self):
+        if rectangles.numpy is None:
+            self.skipTest('NumPy not available')
+        RectanglesTests.setUp(self)
+
+    def test_same_as_python(self):
+        random.seed(0)
+        geometries = [Geometry(random.randint(-50, 500),
+                               random.randint(-50, 500),
+                               random.randint(1, 300),
+                               random.randint(1, 300))
+                      for i in range(300)]
+        python = rectangles.Rectangles(geometries)
+        vectorised = rectangles.NumpyRectangles(geometries)
+        self.assertEqual(list(vectorised.overlap(AREA)), python.overlap(AREA))
+        self.assertEqual(list(vectorised.in_axis('y', 10, 200)),
+                         python.in_axis('y', 10, 200))
+        self.assertEqual(vectorised.intersection_areas(AREA),
+                         python.intersection_areas(AREA))
+
+
+class RectanglesFunctionsTests(unittest.TestCase):
+
+    def test_rectangles(self):
+        self.assertTrue(type(rectangles.rectangles(GEOMETRIES)) is
+                        rectangles.Rectangles)
+        selected = rectangles.rectangles(GEOMETRIES, threshold=1)
+        if rectangles.numpy is None:
+            self.assertTrue(type(selected) is rectangles.Rectangles)
+        else:
+            self.assertTrue(type(selected) is rectangles.NumpyRectangles)
+
+    def test_select(self):
+        mask = rectangles.Rectangles(GEOMETRIES).overlap(AREA)
+        self.assertEqual(rectangles.select(range(6), mask), [0, 1, 5])
+        if rectangles.numpy is not None:
+            mask = rectangles.NumpyRectangles(GEOMETRIES).overlap(AREA)
+            self.assertEqual(rectangles.select(range(6), mask), [0, 1, 5])
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [RectanglesTests,
+                  NumpyRectanglesTests,
+                  RectanglesFunctionsTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
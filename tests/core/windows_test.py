@@ -13,7 +13,7 @@ from tests.common_test import MockedXlibTests
 from tests.common_test import DESKTOPS, DESKTOP_WIDTH, DESKTOP_HEIGHT, VIEWPORTS
 from tests.common_test import WIN_X, WIN_Y, WIN_WIDTH, WIN_HEIGHT
 from pywo.core import Window, WindowManager, State, Type
-from pywo.core import Position, Geometry, Layout
+from pywo.core import Position, Size, Geometry, Layout
 from pywo.core.xlib import XObject
 
 
@@ -150,6 +150,21 @@ class WindowManagerTests(MockedXlibTests):
         windows = self.WM.windows(filter=fullscreen_filter)
         self.assertEqual(len(windows), 1)
 
+    def test_snapshots(self):
+        new_win = self.map_window(name='Test Window 2', desktop=1)
+        snapshots = self.WM.snapshots([self.win, new_win], 
+                                      ['desktop', 'geometry'])
+        self.assertEqual([snapshot.id for snapshot in snapshots], 
+                         [self.win.id, new_win.id])
+        self.assertEqual(snapshots[0].geometry, self.win.geometry)
+        self.assertEqual(snapshots[1].desktop, 1)
+        # prefetched values are not updated
+        new_win.set_desktop(0)
+        self.assertEqual(snapshots[1].desktop, 1)
+        self.assertEqual(new_win.desktop, 0)
+        # not prefetched values are fetched when needed
+        self.assertEqual(snapshots[1].name, 'Test Window 2')
+
 
 class WindowManagerTests_name_matcher(MockedXlibTests):
 
@@ -239,6 +254,15 @@ class WindowManagerTests_name_matcher(MockedXlibTests):
         windows = self.WM.windows(match='Foo')
         self.assertEqual(windows, [win4, win3, win1])
 
+    def test_match_limit(self):
+        win1 = self.map_window(name='bar foo')
+        win2 = self.map_window(name='foo')
+        win3 = self.map_window(name='foo bar')
+        windows = self.WM.windows(match='Foo', limit=2)
+        self.assertEqual(windows, [win2, win3])
+        windows = self.WM.windows(match='Foo', limit=1)
+        self.assertEqual(windows, [win2])
+
     def test_match_same_desktop_first(self):
         win1 = self.map_window(name='abc', desktop=1)
         win2 = self.map_window(name='abc')
@@ -317,6 +341,21 @@ class WindowTests_properties(MockedXlibTests):
         geometry = self.win.geometry
         self.assertEqualGeometry(geometry, 0, 0, 138, 45)
 
+    def test_size_limits(self):
+        self.assertEqual(self.win.size_limits, (Size(0, 0), Size(0, 0)))
+        self.win._win.normal_hints = Xlib_mock.HINTS_TERMINAL
+        extents = Xlib_mock.EXTENTS_NORMAL
+        minimum, maximum = self.win.size_limits
+        self.assertEqual(minimum, 
+                         Size(30 + extents.left + extents.right,
+                              32 + extents.top + extents.bottom))
+        self.assertEqual(maximum, Size(0, 0))
+
+    def test_size_increments(self):
+        self.assertEqual(self.win.size_increments, Size(1, 1))
+        self.win._win.normal_hints = Xlib_mock.HINTS_TERMINAL
+        self.assertEqual(self.win.size_increments, Size(7, 15))
+
     # TODO: test with incremental windows!
     # TODO: test windows with maximal, and minimal size
     # TODO: test with windows with border_width > 0
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+import Xlib.display
+
+from tests.common_test import MockedXlibTests
+from pywo.core import Window
+from pywo.core import xcb, xlib
+
+
+class Resource(object):
+
+    """Object with X resource, as used by Prefetch."""
+
+    def __init__(self, win):
+        self._win = win
+
+
+class CountingBackend(xlib.XlibBackend):
+
+    """XlibBackend counting requests sent."""
+
+    name = 'counting'
+
+    def __init__(self):
+        self.requests = []
+
+    def get_property(self, win, atom):
+        self.requests.append('GetProperty')
+        return xlib.XlibBackend.get_property(self, win, atom)
+
+    def get_geometry(self, win):
+        self.requests.append('GetGeometry')
+        return xlib.XlibBackend.get_geometry(self, win)
+
+    def prefetch(self, objects, atoms, geometry=False):
+        self.requests.append('Prefetch')
+        return xlib.XlibBackend.prefetch(self, objects, atoms, geometry)
+
+
+class BackendTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.backend = xlib.XObject.backend()
+
+    def tearDown(self):
+        xlib.XObject.set_backend(self.backend)
+        MockedXlibTests.tearDown(self)
+
+    def test_default(self):
+        self.assertEqual(self.backend.name, 'xlib')
+
+    def test_set_backend(self):
+        name = self.win.name
+        geometry = self.win.geometry
+        prefetched = Window.prefetch([self.win], ['_NET_WM_NAME'], True)
+        backend = CountingBackend()
+        xlib.XObject.set_backend(backend)
+        self.assertTrue(xlib.XObject.backend() is backend)
+        self.assertEqual(self.win.name, name)
+        self.assertEqual(self.win.geometry, geometry)
+        self.assertEqual(
+                Window.prefetch([self.win], ['_NET_WM_NAME'], True)[0]\
+                        ['_NET_WM_NAME'].value,
+                prefetched[0]['_NET_WM_NAME'].value)
+        self.assertTrue('GetProperty' in backend.requests)
+        self.assertTrue('GetGeometry' in backend.requests)
+        self.assertTrue('Prefetch' in backend.requests)
+
+    def test_enable__no_xcffib(self):
+        if xcb.xcffib is not None:
+            self.skipTest('xcffib available')
+        self.assertFalse(xcb.enable())
+        self.assertTrue(xlib.XObject.backend() is self.backend)
+
+
+class XCBBackendTests(MockedXlibTests):
+
+    def setUp(self):
+        if xcb.xcffib is None:
+            self.skipTest('xcffib not available')
+        MockedXlibTests.setUp(self)
+        # Mock's windows are not known to X Server, use real root window
+        self.root = Xlib.display.Display.create_resource_object(
+                        self.display, 'window', self.display.root_id)
+        self.xlib = xlib.XlibBackend()
+        self.xcb = xcb.XCBBackend()
+
+    def tearDown(self):
+        self.xcb.close()
+        MockedXlibTests.tearDown(self)
+
+    def assertGeometryEqual(self, first, second):
+        for name in ['x', 'y', 'width', 'height', 'border_width']:
+            self.assertEqual(getattr(first, name), getattr(second, name))
+
+    def assertPropertyEqual(self, first, second):
+        if first is None or second is None:
+            self.assertEqual(first, second)
+            return
+        self.assertEqual(first.property_type, second.property_type)
+        self.assertEqual(first.format, second.format)
+        self.assertEqual(list(first.value), list(second.value))
+
+    def test_get_geometry(self):
+        self.assertGeometryEqual(self.xcb.get_geometry(self.root),
+                                 self.xlib.get_geometry(self.root))
+
+    def test_get_property(self):
+        for name in ['_NET_SUPPORTING_WM_CHECK', '_NET_ACTIVE_WINDOW']:
+            atom = Window.atom(name)
+            self.assertPropertyEqual(self.xcb.get_property(self.root, atom),
+                                     self.xlib.get_property(self.root, atom))
+
+    def test_prefetch(self):
+        names = ['_NET_SUPPORTING_WM_CHECK', '_NET_ACTIVE_WINDOW']
+        atoms = [(name, Window.atom(name)) for name in names]
+        objects = [Resource(self.root)]
+        prefetch = self.xcb.prefetch(objects, atoms, geometry=True)
+        self.assertTrue(prefetch.ready())
+        fetched = prefetch.replies()[0]
+        expected = self.xlib.prefetch(objects, atoms, geometry=True)
+        Xlib.display.Display.flush(self.display)
+        expected = expected.replies()[0]
+        for name in names:
+            self.assertPropertyEqual(fetched[name], expected[name])
+        self.assertGeometryEqual(fetched['geometry'], expected['geometry'])
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [BackendTests,
+                  XCBBackendTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
@@ -1,12 +1,14 @@
 #!/usr/bin/env python
 
+import time
 import unittest
 
 import sys
 sys.path.insert(0, '../')
 sys.path.insert(0, './')
 
-from Xlib import Xutil
+import Xlib.display
+from Xlib import Xatom, Xutil
 
 from tests import Xlib_mock
 from tests.common_test import MockedXlibTests
@@ -81,10 +83,106 @@ class XObjectTests(MockedXlibTests):
                          [Xlib_mock.Geometry(0, 0, 800, 600)])
 
 
+    def test_prefetch(self):
+        prefetched = XObject.prefetch([self.win], 
+                                      ['_NET_WM_NAME', '_NET_WM_DESKTOP'])
+        self.assertEqual(len(prefetched), 1)
+        self.assertEqual(prefetched[0]['_NET_WM_NAME'].value, 'Test Window')
+        self.assertEqual(prefetched[0]['_NET_WM_DESKTOP'].value, [0])
+        self.assertFalse('geometry' in prefetched[0])
+
+    def test_prefetch__geometry(self):
+        prefetched = XObject.prefetch([self.win], [], geometry=True)
+        self.assertEqual(prefetched[0].keys(), ['geometry'])
+        self.assertEqual(prefetched[0]['geometry'].width, 
+                         self.win._win.get_geometry().width)
+
+
+class Resource(object):
+
+    """Object with X resource, as used by Prefetch."""
+
+    def __init__(self, win):
+        self._win = win
+
+
+class PipelinedPrefetchTests(MockedXlibTests):
+
+    # Longer than 64 32-bit units fetched by the first GetProperty
+    LONG = range(200)
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        # Mock's windows can't be pipelined, use real root window
+        self.root = Xlib.display.Display.create_resource_object(
+                        self.display, 'window', self.display.root_id)
+        self.short = XObject.atom('_PYWO_TEST_SHORT')
+        self.long = XObject.atom('_PYWO_TEST_LONG')
+        self.root.change_property(self.short, Xatom.STRING, 8, 'PyWO')
+        self.root.change_property(self.long, Xatom.CARDINAL, 32, self.LONG)
+
+    def tearDown(self):
+        self.root.delete_property(self.short)
+        self.root.delete_property(self.long)
+        Xlib.display.Display.flush(self.display)
+
+    def test_prefetch(self):
+        names = ['_PYWO_TEST_SHORT', '_PYWO_TEST_LONG', '_PYWO_TEST_NONE']
+        prefetched = XObject.prefetch([Resource(self.root)], names)[0]
+        for name in names:
+            expected = self.root.get_full_property(XObject.atom(name), 0)
+            if expected is None:
+                self.assertEqual(prefetched[name], None)
+                continue
+            self.assertEqual(prefetched[name].property_type, 
+                             expected.property_type)
+            self.assertEqual(prefetched[name].format, expected.format)
+            self.assertEqual(prefetched[name].value, expected.value)
+        self.assertEqual(prefetched['_PYWO_TEST_SHORT'].value, 'PyWO')
+        self.assertEqual(list(prefetched['_PYWO_TEST_LONG'].value), 
+                         self.LONG)
+
+    def test_prefetch__geometry(self):
+        prefetched = XObject.prefetch([Resource(self.root)], [], 
+                                      geometry=True)
+        geometry = self.root.get_geometry()
+        self.assertEqual(prefetched[0]['geometry'].width, geometry.width)
+        self.assertEqual(prefetched[0]['geometry'].height, geometry.height)
+
+
+class MockedRequestsTests(MockedXlibTests):
+
+    def test_requests(self):
+        self.display.reset_requests()
+        self.win.geometry
+        self.win.set_geometry(Geometry(0, 0, 100, 100))
+        self.assertEqual(self.display.requests['ConfigureWindow'], 1)
+        self.assertTrue(self.display.requests['GetGeometry'] > 0)
+        self.assertEqual(self.display.round_trips, 
+                         sum(self.display.requests.values()) - 1)
+        self.display.reset_requests()
+        self.assertEqual(self.display.round_trips, 0)
+
+    def test_latency(self):
+        self.display.latency = 0.02
+        start = time.time()
+        self.win._win.configure(x=0)
+        self.assertTrue(time.time() - start < 0.02)
+        start = time.time()
+        self.win._win.get_geometry()
+        self.assertTrue(time.time() - start >= 0.02)
+
+    def test_prefetch(self):
+        windows = [self.map_window() for i in range(5)]
+        self.assertRoundTrips(2 * len(windows) + 1, XObject.prefetch,
+                              windows, ['_NET_WM_NAME'], geometry=True)
+
 
 if __name__ == '__main__':
     main_suite = unittest.TestSuite()
-    for suite in [XObjectTests, ]:
+    for suite in [XObjectTests, 
+                  PipelinedPrefetchTests, 
+                  MockedRequestsTests, ]:
         main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
     unittest.TextTestRunner(verbosity=2).run(main_suite)
 
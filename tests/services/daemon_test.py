@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+import os
+import signal
+import threading
+import time
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from tests.common_test import MockedXlibTests
+from pywo.config import Config
+from pywo.core import Window
+from pywo.services import daemon, manager
+
+
+class Service(object):
+
+    """Service recording calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def setup(self, config):
+        self.calls.append('setup')
+
+    def start(self):
+        self.calls.append('start')
+
+    def stop(self):
+        self.calls.append('stop')
+
+
+class ReloadableService(Service):
+
+    def reload(self, config):
+        self.calls.append('reload')
+
+
+class DaemonTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        daemon.EXITING.clear()
+
+    def test_wm_check_handler(self):
+        self.assertEqual(daemon.WM_CHECK_HANDLER.atoms,
+                         frozenset([Window.atom('_NET_SUPPORTING_WM_CHECK')]))
+
+    def test_wait__exit_from_thread(self):
+        timer = threading.Timer(0.1, daemon.exit_pywo)
+        timer.start()
+        daemon.wait()
+        timer.join()
+        self.assertTrue(daemon.EXITING.isSet())
+
+    def test_wait__exit_before_wait(self):
+        # EXITING set (and wakeup() called) before main-thread waits
+        daemon.exit_pywo()
+        # if wakeup is lost, stop waiting after 1s anyway
+        timer = threading.Timer(1, os.kill, [os.getpid(), signal.SIGALRM])
+        previous = signal.signal(signal.SIGALRM, 
+                                 lambda *args: daemon.EXITING.set())
+        timer.start()
+        try:
+            started = time.time()
+            daemon.wait()
+            self.assertTrue(time.time() - started < 0.5)
+        finally:
+            timer.cancel()
+            timer.join()
+            signal.signal(signal.SIGALRM, previous)
+
+    def test_wait__signal(self):
+        def handler(*args):
+            daemon.EXITING.set()
+        previous = signal.signal(signal.SIGALRM, handler)
+        timer = threading.Timer(0.1, os.kill, [os.getpid(), signal.SIGALRM])
+        timer.start()
+        try:
+            daemon.wait()
+            self.assertTrue(daemon.EXITING.isSet())
+        finally:
+            timer.join()
+            signal.signal(signal.SIGALRM, previous)
+
+
+class ReloadTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.service = Service()
+        self.reloadable = ReloadableService()
+        self.services = getattr(manager, '__SERVICES')
+        self.services.clear()
+        self.services.update([self.service, self.reloadable])
+        self.load = manager.load
+        manager.load = lambda config: None
+        setattr(daemon, '__CONFIG', Config())
+
+    def tearDown(self):
+        manager.load = self.load
+        self.services.clear()
+
+    def test_reload__not_changed(self):
+        daemon.reload_pywo(self.win)
+        self.assertEqual(self.service.calls, [])
+        self.assertEqual(self.reloadable.calls, ['reload'])
+
+    def test_reload__changed(self):
+        getattr(daemon, '__CONFIG').settings['modal_mode'] = Config.ON
+        daemon.reload_pywo(self.win)
+        self.assertEqual(self.service.calls, ['stop', 'setup', 'start'])
+        self.assertEqual(self.reloadable.calls, ['reload'])
+
+    def test_reload__services_changed(self):
+        added = Service()
+        manager.load = lambda config: (self.services.discard(self.service), 
+                                       self.services.add(added))
+        daemon.reload_pywo(self.win)
+        self.assertEqual(self.service.calls, ['stop'])
+        self.assertEqual(added.calls, ['setup', 'start'])
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [DaemonTests, 
+                  ReloadTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
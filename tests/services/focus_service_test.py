@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from Xlib import X
+
+from tests.common_test import MockedXlibTests
+from pywo.core import Window, xlib
+from pywo.core.dispatch import EventDispatcher
+from pywo.core.events import PropertyNotifyEvent
+from pywo.services.focus_service import FocusHistory
+
+
+class RawEvent(object):
+
+    """Simple raw X.PropertyNotify event."""
+
+    def __init__(self, window_id, name):
+        self.type = X.PropertyNotify
+        self.window = Window(window_id)
+        self.atom = Window.atom(name)
+        self.state = X.PropertyNewValue
+
+
+class FocusHistoryTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        # dispatcher thread can't be restarted, so use new one for each test
+        self.dispatcher = EventDispatcher(self.display)
+        xlib.XObject._XObject__EVENT_DISPATCHER = self.dispatcher
+        self.win2 = self.map_window()
+        self.win3 = self.map_window()
+        self.history = FocusHistory(size=4)
+        self.history.start()
+
+    def tearDown(self):
+        self.history.stop()
+        self.WM.unregister_all()
+        if self.dispatcher.isAlive():
+            self.dispatcher.join()
+
+    def property(self, name):
+        event = RawEvent(self.WM.id, name)
+        self.history.property(PropertyNotifyEvent(event))
+
+    def test_start(self):
+        self.assertTrue(self.WM.history is self.history)
+        self.assertEqual(self.history.windows_ids(),
+                         [self.win3.id, self.win2.id, self.win.id])
+        self.history.stop()
+        self.assertEqual(self.WM.history, None)
+        self.assertEqual(len(self.history), 0)
+
+    def test_property__active_window(self):
+        self.win.activate()
+        self.property('_NET_ACTIVE_WINDOW')
+        self.assertEqual(self.history.windows_ids(),
+                         [self.win.id, self.win3.id, self.win2.id])
+
+    def test_property__client_list(self):
+        self.win2.destroy()
+        self.property('_NET_CLIENT_LIST')
+        self.assertFalse(self.win2.id in self.history)
+        self.assertEqual(self.history.windows_ids(),
+                         [self.win3.id, self.win.id])
+
+    def test_recent(self):
+        self.assertEqual(self.history.recent(), self.win3.id)
+        self.assertEqual(self.history.recent(1), self.win2.id)
+        self.assertEqual(self.history.recent(1, skip=self.win2.id), 
+                         self.win.id)
+        self.assertEqual(self.history.recent(3), None)
+
+    def test_activated__size(self):
+        for win_id in [1, 2, 3]:
+            self.history.activated(win_id)
+        self.assertEqual(self.history.windows_ids(), 
+                         [3, 2, 1, self.win3.id])
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [FocusHistoryTests, ]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+
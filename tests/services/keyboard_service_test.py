@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+import unittest
+
+import sys
+sys.path.insert(0, '../')
+sys.path.insert(0, './')
+
+from tests.common_test import MockedXlibTests
+
+from pywo import actions
+from pywo.config import Config
+from pywo.core import Gravity, Type
+from pywo.core import latency
+from pywo.services import keyboard_service
+
+
+class KeyEvent(object):
+
+    """Simple wrapper for pywo.core.events.KeyEvent."""
+
+    def __init__(self, modifiers, keycode, time=0):
+        self.modifiers = modifiers
+        self.keycode = keycode
+        self.time = time
+
+
+class PywoKeyPressHandlerTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.config = Config()
+        self.handler = keyboard_service.PywoKeyPressHandler(self.config)
+
+    def test_set_config(self):
+        key = self.WM.str2modifiers_keycode('Shift', 'KP_7')
+        plan = self.handler.mappings[key]
+        self.assertTrue(isinstance(plan, actions.ActionPlan))
+        self.assertEqual(plan.action, actions.manager.get('expand'))
+        self.assertEqual(plan.kwargs['direction'], Gravity(0, 0))
+        self.assertEqual(set(self.handler.keys), 
+                         set(self.handler.mappings.keys()))
+
+    def test_set_config__frozen_kwargs(self):
+        key = self.WM.str2modifiers_keycode('Shift', 'KP_7')
+        plan = self.handler.mappings[key]
+        plan.kwargs['direction'] = Gravity(1, 1)
+        self.assertEqual(plan.kwargs['direction'], Gravity(0, 0))
+
+    def test_key_press(self):
+        performed = []
+        key = self.WM.str2modifiers_keycode('Shift', 'KP_7')
+        self.handler.mappings[key] = performed.append
+        self.handler.key_press(KeyEvent(*key))
+        self.assertEqual(performed, [self.win])
+
+    def test_key_press__latency(self):
+        latency.LATENCY.clear()
+        key = self.WM.str2modifiers_keycode('Shift', 'KP_7')
+        self.handler.key_press(KeyEvent(key[0], key[1], 1000))
+        self.handler.key_press(KeyEvent(*key))
+        summary = latency.LATENCY.summary()
+        latency.LATENCY.clear()
+        self.assertEqual([row[:3] for row in summary],
+                         [('expand', 'wakeup', 1),
+                          ('expand', 'window', 2),
+                          ('expand', 'filter', 2),
+                          ('expand', 'perform', 2),
+                          ('expand', 'sync', 2),
+                          ('expand', 'total', 2)])
+
+    def test_key_press__latency_rejected(self):
+        latency.LATENCY.clear()
+        key = self.WM.str2modifiers_keycode('Shift', 'KP_7')
+        self.handler.key_press(KeyEvent(key[0], key[1], 1000))
+        # desktop window (active one) doesn't match expand's filter
+        self.map_window(type=Type.DESKTOP)
+        self.handler.key_press(KeyEvent(key[0], key[1], 2000))
+        summary = latency.LATENCY.summary()
+        latency.LATENCY.clear()
+        self.assertEqual([row[:3] for row in summary],
+                         [('expand', 'wakeup', 1),
+                          ('expand', 'window', 1),
+                          ('expand', 'filter', 1),
+                          ('expand', 'perform', 1),
+                          ('expand', 'sync', 1),
+                          ('expand', 'total', 1)])
+
+    def test_key_press__not_mapped(self):
+        performed = []
+        key = self.WM.str2modifiers_keycode('Shift', 'KP_7')
+        self.handler.mappings[key] = performed.append
+        self.handler.key_press(KeyEvent(key[0], 0))
+        self.assertEqual(performed, [])
+
+
+class ModalKeyHandlerTests(MockedXlibTests):
+
+    def setUp(self):
+        MockedXlibTests.setUp(self)
+        self.grabbed = set()
+        self.WM.grab_key = lambda mask, code, numlock, capslock: \
+                self.grabbed.add((mask, code))
+        self.WM.ungrab_key = lambda mask, code, numlock, capslock: \
+                self.grabbed.discard((mask, code))
+        self.WM.register = self.WM.unregister = lambda handler: None
+        self.config = Config()
+        self.handler = keyboard_service.ModalKeyHandler(self.config)
+        self.handler.grab_keys(self.WM)
+
+    def tearDown(self):
+        for name in ['grab_key', 'ungrab_key', 'register', 'unregister']:
+            delattr(self.WM, name)
+
+    def test_update_config(self):
+        self.assertEqual(self.grabbed, set(self.handler.pywo_handler.keys))
+        config = Config()
+        config.keys['expand'] = 'Ctrl-Alt'
+        config.keys.pop('float')
+        key = self.WM.str2modifiers_keycode('Ctrl-Alt', 'KP_7')
+        float_key = self.WM.str2modifiers_keycode('Alt', 'KP_7')
+        self.assertTrue(self.handler.update_config(config, self.WM))
+        self.assertEqual(self.grabbed, set(self.handler.pywo_handler.keys))
+        self.assertTrue(key in self.grabbed)
+        self.assertFalse(float_key in self.grabbed)
+        self.assertEqual(self.handler.pywo_handler.mappings[key].action, 
+                         actions.manager.get('expand'))
+
+    def test_update_config__numlock(self):
+        config = Config()
+        config.numlock = Config.OFF
+        self.assertFalse(self.handler.update_config(config, self.WM))
+        self.assertTrue(self.handler.config is self.config)
+
+
+if __name__ == '__main__':
+    main_suite = unittest.TestSuite()
+    for suite in [PywoKeyPressHandlerTests,
+                  ModalKeyHandlerTests]:
+        main_suite.addTest(unittest.TestLoader().loadTestsFromTestCase(suite))
+    unittest.TextTestRunner(verbosity=2).run(main_suite)
+